@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.urls import path
 from django.template.response import TemplateResponse
 from import_export.admin import ImportExportModelAdmin
-from .views import bill_report_admin, cheque_letter_view
+from .views import bill_report_admin, cheque_letter_view, cheque_letter_batch_view
 from django import forms
 from .models import CustomUser, Faculty
 from django.contrib.auth.models import Group
@@ -15,7 +15,7 @@ from django.utils.decorators import method_decorator
 from django.utils.html import format_html
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from .services import create_receipt_with_allocations
+from .services import create_receipt_with_allocations, recalculate_payment_taxes
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Sum, F, Value
 from django.db.models.functions import Coalesce
@@ -30,8 +30,11 @@ from .forms import CoPiNameAdminForm
 from .models import (
     Faculty, Project, Receipt, SeedGrant, TDGGrant, ReceiptAllocation, ReceiptCategory,
     Expenditure, Commitment, CustomUser, FundRequest, BillInward, TDSSection, TDSRate, Payment, ReceiptHead,ProjectSanctionDistribution,Payee,PaymentType,Bank,CoPiName, AuditLog,Payee,
-
+    ImportJob, ChequeLetterJob,
 )
+from .tasks import run_import_job, IMPORT_FORMATS
+from django.shortcuts import get_object_or_404, redirect
+from django.core.exceptions import PermissionDenied
 
 
 from .resources import (
@@ -39,10 +42,12 @@ from .resources import (
     TDGGrantResource, ExpenditureResource, CommitmentResource, PaymentResource, PayeeResource
 )
 
-from .serializers import CommitmentSerializer
-
 
 from .utils import send_async, generate_random_password, send_credentials_email
+from .versions import bump_versions, queryset_scopes
+from .grid import GRID_COLUMN_ALIASES, GridRequestError, resolve_column
+from .reports import committed_payments_block
+from .bundles import bundle_urls
 from django.contrib import messages
 
 HEADS = [
@@ -50,6 +55,9 @@ HEADS = [
     "Manpower", "Others", "Furniture", "Visitor Expenses", "Lab Equipment"
 ]
 
+# columns filled on save that the Excel views neither show nor edit
+DENORMALIZED_FIELDS = ("search_text", "funding_short_no", "head_key")
+
 class ReceiptAdminForm(forms.ModelForm):
 
     short_no = forms.ChoiceField(label="Short No.")
@@ -101,6 +109,9 @@ class ExcelViewMixin:
     excel_extra_fields = []
 
     excel_field_order = []
+
+    # template variable -> lookup bundle loaded by the page, see project/bundles.py
+    excel_bundles = {}
     
     # ✅ ONE LINE - Auto-set template for ALL models
     change_list_template = 'admin/change_list_with_excel.html'
@@ -125,10 +136,11 @@ class ExcelViewMixin:
         fields_config = self.get_excel_fields_config()
         context_data = self.get_excel_context_data()
         context_data['primary_key_field'] = self.get_primary_key_field()
+        # projects, grants, payees, faculties and commitments are fetched
+        # from api/lookups/ by the grid, see project/lookups.py
         json_keys = [
-            'seed_grants', 'tdg_grants',
-            'admin_users', 'tds_sections', 'tds_rates','commitments',
-            'heads', 'status_choices', 'faculties', 'projects','payees', 'banks','payment_types']
+            'admin_users', 'tds_sections', 'tds_rates',
+            'heads', 'status_choices', 'banks','payment_types']
         for k in json_keys:
             if k in context_data:
                 val = context_data[k]
@@ -146,7 +158,7 @@ class ExcelViewMixin:
                     context_data[k] = json.dumps(val, cls=DjangoJSONEncoder)
             else:
             # ensure key exists as JSON empty array/object where appropriate
-                if k in ('heads', 'status_choices', 'faculties', 'admin_users'):
+                if k in ('heads', 'status_choices', 'admin_users'):
                     context_data[k] = json.dumps([])
                 else:
                     context_data[k] = json.dumps([])
@@ -156,6 +168,8 @@ class ExcelViewMixin:
             'model_name': model_name.lower(),
             'model_verbose_name': self.model._meta.verbose_name,
             'fields_config': json.dumps(fields_config),
+            'grid_columns': json.dumps(self.get_excel_grid_columns()),
+            'bundle_urls': json.dumps(self.get_excel_bundle_urls()),
             'enable_grant_selector': len(self.excel_grant_fields) > 0,
             **context_data,
             'title': f'{self.model._meta.verbose_name} - Excel View',
@@ -175,7 +189,7 @@ class ExcelViewMixin:
         fields = []
         
         for field in self.model._meta.fields:
-            if field.name in self.excel_exclude_fields:
+            if field.name in self.excel_exclude_fields or field.name in DENORMALIZED_FIELDS:
                 continue
 
             if field.primary_key:
@@ -216,6 +230,15 @@ class ExcelViewMixin:
     
     def get_primary_key_field(self):
         return 'id'
+
+    def get_excel_bundle_urls(self):
+        urls = bundle_urls(set(self.excel_bundles.values()))
+        return {key: urls[name] for key, name in self.excel_bundles.items()}
+
+    def get_excel_grid_columns(self):
+        """Grid columns the rows API can sort and filter on, see project/grid.py"""
+        names = [field.name for field in self.model._meta.fields] + list(GRID_COLUMN_ALIASES)
+        return [name for name in names if resolve_column(self.model, name)]
     
     def get_field_width(self, field):
         """Auto-calculate column width based on field type"""
@@ -237,18 +260,12 @@ class ExcelViewMixin:
         Example:
             def get_excel_context_data(self):
                 return {
-                    'seed_grants': list(SeedGrant.objects.values(...)),
+                    'banks': list(Bank.objects.values(...)),
                     'heads': json.dumps(HEADS)
                 }
         """
 
         return {
-            'seed_grants': json.dumps([]),
-             
-             
-            'tdg_grants': json.dumps([]),
-            
-            
             'admin_users': json.dumps([]),
             'tds_sections': json.dumps([]),
             'tds_rates': json.dumps([]),
@@ -256,6 +273,77 @@ class ExcelViewMixin:
             'heads': json.dumps([]),
         }
 
+class BackgroundImportMixin:
+    """
+    Adds a 'Background Import' page next to the normal import. The uploaded
+    file is stored on an ImportJob and imported by Celery, the page then polls
+    the job status endpoint.
+    """
+
+    def get_urls(self):
+        urls = super().get_urls()
+        model_name = self.model._meta.model_name
+
+        custom_urls = [
+            path(
+                'background-import/',
+                self.admin_site.admin_view(self.background_import_view),
+                name=f'{model_name}_background_import'
+            ),
+            path(
+                'background-import/<int:job_id>/',
+                self.admin_site.admin_view(self.background_import_view),
+                name=f'{model_name}_background_import_job'
+            ),
+        ]
+        return custom_urls + urls
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['background_import_url'] = reverse(
+            f'admin:{self.model._meta.model_name}_background_import'
+        )
+        return super().changelist_view(request, extra_context)
+
+    def background_import_view(self, request, job_id=None):
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        model_name = self.model._meta.model_name
+        job = None
+
+        if job_id:
+            job = get_object_or_404(ImportJob, pk=job_id, model_name=model_name)
+
+        elif request.method == 'POST':
+            upload = request.FILES.get('import_file')
+            file_format = request.POST.get('file_format', '').lower()
+
+            if not upload:
+                messages.error(request, "Please choose a file to import.")
+            elif file_format not in IMPORT_FORMATS:
+                messages.error(request, "Unsupported file format.")
+            else:
+                job = ImportJob.objects.create(
+                    model_name=model_name,
+                    file=upload,
+                    file_format=file_format,
+                    created_by=request.user,
+                )
+                transaction.on_commit(lambda: run_import_job.delay(job.pk))
+                return redirect(f'admin:{model_name}_background_import_job', job_id=job.pk)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f'Background Import - {self.model._meta.verbose_name_plural}',
+            'opts': self.model._meta,
+            'job': job,
+            'file_formats': list(IMPORT_FORMATS),
+            'status_url': reverse('import_job_status', args=[job.pk]) if job else None,
+            'recent_jobs': ImportJob.objects.filter(model_name=model_name)[:10],
+        }
+        return render(request, 'admin/background_import.html', context)
+
 # =============================================================================
 # Custom Admin Site with Grouping (Existing - No changes)
 # =============================================================================
@@ -333,55 +421,20 @@ class CustomAdminSite(admin.AdminSite):
                 self.admin_view(committed_payments_view),
                 name="committed_payments"
             ),
+            path(
+                "committed-payments/rows/",
+                self.admin_view(committed_payments_rows),
+                name="committed_payments_rows"
+            ),
         ]
         return custom_urls + urls
     
 
 
 def committed_payments_view(request):
-    import json
-    from decimal import Decimal
-
-    payments = Payment.objects.filter(commitment__isnull=False).select_related(
-        "head", "payee", "payment_type", "bank", "tds_section", "tds_rate", "commitment",
-        "project", "seed_grant", "tdg_grant",
-    ).order_by("date", "id")
-
-    data = []
-    for p in payments:
-        data.append({
-            "id": p.id,
-            "date": str(p.date) if p.date else "",
-            "short_no": p.short_no or "-",
-            "head": p.head.name if p.head else "",
-            "payment_type": str(p.payment_type) if p.payment_type else "",
-            "commitment_code": p.commitment.commitment_code if p.commitment else "",
-            "payee": p.payee.name_of_payee if p.payee else "",
-            "payee_pan": p.payee_pan or "",
-            "bank":              p.bank.bank_name if p.bank else "",
-            "cheque_no":         p.cheque_no or "",
-            "utr_no":            p.utr_no or "",
-            "payee_bank_name":   p.payee_bank_name or "",
-            #"payee_branch_name": p.payee_branch_name or "",
-            "payee_account_no":  p.payee_account_no or "",
-            #"payee_ifsc":        p.payee_ifsc or "",
-            "pi_name":           p.pi_name or "",
-            "amount":            str(p.amount) if p.amount else "0",
-            "tds_section":       p.tds_section.section if p.tds_section else "",
-            "tds_rate":          str(p.tds_rate.percent) if p.tds_rate else "",
-            "tds_amount":        str(p.tds_amount) if p.tds_amount else "0",
-            "gst_tds_type":      p.gst_tds_type or "",
-            "igst_tds":          str(p.igst_tds) if p.igst_tds else "0",
-            "cgst_tds":          str(p.cgst_tds) if p.cgst_tds else "0",
-            "sgst_tds":          str(p.sgst_tds) if p.sgst_tds else "0",
-            "net_amount":        str(p.net_amount) if p.net_amount else "0",
-            "purpose":           p.purpose or "",
-            "payment_status":    p.payment_status or "",
-        })
-
+    """The report page; its grid loads the rows block by block from committed_payments_rows."""
     context = {
-        "payments_data": json.dumps(data),
-        "total_count":   len(data),
+        "rows_url": reverse("admin:committed_payments_rows"),
         # ✅ Admin context ke liye
         "title": "Committed Payments",
         "site_header": custom_admin_site.site_header,
@@ -389,9 +442,20 @@ def committed_payments_view(request):
         "has_permission": True,
     }
 
+    return render(request, "admin/committed_payments.html", context)
 
 
-    return render(request, "admin/committed_payments.html", context)
+def committed_payments_rows(request):
+    """One block of the committed payments report, see reports.committed_payments_block."""
+    try:
+        rows, last_row, summary = committed_payments_block(request.GET)
+    except (GridRequestError, ValueError, ValidationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(
+        {"rows": list(rows), "last_row": last_row, "summary": summary},
+        encoder=DjangoJSONEncoder,
+    )
 
 
 def project_fund_detail_view(request):
@@ -670,7 +734,7 @@ class CustomUserAdmin(BaseUserAdmin):
 # =============================================================================
 
 # ✅ Simple Models (No grant relations)
-class ProjectAdmin(ExcelViewMixin, ImportExportModelAdmin):
+class ProjectAdmin(BackgroundImportMixin, ExcelViewMixin, ImportExportModelAdmin):
     """
     Project Admin:
         - Import/Export: ✅ (from ImportExportModelAdmin)
@@ -758,20 +822,6 @@ class ProjectAdmin(ExcelViewMixin, ImportExportModelAdmin):
                 field["editable"] = True
         return fields
 
-    def get_excel_context_data(self):
-        from collections import defaultdict
-        copi_map = defaultdict(list)
-        for c in CoPiName.objects.filter(project__isnull=False).select_related('project'):
-            copi_map[c.project_id].append(c.name)
-
-        return {
-            "faculties": list(
-                Faculty.objects.values("faculty_id", "pi_name", "department")
-            ),
-            "copi_map": dict(copi_map),
-        }
-        
-        
     def save_model(self, request, obj, form, change):
         if obj.is_extended and obj.extension_approved_by is None:
             obj.extension_approved_by = request.user 
@@ -914,10 +964,6 @@ class SeedGrantAdmin(ExcelViewMixin, ImportExportModelAdmin):
         request = getattr(self, "_current_request", None)
         context["is_superuser"] = request.user.is_superuser if request else False
     
-        context["faculties"] = list(
-            Faculty.objects.values("faculty_id", "pi_name", "department")
-        )
-    
         return context
     
 
@@ -929,12 +975,6 @@ class TDGGrantAdmin(ExcelViewMixin, ImportExportModelAdmin):
     search_fields = ("grant_no", "short_no", "faculty__pi_name", "faculty__department")
     excel_exclude_fields = []
 
-    def get_excel_context_data(self):
-        return {
-            'faculties': list(Faculty.objects.values(
-                'faculty_id', 'pi_name', 'department'
-            ))
-        }
     def faculty_pi(self,obj):
         return obj.faculty.pi_name if obj.faculty else "-"
     
@@ -952,7 +992,7 @@ class TDGGrantAdmin(ExcelViewMixin, ImportExportModelAdmin):
 
 
 # ✅ Models with Grant Relations (Need extra configuration)
-class ExpenditureAdmin(ExcelViewMixin, ImportExportModelAdmin):
+class ExpenditureAdmin(BackgroundImportMixin, ExcelViewMixin, ImportExportModelAdmin):
     """
     Expenditure Admin:
         - Import/Export: ✅ (from ImportExportModelAdmin)
@@ -993,47 +1033,10 @@ class ExpenditureAdmin(ExcelViewMixin, ImportExportModelAdmin):
 
     def get_excel_context_data(self):
         """
-        Provide grant data for dropdowns in Excel view
-        JavaScript template will use this data
+        Provide head options for the Excel view; grants and projects
+        come from the lookup API (project/lookups.py)
         """
         return {
-            'seed_grants': list(SeedGrant.objects.values('id','short_no', 'grant_no', 'pi_name', 'end_date', 'extended_end_date','project_status')
-                                .annotate(
-                                    end_date_str = models.functions.Cast('end_date', models.CharField()),
-                                    extended_end_date_str= models.functions.Cast('extended_end_date', models.CharField())
-                                )
-                                .values(
-                                    'id','short_no', 'grant_no', 'pi_name', 'end_date_str', 'extended_end_date_str', 'is_extended', 'project_status'
-                                )
-                            ),
-                            
-            'tdg_grants': list(TDGGrant.objects.values('id','short_no', 'grant_no', 'pi_name', 'end_date', 'extended_end_date', 'is_extended', 'project_status')
-                               
-                               .annotate(
-                                   end_date_str = models.functions.Cast('end_date', models.CharField()),
-                                   extended_end_date_str = models.functions.Cast('extended_end_date',models.CharField())
-                               )
-                               .values(
-                                   'id','short_no', 'grant_no', 'pi_name', 'end_date_str', 'extended_end_date_str', 'is_extended', 'project_status'
-                               )
-                            ),
-
-            'projects': list(
-                Project.objects.annotate(
-                    end_date_str=models.functions.Cast("project_end_date", models.CharField()),
-                    extended_end_date_str = models.functions.Cast("extended_end_date", models.CharField())
-                ).values(
-                    "id",
-                    "project_short_no",
-                    "project_no",
-                    "pi_name",
-                    "end_date_str",
-                    "extended_end_date_str",
-                    "project_status",
-                )
-            ),
-                            
-
             'heads': HEADS,  # Convert list to JSON string
         }
     
@@ -1046,7 +1049,7 @@ class ExpenditureAdmin(ExcelViewMixin, ImportExportModelAdmin):
         super().delete_model(request, obj)
 
 
-class CommitmentAdmin(ExcelViewMixin, ImportExportModelAdmin):
+class CommitmentAdmin(BackgroundImportMixin, ExcelViewMixin, ImportExportModelAdmin):
     """
     Commitment Admin - similar to Expenditure
     """
@@ -1069,50 +1072,6 @@ class CommitmentAdmin(ExcelViewMixin, ImportExportModelAdmin):
             
         
         return {
-
-            'commitments': CommitmentSerializer(
-                Commitment.objects.all(),
-                many=True
-
-            ).data,
-            
-
-        
-            
-            
-
-            'seed_grants': list(SeedGrant.objects.values('id','short_no', 'grant_no', 'pi_name', 'end_date', 'extended_end_date', 'project_status')
-                                .annotate(
-                                    end_date_str = models.functions.Cast('end_date', models.CharField()),
-                                    extended_end_date_str = models.functions.Cast('extended_end_date', models.CharField())
-                                )
-                                .values(
-                                    'id','short_no', 'grant_no', 'pi_name', 'end_date_str', 'extended_end_date_str', 'is_extended', 'project_status'
-                                )
-                            ),
-            'tdg_grants': list(TDGGrant.objects.values('id','short_no', 'grant_no', 'pi_name', 'end_date', 'extended_end_date', 'is_extended', 'project_status')
-                               .annotate(
-                                   end_date_str = models.functions.Cast('end_date',models.CharField()),
-                                   extended_end_date_str = models.functions.Cast('extended_end_date', models.CharField())
-                               )
-                               .values(
-                                   'id','short_no', 'grant_no', 'pi_name', 'end_date_str', 'is_extended', 'project_status', 'extended_end_date_str'
-                               )
-                            ),
-            'projects': list(
-                Project.objects.annotate(
-                    end_date_str=models.functions.Cast("project_end_date", models.CharField()),
-                    extended_end_date_str = models.functions.Cast("extended_end_date", models.CharField())
-                ).values(
-                    "id",
-                    "project_short_no",
-                    "project_no",
-                    "pi_name",
-                    "end_date_str",
-                    "extended_end_date_str",
-                    "project_status",
-                )
-            ),
             'heads': json.dumps(HEADS),
             
         }
@@ -1143,6 +1102,8 @@ class BillInwardAdmin(ExcelViewMixin,admin.ModelAdmin):
     ordering = ['-date', '-id']
 
     excel_exclude_fields = ['id']
+
+    excel_bundles = {"tds_sections": "tds_sections", "tds_rates": "tds_rates"}
     
     # PDF Link
     def bill_pdf_link(self, obj):
@@ -1426,8 +1387,9 @@ class BillInwardAdmin(ExcelViewMixin,admin.ModelAdmin):
         """
         Provide dropdown options for Excel View:
         - Status choices
-        - Faculty list
         - Admin users list (superuser only)
+        Faculties come from the lookup API (project/lookups.py),
+        TDS sections / rates from excel_bundles
         """
         request = getattr(self, '_current_request', None)
 
@@ -1439,30 +1401,8 @@ class BillInwardAdmin(ExcelViewMixin,admin.ModelAdmin):
                 {'value': 'processed', 'label': 'Processed'},
                 {'value': 'returned', 'label': 'Returned'},
             ]),
-            'faculties': json.dumps([
-                {
-                    
-                    'faculty_id': f.faculty_id,
-                    'pi_name': f.pi_name,
-                    'department': getattr(f, "department", ""),
-                    
-                }
-                for f in Faculty.objects.all().order_by('pi_name')
-            ]),
         }
 
-        context['tds_sections'] = json.dumps([
-            {'id': s.id, 'code':s.section}
-            for s in TDSSection.objects.all().order_by('section')
-        ])
-
-        context['tds_rates'] = json.dumps([
-            {'id': r.id, 'section_id': r.section_id, 'percent': float(r.percent)}
-            for r in TDSRate.objects.select_related("section").all()
-
-            
-        ])
-        
         # Only superuser can see admin users for assignment
         if request and (request.user.is_superuser or request.user.groups.filter(name="billinward").exists()):
             admin_users = CustomUser.objects.filter(
@@ -1519,9 +1459,11 @@ class BillInwardAdmin(ExcelViewMixin,admin.ModelAdmin):
         
         super().save_model(request, obj, form, change)
 
-class PaymentAdmin(ExcelViewMixin, ImportExportModelAdmin):
+class PaymentAdmin(BackgroundImportMixin, ExcelViewMixin, ImportExportModelAdmin):
     resource_class = PaymentResource
 
+    actions = ['recalculate_taxes']
+
     list_display = ("date","bill_date","head","payment_type","payee","utr_no","amount","get_short_no")
 
     list_filter = ("payment_type",
@@ -1549,6 +1491,20 @@ class PaymentAdmin(ExcelViewMixin, ImportExportModelAdmin):
 
     excel_grant_fields = ["seed_grant", "tdg_grant", "project"]
     excel_exclude_fields = ["id", "seed_grant", "tdg_grant","project",'seed_grant_short', 'tdg_grant_short','funding_id', 'funding_type']
+
+    excel_bundles = {
+        "heads": "receipt_heads",
+        "payment_types": "payment_types",
+        "banks": "banks",
+        "tds_sections": "tds_sections",
+        "tds_rates": "tds_rates",
+    }
+
+    def recalculate_taxes(self, request, queryset):
+        updated = recalculate_payment_taxes(queryset, user=request.user)
+        self.message_user(request, f'Taxes recalculated, {updated} payment(s) changed.')
+    recalculate_taxes.short_description = "Recalculate TDS / GST-TDS for selected payments"
+
     def get_excel_fields_config(self):
         fields = super().get_excel_fields_config()
 
@@ -1663,110 +1619,6 @@ class PaymentAdmin(ExcelViewMixin, ImportExportModelAdmin):
 
         return fields
     
-    def get_excel_context_data(self):
-
-        context = super().get_excel_context_data()
-        context.update ({
-            "projects": list(
-                Project.objects.annotate(
-                    end_date_str=models.functions.Cast(
-                        "project_end_date", models.CharField()
-                    ),
-                    extended_end_date_str=models.functions.Cast(
-                        "extended_end_date", models.CharField()
-                    ),
-                    pi_email=models.F("faculty__email"),
-                ).values(
-                    "id",
-                    "project_short_no",
-                    "project_no",
-                    "pi_name",
-                    "pi_email",
-                    "end_date_str",
-                    "extended_end_date_str",
-                    "project_status",
-                )
-            ),
-
-            "seed_grants": list(
-                SeedGrant.objects.annotate(
-                    end_date_str=models.functions.Cast("end_date", models.CharField()),
-                    extended_end_date_str=models.functions.Cast(
-                        "extended_end_date", models.CharField()
-                    ),
-                    pi_email=models.F("faculty__email"),
-                ).values(
-                    "id",
-                    "short_no",
-                    "grant_no",
-                    "pi_name",
-                    "pi_email",
-                    "end_date_str",
-                    "extended_end_date_str",
-                    "project_status",
-                )
-            ),
-
-            "tdg_grants": list(
-                TDGGrant.objects.annotate(
-                    end_date_str=models.functions.Cast("end_date", models.CharField()),
-                    extended_end_date_str=models.functions.Cast(
-                        "extended_end_date", models.CharField()
-                    ),
-                    pi_email=models.F("faculty__email"),
-                ).values(
-                    "id",
-                    "short_no",
-                    "grant_no",
-                    "pi_name",
-                    "pi_email",
-                    "end_date_str",
-                    "extended_end_date_str",
-                    "project_status",
-                )
-            ),
-
-            "heads": list(
-                ReceiptHead.objects.values("id", "name").order_by("name")
-            ),
-
-            "payment_types": list(
-                PaymentType.objects.values("id", "name").order_by("name")
-            ),
-
-            "banks": list(
-                Bank.objects.filter(is_active=True)
-                .values("id", "short_no", "bank_name")
-                .order_by("short_no")
-            ),
-
-            "payees": list(
-                Payee.objects.values(
-                    "id",
-                    "name_of_payee",
-                    "bank_name",
-                    "branch",
-                    "account_number",
-                    "ifsc",
-                    "pan",
-                    "email",
-                ).order_by("name_of_payee")
-            ),
-
-            "tds_sections": list(
-                TDSSection.objects.values("id", "section").order_by("section")
-            ),
-
-            "tds_rates": list(
-                TDSRate.objects.values("id", "section_id", "percent")
-            ),
-
-            "commitments": CommitmentSerializer(Commitment.objects.filter(status="OPEN"),
-                                                                          many=True).data,
-        })
-
-        return context
-    
     def get_short_no(self, obj):
         if obj.project:
             return obj.project.project_short_no
@@ -1787,7 +1639,10 @@ class PaymentAdmin(ExcelViewMixin, ImportExportModelAdmin):
     # ==========================================================
     def save_model(self, request, obj, form, change):
 
-        if obj.funding_type and obj.funding_id:
+        # funding_type / funding_id follow the FKs, so they only win when edited themselves
+        funding_edited = not change or {"funding_type", "funding_id"} & set(form.changed_data)
+
+        if funding_edited and obj.funding_type and obj.funding_id:
 
             if obj.funding_type == "PROJECT":
                 obj.project = Project.objects.filter(id=obj.funding_id).first()
@@ -1837,6 +1692,12 @@ class PaymentAdmin(ExcelViewMixin, ImportExportModelAdmin):
         urls = super().get_urls()
         custom = [
             path('cheque-letter/', self.admin_site.admin_view(cheque_letter_view), name='payment_cheque_letter'),
+            path('cheque-letter/batch/', self.admin_site.admin_view(cheque_letter_batch_view), name='payment_cheque_letter_batch'),
+            path(
+                'cheque-letter/batch/<int:job_id>/',
+                self.admin_site.admin_view(cheque_letter_batch_view),
+                name='payment_cheque_letter_batch_job'
+            ),
 
         ]
         return custom + urls
@@ -1948,12 +1809,16 @@ class FundRequestAdmin(ExcelViewMixin, admin.ModelAdmin):
 
     
     def approve_requests(self, request, queryset):
+        scopes = queryset_scopes(queryset)
         updated = queryset.update(status='approved')
+        bump_versions(scopes)
         self.message_user(request, f'{updated} request(s) approved successfully.')
     approve_requests.short_description = "Approve selected requests"
     
     def reject_requests(self, request, queryset):
+        scopes = queryset_scopes(queryset)
         updated = queryset.update(status='rejected')
+        bump_versions(scopes)
         self.message_user(request, f'{updated} request(s) rejected.')
     reject_requests.short_description = "Reject selected requests"
 
@@ -2057,6 +1922,8 @@ class ProjectSanctionDistributionAdmin(ExcelViewMixin, admin.ModelAdmin):
         
     ]
 
+    excel_bundles = {"heads": "receipt_heads"}
+
     
 
     
@@ -2088,33 +1955,7 @@ class ProjectSanctionDistributionAdmin(ExcelViewMixin, admin.ModelAdmin):
                     "width": 180,
                 })
         return fields
-    
-    def get_excel_context_data(self):
-        return {
-
-            
-            "projects": list(
-                Project.objects.values(
-                    "id",
-                    "project_short_no",
-                    "project_no",
-                    
-                ).order_by("project_short_no") 
-                
-            ),
-
-          
 
-        
-            "heads": list(
-                ReceiptHead.objects.values(
-                    "id",
-                    "name",
-                ).order_by("name")
-            ),
-        }
-    
-    
 
 custom_admin_site.register(ProjectSanctionDistribution, ProjectSanctionDistributionAdmin)
 
@@ -2180,7 +2021,42 @@ class AuditLogAdmin(ExcelViewMixin, admin.ModelAdmin):
     
     formatted_changes.short_description = "Changes"
 
-custom_admin_site.register(AuditLog, AuditLogAdmin)  
+custom_admin_site.register(AuditLog, AuditLogAdmin)
+
+
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("model_name", "status", "progress", "new_rows", "updated_rows", "error_rows", "created_by", "created_at")
+    list_filter = ("model_name", "status")
+    readonly_fields = (
+        "model_name", "file", "file_format", "status", "total_rows", "processed_rows",
+        "new_rows", "updated_rows", "skipped_rows", "error_rows", "errors", "summary",
+        "created_by", "created_at", "started_at", "finished_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+custom_admin_site.register(ImportJob, ImportJobAdmin)
+
+
+class ChequeLetterJobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "bank", "date_from", "date_to", "output_format", "status", "progress", "created_by", "created_at")
+    list_filter = ("status", "output_format")
+    readonly_fields = (
+        "bank", "date_from", "date_to", "cheque_nos", "output_format", "status", "total_letters",
+        "processed_letters", "file", "summary", "created_by", "created_at", "started_at", "finished_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+custom_admin_site.register(ChequeLetterJob, ChequeLetterJobAdmin)  
 
 
 
@@ -0,0 +1,315 @@
+"""
+Buffered audit-log writer.
+
+Audit entries are queued for the current transaction and written with a
+single bulk_create once it commits (immediately when no transaction is open).
+Entries of a rolled-back transaction or savepoint are dropped together with it. Setting
+AUDIT_CELERY_BATCH_SIZE hands batches of at least that size to Celery instead.
+
+On PostgreSQL the table is range-partitioned by month (migration 0005); the
+helpers at the bottom keep partitions created ahead of time and archive and
+drop old months for the audit_retention command.
+"""
+import gzip
+import json
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+
+
+_state = threading.local()
+
+
+def build_entry(user, model_name, object_id, object_value, action, changes=None):
+    return {
+        "user_id": getattr(user, "pk", user),
+        "model_name": model_name,
+        "object_id": str(object_id),
+        "object_value": str(object_value)[:250] if object_value is not None else None,
+        "action": action,
+        "changes": changes or {},
+    }
+
+
+class AuditBatch:
+    """
+    Entries queued by one call, registered with their own on_commit hook.
+    Django discards the hook when the transaction or savepoint the batch was
+    queued in rolls back, and with it the only strong reference to the
+    batch. The first hook that runs on commit therefore finds exactly the
+    committed batches still alive and writes them all in one bulk_create;
+    the hooks after it have nothing left to do.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.written = False
+
+    def commit(self):
+        if self.written:
+            return
+
+        batches = [batch for batch in (ref() for ref in _state.batches) if batch is not None and not batch.written]
+        _state.batches = []
+
+        for batch in batches:
+            batch.written = True
+
+        write_audit_entries([entry for batch in batches for entry in batch.entries])
+
+
+def queue_audit(user, model_name, object_id, object_value, action, changes=None):
+    queue_audit_entries([build_entry(user, model_name, object_id, object_value, action, changes)])
+
+
+def queue_audit_entries(entries):
+    if not entries:
+        return
+
+    batch = AuditBatch(entries)
+
+    if not hasattr(_state, "batches"):
+        _state.batches = []
+    _state.batches.append(weakref.ref(batch))
+
+    # runs right away when not inside atomic()
+    transaction.on_commit(batch.commit)
+
+
+def write_audit_entries(entries):
+    if not entries:
+        return
+
+    threshold = getattr(settings, "AUDIT_CELERY_BATCH_SIZE", None)
+
+    if threshold and len(entries) >= threshold:
+        from .tasks import write_audit_logs_task
+
+        write_audit_logs_task.delay(entries)
+        return
+
+    save_audit_entries(entries)
+
+
+def save_audit_entries(entries):
+    from .models import AuditLog
+
+    AuditLog.objects.bulk_create([AuditLog(**entry) for entry in entries], batch_size=1000)
+
+
+def queryset_audit_enabled():
+    return not getattr(_state, "skip_queryset_audit", False)
+
+
+@contextmanager
+def skip_queryset_audit():
+    """For callers that already queue per-row entries for a bulk update."""
+    previous = getattr(_state, "skip_queryset_audit", False)
+    _state.skip_queryset_audit = True
+    try:
+        yield
+    finally:
+        _state.skip_queryset_audit = previous
+
+
+# ---------------------------------------------------------------------------
+# Partitioning and retention
+# ---------------------------------------------------------------------------
+
+AUDIT_TABLE = "project_auditlog"
+AUDIT_DELETE_BATCH_SIZE = 5000
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month):
+    return f"{AUDIT_TABLE}_p{month:%Y%m}"
+
+
+def is_auditlog_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [AUDIT_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_audit_partitions():
+    """Monthly partitions as {month_start: table_name}; the default partition is left out."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s",
+            [AUDIT_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f"{AUDIT_TABLE}_p"
+    partitions = {}
+
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions[datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=timezone.utc)] = name
+
+    return partitions
+
+
+def default_partition_months():
+    """Months that have rows in the default partition, i.e. arrived before their partition existed."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT DISTINCT date_trunc(\'month\', "timestamp" AT TIME ZONE \'UTC\') FROM "{AUDIT_TABLE}_default"'
+        )
+        return {row[0].replace(tzinfo=timezone.utc) for row in cursor.fetchall()}
+
+
+def create_audit_partition(month):
+    """
+    Create the partition of one month. Rows of that month already in the
+    default partition would make CREATE TABLE ... PARTITION OF fail, so they
+    are moved into the new table before it is attached. The default
+    partition is locked meanwhile, so no new row of the month can slip in.
+    """
+    name = partition_name(month)
+    bounds = [month, add_months(month, 1)]
+    default = f"{AUDIT_TABLE}_default"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{default}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE "timestamp" >= %s AND "timestamp" < %s)', bounds
+        )
+
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f'CREATE TABLE "{name}" PARTITION OF "{AUDIT_TABLE}" FOR VALUES FROM (%s) TO (%s)', bounds
+            )
+            return name
+
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{AUDIT_TABLE}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{default}" WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            bounds,
+        )
+        # indexes, the primary key and the user foreign key are added on attach
+        cursor.execute(f'ALTER TABLE "{AUDIT_TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', bounds)
+
+    return name
+
+
+def ensure_audit_partitions(months_ahead=3, start=None):
+    """
+    Create monthly partitions from start (default: this month) up to
+    months_ahead, plus those of months that already have rows in the default
+    partition. Returns the new names.
+    """
+    month = month_start(start or datetime.now(timezone.utc))
+    last = add_months(month_start(datetime.now(timezone.utc)), months_ahead)
+
+    months = set(default_partition_months())
+    while month <= last:
+        months.add(month)
+        month = add_months(month, 1)
+
+    existing = list_audit_partitions()
+    created = []
+
+    for month in sorted(months - set(existing)):
+        try:
+            created.append(create_audit_partition(month))
+        except DatabaseError as e:
+            raise DatabaseError(f"Could not create audit partition for {month:%Y-%m}: {e}") from e
+
+    return created
+
+
+def audit_months_before(cutoff):
+    """Months older than cutoff that still hold audit rows or a partition, oldest first."""
+    from .models import AuditLog
+
+    months = {
+        month_start(value)
+        for value in AuditLog.objects.filter(timestamp__lt=cutoff).datetimes("timestamp", "month", tzinfo=timezone.utc)
+    }
+
+    if is_auditlog_partitioned():
+        months.update(month for month in list_audit_partitions() if month < cutoff)
+
+    return sorted(months)
+
+
+def archive_audit_month(month, archive_dir):
+    """
+    Append the rows of one month to archive_dir/auditlog_YYYY_MM.jsonl.gz.
+    Appending adds a new gzip member, so re-running a month keeps earlier output readable.
+    Returns (path, rows written).
+    """
+    from .models import AuditLog
+
+    path = archive_dir / f"auditlog_{month:%Y_%m}.jsonl.gz"
+    queryset = AuditLog.objects.filter(timestamp__gte=month, timestamp__lt=add_months(month, 1))
+    count = 0
+
+    if not queryset.exists():
+        return path, count
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    rows = queryset.order_by("id").values().iterator(chunk_size=2000)
+
+    with gzip.open(path, "at", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps(row, cls=DjangoJSONEncoder))
+            fh.write("\n")
+            count += 1
+
+    return path, count
+
+
+def drop_audit_month(month):
+    """
+    Remove one month of audit rows. Its partition is detached and dropped when
+    there is one; rows left in the default partition (or an unpartitioned
+    table) are deleted in id batches.
+    Returns (partition dropped, rows deleted).
+    """
+    from .models import AuditLog
+
+    dropped = False
+
+    if is_auditlog_partitioned():
+        name = list_audit_partitions().get(month)
+        if name:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE "{AUDIT_TABLE}" DETACH PARTITION "{name}"')
+                cursor.execute(f'DROP TABLE "{name}"')
+            dropped = True
+
+    queryset = AuditLog.objects.filter(timestamp__gte=month, timestamp__lt=add_months(month, 1))
+    removed = 0
+
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:AUDIT_DELETE_BATCH_SIZE])
+        if not ids:
+            return dropped, removed
+        removed += AuditLog.objects.filter(id__in=ids).delete()[0]
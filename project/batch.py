@@ -0,0 +1,229 @@
+"""
+Batched saves of the admin Excel (AG-Grid) views.
+
+The grid posts all of its pending creates, updates and deletes to
+`api/<model>/batch/` at once. They are applied in one transaction through
+the model's API serializer, and nothing is kept unless every row is valid
+and current.
+
+Updates and deletes carry the row's version token, which the rows API sends
+as `_version`: a hash of the row's stored values. A row changed or deleted
+by someone else since the grid loaded it (through any code path) is reported
+as a conflict instead of being overwritten.
+"""
+import hashlib
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+
+GRID_BATCH_MAX_CHANGES = 1000
+
+OPERATIONS = ("create", "update", "delete")
+
+
+class BatchRequestError(ValueError):
+    pass
+
+
+def row_version(obj):
+    """Token of the stored values of obj's concrete fields."""
+    values = [f"{field.attname}={getattr(obj, field.attname)!r}" for field in obj._meta.concrete_fields]
+    return hashlib.sha1("|".join(values).encode()).hexdigest()[:16]
+
+
+def parse_changeset(data):
+    """{"create": [...], "update": [...], "delete": [...]} checked for shape."""
+    if not isinstance(data, dict):
+        raise BatchRequestError("Expected an object with create, update and delete lists")
+
+    changes = {}
+    for op in OPERATIONS:
+        items = data.get(op) or []
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise BatchRequestError(f"{op} must be a list of objects")
+        changes[op] = items
+
+    if sum(len(items) for items in changes.values()) > GRID_BATCH_MAX_CHANGES:
+        raise BatchRequestError(f"At most {GRID_BATCH_MAX_CHANGES} changes can be saved at once")
+
+    seen = set()
+    for item in changes["update"] + changes["delete"]:
+        if item.get("id") in (None, "") or not item.get("version"):
+            raise BatchRequestError("Updates and deletes need an id and a version")
+        if str(item["id"]) in seen:
+            raise BatchRequestError(f"Row {item['id']} is changed more than once")
+        seen.add(str(item["id"]))
+
+    for item in changes["create"] + changes["update"]:
+        if not isinstance(item.get("data"), dict):
+            raise BatchRequestError("Creates and updates need a data object")
+
+    return changes
+
+
+class PrefetchedObjects:
+    """Stands in for a related field's queryset, answering .get(pk=) from one fetch per batch."""
+
+    def __init__(self, model, objects):
+        self.model = model
+        self.objects = objects
+
+    def get(self, pk):
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            raise ValueError(pk)
+
+        try:
+            return self.objects[pk]
+        except KeyError:
+            raise self.model.DoesNotExist
+
+
+def prefetch_related_fields(Serializer, rows, context):
+    """{field name: PrefetchedObjects} for the writable related fields set in rows."""
+    related = {}
+
+    for name, field in Serializer(context=context).fields.items():
+        if not isinstance(field, serializers.PrimaryKeyRelatedField) or field.read_only:
+            continue
+
+        pk_field = field.queryset.model._meta.pk
+        ids = set()
+        for row in rows:
+            value = row.get(name)
+            if value in (None, "") or isinstance(value, bool):
+                continue
+            try:
+                ids.add(pk_field.to_python(value))
+            except ValidationError:
+                pass
+
+        objects = field.queryset.in_bulk(ids) if ids else {}
+        related[name] = PrefetchedObjects(field.queryset.model, objects)
+
+    return related
+
+
+def _errors(exc):
+    if isinstance(exc, ValidationError) and hasattr(exc, "error_dict"):
+        return exc.message_dict
+    if isinstance(exc, ValidationError):
+        return {"non_field_errors": exc.messages}
+    return {"non_field_errors": [str(exc)]}
+
+
+def _save(serializer, result, saved):
+    try:
+        valid = serializer.is_valid()
+    except (ObjectDoesNotExist, ValueError) as e:
+        # model clean() run by a serializer's validate() on an incomplete row
+        result.update(status="error", errors=_errors(e))
+        return
+
+    if not valid:
+        result.update(status="error", errors=serializer.errors)
+        return
+
+    try:
+        # a failed row must not break the transaction the other rows run in
+        with transaction.atomic():
+            obj = serializer.save()
+    except (ValidationError, IntegrityError) as e:
+        result.update(status="error", errors=_errors(e))
+        return
+
+    result.update(status="ok", row=serializer.data)
+    saved.append((result, obj))
+
+
+def _current(obj, item, result):
+    if obj is None:
+        result.update(status="conflict", errors={"non_field_errors": ["Row no longer exists"]})
+        return False
+
+    version = row_version(obj)
+    if version != item["version"]:
+        result.update(
+            status="conflict",
+            version=version,
+            errors={"non_field_errors": ["Row was changed by someone else, reload it to see the change"]},
+        )
+        return False
+
+    return True
+
+
+def apply_changeset(queryset, Serializer, changes, context):
+    """
+    Apply the deletes, updates and creates of a parsed changeset to the rows of
+    queryset. Returns (results, saved): one result per change (deletes, then
+    updates, then creates, each in the order given) with its status ("ok",
+    "error" or "conflict"); saved is False when any change failed, in which
+    case the whole changeset is rolled back.
+    """
+    Model = queryset.model
+    ids = [item["id"] for item in changes["update"] + changes["delete"]]
+    related = prefetch_related_fields(
+        Serializer, [item["data"] for item in changes["create"] + changes["update"]], context
+    )
+
+    results = []
+    saved = []
+
+    with transaction.atomic():
+        current = {
+            str(obj.pk): obj
+            for obj in queryset.select_for_update().filter(pk__in=ids).order_by("pk")
+        }
+
+        for item in changes["delete"]:
+            result = {"op": "delete", "id": item["id"]}
+            results.append(result)
+
+            obj = current.get(str(item["id"]))
+            if not _current(obj, item, result):
+                continue
+
+            try:
+                with transaction.atomic():
+                    obj.delete()
+            except (ValidationError, IntegrityError) as e:
+                result.update(status="error", errors=_errors(e))
+            else:
+                result["status"] = "ok"
+
+        for op in ("update", "create"):
+            for item in changes[op]:
+                if op == "update":
+                    result = {"op": op, "id": item["id"]}
+                    obj = current.get(str(item["id"]))
+                    results.append(result)
+                    if not _current(obj, item, result):
+                        continue
+                else:
+                    result = {"op": op, "key": item.get("key")}
+                    obj = None
+                    results.append(result)
+
+                serializer = Serializer(obj, data=item["data"], partial=obj is not None, context=context)
+                for name, objects in related.items():
+                    serializer.fields[name].queryset = objects
+                _save(serializer, result, saved)
+
+        if any(result["status"] != "ok" for result in results):
+            transaction.set_rollback(True)
+            for result in results:
+                result.pop("row", None)
+            return results, False
+
+    # tokens are taken from the stored rows, as the rows API does
+    stored = Model._default_manager.in_bulk([obj.pk for _, obj in saved])
+    for result, obj in saved:
+        result["id"] = obj.pk
+        if obj.pk in stored:
+            result["version"] = row_version(stored[obj.pk])
+
+    return results, True
@@ -0,0 +1,107 @@
+"""
+Cached reference-data bundles for the admin Excel views.
+
+Small tables the grids need in full (receipt heads, payment types, banks,
+TDS sections and rates) are serialized to JSON once per version of their
+source models and kept in the default cache. Saves and deletes of those
+models bump their DataVersion scope (signals.VERSIONED_MODELS), so a changed
+table gets a new cache key and the Excel page a new bundle URL, while an
+unchanged bundle is reused from the browser cache across grid pages.
+
+Cache errors are logged and the bundle is built as if nothing was cached.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
+
+from .models import Bank, PaymentType, ReceiptHead, TDSRate, TDSSection
+from .versions import get_versions, model_scope
+
+
+logger = logging.getLogger("project_portal")
+
+
+class Bundle:
+    def __init__(self, models, build):
+        self.models = models
+        self.build = build
+
+    @property
+    def scopes(self):
+        return [model_scope(name) for name in self.models]
+
+
+BUNDLES = {
+    "receipt_heads": Bundle(
+        ["receipthead"],
+        lambda: list(ReceiptHead.objects.values("id", "name").order_by("name")),
+    ),
+    "payment_types": Bundle(
+        ["paymenttype"],
+        lambda: list(PaymentType.objects.values("id", "name").order_by("name")),
+    ),
+    "banks": Bundle(
+        ["bank"],
+        lambda: list(Bank.objects.filter(is_active=True).values("id", "short_no", "bank_name").order_by("short_no")),
+    ),
+    "tds_sections": Bundle(
+        ["tdssection"],
+        lambda: list(TDSSection.objects.values("id", "section").order_by("section")),
+    ),
+    "tds_rates": Bundle(
+        ["tdsrate"],
+        lambda: [
+            {"id": pk, "section_id": section_id, "percent": float(percent)}
+            for pk, section_id, percent in TDSRate.objects.values_list("id", "section_id", "percent")
+        ],
+    ),
+}
+
+
+def bundle_key(name, version):
+    return f"bundle:{name}:{version}"
+
+
+def bundle_versions(names):
+    """{name: version string} of the bundles, from one DataVersion query."""
+    scopes = {scope for name in names for scope in BUNDLES[name].scopes}
+    versions, _ = get_versions(scopes)
+    return {
+        name: ".".join(str(versions[scope]) for scope in BUNDLES[name].scopes)
+        for name in names
+    }
+
+
+def get_bundle_json(name, version):
+    """Serialized bundle `name` at `version`; read the version before calling."""
+    key = bundle_key(name, version)
+
+    try:
+        data = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Bundle cache read failed for {key}: {e}")
+        data = None
+
+    if data is not None:
+        return data
+
+    data = json.dumps(BUNDLES[name].build(), cls=DjangoJSONEncoder)
+
+    try:
+        cache.set(key, data, settings.LOOKUP_BUNDLE_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Bundle cache write failed for {key}: {e}")
+
+    return data
+
+
+def bundle_urls(names):
+    """{name: versioned URL} for the Excel page; a new version means a new URL."""
+    return {
+        name: f"{reverse('api_bundle', args=[name])}?v={version}"
+        for name, version in bundle_versions(names).items()
+    }
@@ -0,0 +1,111 @@
+"""
+Cheque letters: one letter per (bank, cheque no) listing the payments paid
+with that cheque. cheque_letter_view shows a single letter for printing;
+ChequeLetterJob renders every letter of a date range or a list of cheque
+numbers in the background (tasks.run_cheque_letter_job), to one merged PDF
+or a ZIP with one PDF per letter.
+
+Letter totals are summed in SQL and the payments of all letters are read
+with one query. PDFs are rendered from admin/cheque_letter_pdf.html with
+xhtml2pdf.
+"""
+import io
+import urllib.parse
+import zipfile
+from datetime import date
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db.models import Count, Sum
+from django.template.loader import render_to_string
+from django.utils.text import get_valid_filename
+
+from .models import Bank, Payment
+
+
+def letter_payments(bank_id=None, date_from=None, date_to=None, cheque_nos=None):
+    """Payments that belong on a cheque letter, narrowed by bank, date range and cheque numbers."""
+    payments = Payment.objects.filter(bank__isnull=False, cheque_no__isnull=False).exclude(cheque_no="")
+
+    if bank_id:
+        payments = payments.filter(bank_id=bank_id)
+    if date_from:
+        payments = payments.filter(date__gte=date_from)
+    if date_to:
+        payments = payments.filter(date__lte=date_to)
+    if cheque_nos:
+        payments = payments.filter(cheque_no__in=cheque_nos)
+
+    return payments
+
+
+def letter_totals(payments):
+    """(bank_id, cheque_no, total_amount, payment_count) per letter, from one grouped query."""
+    return (
+        payments.order_by()
+        .values("bank_id", "cheque_no")
+        .annotate(total_amount=Sum("net_amount"), payment_count=Count("id"))
+        .order_by("bank_id", "cheque_no")
+    )
+
+
+def build_letters(payments):
+    """Context of each letter: bank, cheque_no, payments, total_amount, bank_account_no."""
+    totals = list(letter_totals(payments))
+    banks = Bank.objects.in_bulk({row["bank_id"] for row in totals})
+
+    grouped = {}
+    for payment in payments.select_related("payee", "head").order_by("bank_id", "cheque_no", "id"):
+        grouped.setdefault((payment.bank_id, payment.cheque_no), []).append(payment)
+
+    letters = []
+    for row in totals:
+        bank = banks[row["bank_id"]]
+        letters.append({
+            "bank": bank,
+            "cheque_no": row["cheque_no"],
+            "payments": grouped.get((row["bank_id"], row["cheque_no"]), []),
+            "total_amount": row["total_amount"] or 0,
+            "bank_account_no": bank.account_no or "",
+        })
+    return letters
+
+
+def letter_filename(letter):
+    return get_valid_filename(f"cheque_letter_{letter['bank'].short_no}_{letter['cheque_no']}.pdf")
+
+
+def _link_callback(uri, rel):
+    # xhtml2pdf reads images from disk, not over HTTP
+    if uri.startswith(settings.STATIC_URL):
+        return finders.find(urllib.parse.unquote(uri[len(settings.STATIC_URL):])) or uri
+    return uri
+
+
+def render_letters_pdf(letters):
+    """One PDF with a page per letter."""
+    from xhtml2pdf import pisa
+
+    html = render_to_string("admin/cheque_letter_pdf.html", {
+        "letters": letters,
+        "today": date.today().strftime("%d-%b-%Y"),
+    })
+
+    output = io.BytesIO()
+    result = pisa.CreatePDF(html, dest=output, link_callback=_link_callback)
+    if result.err:
+        raise ValueError(f"PDF rendering failed with {result.err} error(s)")
+    return output.getvalue()
+
+
+def render_letters_zip(letters, on_progress=None):
+    """A ZIP with one PDF per letter; on_progress(done) is called after each one."""
+    output = io.BytesIO()
+
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for done, letter in enumerate(letters, start=1):
+            archive.writestr(letter_filename(letter), render_letters_pdf([letter]))
+            if on_progress:
+                on_progress(done)
+
+    return output.getvalue()
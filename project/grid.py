@@ -0,0 +1,230 @@
+"""
+Server-side rows for the admin Excel (AG-Grid) views.
+
+The grids use AG-Grid's infinite row model: they ask `api/<model>/rows/`
+for one block of rows at a time together with their sort and filter model,
+and the block is sorted, filtered and sliced in SQL. Only concrete columns
+of the model (and GRID_COLUMN_ALIASES) can be sorted or filtered on; foreign
+key columns sort and filter on the label the grid shows for them
+(GRID_FK_LABELS) and are left out when there is none.
+"""
+import json
+
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.db.models import Q
+
+
+GRID_BLOCK_SIZE = 100
+GRID_MAX_BLOCK_SIZE = 500
+
+# grid columns that are not model fields -> the column they display
+GRID_COLUMN_ALIASES = {
+    "grant_short": "funding_short_no",
+    "seed_grant_short": "funding_short_no",
+    "tdg_grant_short": "funding_short_no",
+    "short_no": "funding_short_no",
+    "project_no_display": "project__project_no",
+    "project_short_no_display": "project__project_short_no",
+}
+
+# related model -> column the grid displays for a foreign key to it
+GRID_FK_LABELS = {
+    "Project": "project_short_no",
+    "SeedGrant": "short_no",
+    "TDGGrant": "short_no",
+    "ReceiptHead": "name",
+    "PaymentType": "name",
+    "Bank": "short_no",
+    "Payee": "name_of_payee",
+    "Faculty": "pi_name",
+}
+
+TEXT_LOOKUPS = {
+    "equals": "iexact",
+    "contains": "icontains",
+    "startsWith": "istartswith",
+    "endsWith": "iendswith",
+}
+
+VALUE_LOOKUPS = {
+    "equals": "exact",
+    "lessThan": "lt",
+    "lessThanOrEqual": "lte",
+    "greaterThan": "gt",
+    "greaterThanOrEqual": "gte",
+}
+
+NEGATED_TYPES = {
+    "notEqual": "equals",
+    "notContains": "contains",
+}
+
+
+class GridRequestError(ValueError):
+    pass
+
+
+def _concrete_field(Model, name):
+    try:
+        field = Model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.concrete else None
+
+
+def _resolve_path(Model, path):
+    root, _, rest = path.partition("__")
+
+    field = _concrete_field(Model, root)
+    if field is None:
+        return None
+
+    if not rest:
+        if not field.is_relation:
+            return field.attname
+
+        # the grid filters a foreign key by the text it shows, not by its id
+        label = GRID_FK_LABELS.get(field.related_model.__name__)
+        return f"{field.name}__{label}" if label else None
+
+    if not field.many_to_one or "__" in rest or _concrete_field(field.related_model, rest) is None:
+        return None
+    return path
+
+
+def resolve_column(Model, col_id):
+    """ORM path behind a grid column, or None when it cannot be sorted / filtered in SQL."""
+    for path in (col_id, GRID_COLUMN_ALIASES.get(col_id)):
+        resolved = path and _resolve_path(Model, path)
+        if resolved:
+            return resolved
+    return None
+
+
+def _load_json(value, default):
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except ValueError:
+        raise GridRequestError("Invalid JSON in sort / filter model")
+
+
+def parse_block(params):
+    """(start, end) of the requested block, capped at GRID_MAX_BLOCK_SIZE rows."""
+    try:
+        start = int(params.get("start_row", 0))
+        end = int(params.get("end_row", start + GRID_BLOCK_SIZE))
+    except ValueError:
+        raise GridRequestError("start_row and end_row must be integers")
+
+    if start < 0 or end <= start:
+        raise GridRequestError("end_row must be greater than start_row")
+
+    return start, min(end, start + GRID_MAX_BLOCK_SIZE)
+
+
+def _date(value):
+    # the date filter sends "YYYY-MM-DD hh:mm:ss"
+    return value[:10] if value else value
+
+
+def _condition_q(path, condition):
+    kind = condition.get("type")
+    filter_type = condition.get("filterType", "text")
+
+    if kind in ("blank", "notBlank"):
+        q = Q(**{f"{path}__isnull": True})
+        if filter_type == "text":
+            q |= Q(**{path: ""})
+        return ~q if kind == "notBlank" else q
+
+    negate = kind in NEGATED_TYPES
+    kind = NEGATED_TYPES.get(kind, kind)
+
+    if filter_type == "date":
+        value, value_to = _date(condition.get("dateFrom")), _date(condition.get("dateTo"))
+    else:
+        value, value_to = condition.get("filter"), condition.get("filterTo")
+
+    if kind == "inRange":
+        # AG-Grid's inRange excludes both ends
+        q = Q(**{f"{path}__gt": value, f"{path}__lt": value_to})
+    else:
+        lookups = TEXT_LOOKUPS if filter_type == "text" else VALUE_LOOKUPS
+        if kind not in lookups:
+            raise GridRequestError(f"Unsupported {filter_type} filter: {kind}")
+        q = Q(**{f"{path}__{lookups[kind]}": value})
+
+    return ~q if negate else q
+
+
+def _filter_q(path, model):
+    conditions = model.get("conditions")
+    if conditions is None:
+        return _condition_q(path, model)
+
+    q = Q()
+    for condition in conditions:
+        condition = {"filterType": model.get("filterType", "text"), **condition}
+        if model.get("operator") == "OR":
+            q |= _condition_q(path, condition)
+        else:
+            q &= _condition_q(path, condition)
+    return q
+
+
+def apply_filter_model(queryset, filter_model):
+    """Filter queryset by AG-Grid's filterModel ({colId: filter})."""
+    for col_id, model in filter_model.items():
+        path = resolve_column(queryset.model, col_id)
+        if path is None:
+            raise GridRequestError(f"Cannot filter on {col_id}")
+        try:
+            queryset = queryset.filter(_filter_q(path, model))
+        except FieldError as e:
+            raise GridRequestError(f"Cannot filter on {col_id}: {e}")
+    return queryset
+
+
+def apply_sort_model(queryset, sort_model):
+    """Order queryset by AG-Grid's sortModel ([{colId, sort}]), ties broken by the pk."""
+    ordering = []
+    for item in sort_model:
+        path = resolve_column(queryset.model, item.get("colId", ""))
+        if path is None:
+            raise GridRequestError(f"Cannot sort on {item.get('colId')}")
+        ordering.append(f"-{path}" if item.get("sort") == "desc" else path)
+
+    if not ordering:
+        # blocks are sliced separately, so even the default order must be total
+        ordering = [
+            name for name in (queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(name, str)
+        ]
+
+    pk_name = queryset.model._meta.pk.name
+    if pk_name not in [name.lstrip("-") for name in ordering]:
+        ordering.append(f"-{pk_name}")
+
+    try:
+        return queryset.order_by(*ordering)
+    except FieldError as e:
+        raise GridRequestError(f"Cannot sort: {e}")
+
+
+def grid_block(queryset, params):
+    """
+    Rows of one requested block and the grid's lastRow: the total row count
+    once the last block is reached, else None (AG-Grid keeps scrolling).
+    """
+    start, end = parse_block(params)
+
+    queryset = apply_filter_model(queryset, _load_json(params.get("filter_model"), {}))
+    queryset = apply_sort_model(queryset, _load_json(params.get("sort_model"), []))
+
+    # one extra row tells whether another block follows, without a COUNT
+    rows = list(queryset[start:end + 1])
+    if len(rows) > end - start:
+        return rows[:end - start], None
+    return rows, start + len(rows)
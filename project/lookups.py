@@ -0,0 +1,156 @@
+"""
+Paged, typeahead-searchable lookup lists for the admin Excel views.
+
+Instead of getting every project, grant, payee, faculty and open commitment
+inline in the page, the grids ask `api/lookups/<name>/` for the entries
+referenced by the rows they show (?ids=1,2) and for matches while a cell is
+edited (?q=text&page=2). `choices` only limits what can be picked; ids of
+existing references always resolve. Amounts are sent as strings, like the
+serializers' DecimalFields, so they keep their exact value.
+"""
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Cast
+
+from .models import Commitment, Faculty, Payee, Project, SeedGrant, TDGGrant
+
+
+LOOKUP_PAGE_SIZE = 20
+LOOKUP_MAX_IDS = 500
+
+
+class Lookup:
+    """
+    `models` are the model names whose changes alter the entries, for the
+    lookup API's ETag (see project/versions.py).
+    """
+
+    def __init__(self, queryset, models, fields, search_fields, ordering, key="id", filters=(), choices=None):
+        self.queryset = queryset
+        self.models = models
+        self.fields = fields
+        self.search_fields = search_fields
+        self.ordering = ordering
+        self.key = key
+        self.filters = filters
+        self.choices = choices
+
+    def rows(self):
+        return self.queryset().order_by(*self.ordering).values(*self.fields)
+
+
+def _grants(Model):
+    return lambda: Model.objects.annotate(
+        end_date_str=Cast("end_date", models.CharField()),
+        extended_end_date_str=Cast("extended_end_date", models.CharField()),
+        pi_email=F("faculty__email"),
+    )
+
+
+GRANT_FIELDS = [
+    "id", "short_no", "grant_no", "pi_name", "pi_email",
+    "end_date_str", "extended_end_date_str", "is_extended", "project_status",
+]
+
+
+LOOKUPS = {
+    "projects": Lookup(
+        lambda: Project.objects.annotate(
+            end_date_str=Cast("project_end_date", models.CharField()),
+            extended_end_date_str=Cast("extended_end_date", models.CharField()),
+            pi_email=F("faculty__email"),
+        ),
+        models=["project", "faculty"],
+        fields=[
+            "id", "project_short_no", "project_no", "pi_name", "pi_email",
+            "end_date_str", "extended_end_date_str", "project_status",
+        ],
+        search_fields=["project_short_no", "project_no", "pi_name"],
+        ordering=["project_short_no"],
+    ),
+    "seed_grants": Lookup(
+        _grants(SeedGrant),
+        models=["seedgrant", "faculty"],
+        fields=GRANT_FIELDS,
+        search_fields=["short_no", "grant_no", "pi_name"],
+        ordering=["short_no"],
+    ),
+    "tdg_grants": Lookup(
+        _grants(TDGGrant),
+        models=["tdggrant", "faculty"],
+        fields=GRANT_FIELDS,
+        search_fields=["short_no", "grant_no", "pi_name"],
+        ordering=["short_no"],
+    ),
+    "payees": Lookup(
+        lambda: Payee.objects.all(),
+        models=["payee"],
+        fields=["id", "name_of_payee", "bank_name", "branch", "account_number", "ifsc", "pan", "email"],
+        search_fields=["name_of_payee", "pan", "emp_code"],
+        ordering=["name_of_payee"],
+    ),
+    "faculties": Lookup(
+        lambda: Faculty.objects.all(),
+        models=["faculty"],
+        fields=["faculty_id", "pi_name", "department"],
+        search_fields=["faculty_id", "pi_name", "department"],
+        ordering=["pi_name"],
+        key="faculty_id",
+    ),
+    "commitments": Lookup(
+        lambda: Commitment.objects.with_paid_totals().annotate(remaining_amount=F("gross_amount") - F("paid_total")),
+        models=["commitment", "payment"],
+        fields=["id", "commitment_code", "seed_grant", "tdg_grant", "project", "gross_amount", "remaining_amount"],
+        search_fields=["commitment_code", "particulars"],
+        ordering=["commitment_code"],
+        filters=["seed_grant", "tdg_grant", "project"],
+        choices=Q(status="OPEN"),
+    ),
+}
+
+
+def _json_row(row):
+    return {field: str(value) if isinstance(value, Decimal) else value for field, value in row.items()}
+
+
+def lookup_page(name, params):
+    """
+    {"results": [...], "has_more": bool} for one lookup. With ?ids= the
+    entries with those keys, else page ?page= of the choices matching ?q=.
+    """
+    lookup = LOOKUPS[name]
+    rows = lookup.rows()
+
+    ids = [value for value in params.get("ids", "").split(",") if value]
+    if ids:
+        results = rows.filter(**{f"{lookup.key}__in": ids[:LOOKUP_MAX_IDS]})
+        return {"results": [_json_row(row) for row in results], "has_more": False}
+
+    if lookup.choices is not None:
+        rows = rows.filter(lookup.choices)
+
+    for field in lookup.filters:
+        value = params.get(field)
+        if value:
+            rows = rows.filter(**{field: value})
+
+    q = params.get("q", "").strip()
+    if q:
+        q_obj = Q()
+        for field in lookup.search_fields:
+            q_obj |= Q(**{f"{field}__icontains": q})
+        rows = rows.filter(q_obj)
+
+    try:
+        page = max(int(params.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    start = (page - 1) * LOOKUP_PAGE_SIZE
+    results = list(rows[start:start + LOOKUP_PAGE_SIZE + 1])
+    return {
+        "results": [_json_row(row) for row in results[:LOOKUP_PAGE_SIZE]],
+        "has_more": len(results) > LOOKUP_PAGE_SIZE,
+    }
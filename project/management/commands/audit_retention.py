@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from project.audit import (
+    add_months,
+    archive_audit_month,
+    audit_months_before,
+    drop_audit_month,
+    ensure_audit_partitions,
+    is_auditlog_partitioned,
+    month_start,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive audit log months older than --months to gzipped JSONL under backups/ "
+        "and drop them. On PostgreSQL also creates the monthly partitions ahead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=24, help="Months of audit log to keep (default 24)")
+        parser.add_argument("--archive-dir", default=str(Path(settings.BASE_DIR) / "backups" / "auditlog"))
+        parser.add_argument("--months-ahead", type=int, default=3, help="Partitions to create ahead (PostgreSQL)")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        keep = options["months"]
+        if keep < 1:
+            raise CommandError("--months must be at least 1")
+
+        archive_dir = Path(options["archive_dir"])
+        dry_run = options["dry_run"]
+        partitioned = is_auditlog_partitioned()
+
+        cutoff = add_months(month_start(datetime.now(timezone.utc)), -keep)
+        months = audit_months_before(cutoff)
+
+        self.stdout.write(f"Keeping audit log from {cutoff:%Y-%m}; {len(months)} month(s) to archive")
+
+        for month in months:
+            if dry_run:
+                self.stdout.write(f"  would archive and drop {month:%Y-%m}")
+                continue
+
+            path, archived = archive_audit_month(month, archive_dir)
+            dropped, deleted = drop_audit_month(month)
+
+            detail = "partition dropped" if dropped else f"{deleted} row(s) deleted"
+            self.stdout.write(f"  {month:%Y-%m}: {archived} row(s) archived to {path}, {detail}")
+
+        if partitioned and not dry_run:
+            created = ensure_audit_partitions(options["months_ahead"])
+            if created:
+                self.stdout.write(f"Created partitions: {', '.join(created)}")
+
+        self.stdout.write(self.style.SUCCESS("Audit retention finished"))
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from project.querysets import QUERY_PLANS
+from project.views import EXPORT_CONFIG, GenericModelAPIView, export_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize a small and a large page of every model in the query plan registry "
+        "(and export the exportable ones) and fail if the query count depends on page size. "
+        "Runs against real data; project.tests.QueryPlanTests checks the same on seeded fixtures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--small", type=int, default=2)
+        parser.add_argument("--large", type=int, default=50)
+        parser.add_argument("--model", action="append", help="Only check these models (repeatable)")
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return len(ctx.captured_queries)
+
+    def handle(self, *args, **options):
+        small, large = options["small"], options["large"]
+        if small >= large:
+            raise CommandError("--small must be lower than --large")
+
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+
+        models = options["model"] or list(QUERY_PLANS)
+        failures = []
+
+        for model_name in models:
+            plan = QUERY_PLANS.get(model_name)
+            if plan is None:
+                raise CommandError(f"No query plan for '{model_name}'")
+
+            checks = []
+            _, Serializer = GenericModelAPIView.MODEL_CONFIG[model_name]
+            checks.append(("list", lambda size: Serializer(
+                list(plan.apply().order_by("pk")[:size]), many=True, context={"request": request},
+            ).data))
+
+            if model_name in EXPORT_CONFIG:
+                Resource = EXPORT_CONFIG[model_name][1]
+                checks.append(("export", lambda size: list(
+                    export_rows(Resource(), plan.apply(purpose="export").order_by("pk")[:size])
+                )))
+
+            rows = plan.model.objects.count()
+
+            for label, run in checks:
+                small_count = self.count_queries(lambda: run(small))
+                large_count = self.count_queries(lambda: run(large))
+                line = f"{model_name:<28} {label:<7} rows={rows:<7} queries {small_count} / {large_count}"
+
+                if rows <= small:
+                    self.stdout.write(self.style.WARNING(f"{line}  (not enough rows to compare)"))
+                elif small_count != large_count:
+                    failures.append(model_name)
+                    self.stdout.write(self.style.ERROR(f"{line}  FAIL"))
+                else:
+                    self.stdout.write(f"{line}  ok")
+
+        if failures:
+            raise CommandError(f"Query count grows with page size for: {', '.join(sorted(set(failures)))}")
+
+        self.stdout.write(self.style.SUCCESS("Query counts are constant"))
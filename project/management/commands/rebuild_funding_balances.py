@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from project.services import FUNDING_MODELS, rebuild_funding_head_balances, rebuild_all_funding_head_balances
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FundingHeadBalance table from payments, commitments, receipts and sanctions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--funding-type", choices=list(FUNDING_MODELS.keys()))
+        parser.add_argument("--funding-id", type=int)
+        parser.add_argument(
+            "--missing", action="store_true",
+            help="Without --funding-type, only rebuild the funding sources that have no balance rows",
+        )
+
+    def handle(self, *args, **options):
+        funding_type = options.get("funding_type")
+        funding_id = options.get("funding_id")
+
+        if funding_id and not funding_type:
+            raise CommandError("--funding-id needs --funding-type")
+
+        if funding_type and funding_id:
+            rebuild_funding_head_balances(funding_type, funding_id)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt balances for {funding_type}-{funding_id}"))
+            return
+
+        if funding_type:
+            ids = list(FUNDING_MODELS[funding_type].objects.values_list("id", flat=True))
+            for pk in ids:
+                rebuild_funding_head_balances(funding_type, pk)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt balances for {len(ids)} {funding_type} source(s)"))
+            return
+
+        count = rebuild_all_funding_head_balances(missing_only=options["missing"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt balances for {count} funding source(s)"))
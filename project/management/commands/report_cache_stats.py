@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from project.report_cache import report_cache_stats, reset_report_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show the hit / miss counters of the funding report cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = report_cache_stats()
+        rate = f"{stats['hit_rate']:.1%}" if stats["hit_rate"] is not None else "-"
+
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']} hit rate={rate}")
+
+        if options["reset"]:
+            reset_report_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
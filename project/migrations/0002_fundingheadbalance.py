@@ -0,0 +1,99 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:32
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+BALANCE_COLUMNS = ["sanction_amount", "receipt_amount", "paid_amount", "committed_amount", "committed_remaining"]
+
+FUNDING_FIELDS = [("PROJECT", "project_id"), ("SEED", "seed_grant_id"), ("TDG", "tdg_grant_id")]
+
+
+def _head_name(name):
+    return name.strip() if name else "Unknown"
+
+
+def backfill_funding_head_balances(apps, schema_editor):
+    """
+    Fill FundingHeadBalance for every funding source from the ledger, with
+    the grouped sums of services.compute_funding_head_totals taken over all
+    sources at once. Saves only apply deltas to these rows afterwards.
+    """
+    FundingHeadBalance = apps.get_model("project", "FundingHeadBalance")
+    Payment = apps.get_model("project", "Payment")
+    Commitment = apps.get_model("project", "Commitment")
+    ReceiptAllocation = apps.get_model("project", "ReceiptAllocation")
+    ProjectSanctionDistribution = apps.get_model("project", "ProjectSanctionDistribution")
+
+    totals = defaultdict(lambda: dict.fromkeys(BALANCE_COLUMNS, Decimal("0.00")))
+
+    def grouped(queryset, prefix, head, amount):
+        fields = [prefix + field for _, field in FUNDING_FIELDS]
+        return queryset.values(*fields, head).annotate(total=Sum(amount))
+
+    def add(rows, column, prefix, head, sign=1):
+        for row in rows:
+            key = next(
+                ((funding_type, row[prefix + field]) for funding_type, field in FUNDING_FIELDS if row.get(prefix + field)),
+                None,
+            )
+            if key:
+                totals[(*key, _head_name(row[head]))][column] += sign * (row["total"] or Decimal("0.00"))
+
+    add(
+        ProjectSanctionDistribution.objects.values("project_id", "head__name").annotate(total=Sum("sanctioned_amount")),
+        "sanction_amount", "", "head__name",
+    )
+    add(grouped(ReceiptAllocation.objects.all(), "receipt__", "head__name", "amount"), "receipt_amount", "receipt__", "head__name")
+    add(grouped(Payment.objects.all(), "", "head__name", "amount"), "paid_amount", "", "head__name")
+
+    commitments = list(grouped(Commitment.objects.all(), "", "head", "gross_amount"))
+    add(commitments, "committed_amount", "", "head")
+    add(commitments, "committed_remaining", "", "head")
+    add(
+        grouped(Payment.objects.filter(commitment__isnull=False), "commitment__", "commitment__head", "amount"),
+        "committed_remaining", "commitment__", "commitment__head", sign=-1,
+    )
+
+    FundingHeadBalance.objects.bulk_create(
+        [
+            FundingHeadBalance(funding_type=funding_type, funding_id=funding_id, head=head, **values)
+            for (funding_type, funding_id, head), values in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundingHeadBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('funding_type', models.CharField(choices=[('PROJECT', 'Project'), ('SEED', 'Seed Grant'), ('TDG', 'TDG Grant')], max_length=20)),
+                ('funding_id', models.PositiveIntegerField()),
+                ('head', models.CharField(max_length=100)),
+                ('sanction_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('receipt_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('committed_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('committed_remaining', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Funding Head Balance',
+                'verbose_name_plural': 'Funding Head Balances',
+                'ordering': ['funding_type', 'funding_id', 'head'],
+                'constraints': [models.UniqueConstraint(fields=('funding_type', 'funding_id', 'head'), name='unique_funding_head_balance')],
+            },
+        ),
+        migrations.RunPython(backfill_funding_head_balances, migrations.RunPython.noop),
+    ]
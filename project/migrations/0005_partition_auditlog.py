@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations
+
+
+TABLE = "project_auditlog"
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_auditlog(apps, schema_editor):
+    """
+    Rebuild project_auditlog as a table range-partitioned by month on
+    "timestamp". PostgreSQL only; other backends keep the plain table.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_old"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{TABLE}_old" INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE ("timestamp")'
+        )
+
+        # the primary key has to include the partition key
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY ("id", "timestamp")')
+
+        cursor.execute(f'CREATE SEQUENCE "{TABLE}_part_id_seq" OWNED BY "{TABLE}"."id"')
+        cursor.execute(
+            f'SELECT setval(\'"{TABLE}_part_id_seq"\', COALESCE((SELECT MAX("id") FROM "{TABLE}_old"), 0) + 1, false)'
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{TABLE}_part_id_seq"\')'
+        )
+
+        cursor.execute(f'SELECT MIN("timestamp") FROM "{TABLE}_old"')
+        first = cursor.fetchone()[0] or datetime.now(timezone.utc)
+        now = datetime.now(timezone.utc)
+
+        month = datetime(first.year, first.month, 1, tzinfo=timezone.utc)
+        last = _add_months(datetime(now.year, now.month, 1, tzinfo=timezone.utc), MONTHS_AHEAD)
+
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_p{month:%Y%m}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+                [month, _add_months(month, 1)],
+            )
+            month = _add_months(month, 1)
+
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{TABLE}_old"')
+        cursor.execute(f'DROP TABLE "{TABLE}_old"')
+
+        cursor.execute(
+            f'CREATE INDEX "auditlog_model_obj_ts_idx" ON "{TABLE}" ("model_name", "object_id", "timestamp")'
+        )
+        cursor.execute(f'CREATE INDEX "auditlog_user_ts_idx" ON "{TABLE}" ("user_id", "timestamp")')
+        cursor.execute(f'CREATE INDEX "auditlog_ts_idx" ON "{TABLE}" ("timestamp")')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_user_id_fk" FOREIGN KEY ("user_id") '
+            f'REFERENCES "{user_table}" ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0004_auditlog_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # the partitioned table has the same columns, so unapplying leaves it in place
+        migrations.RunPython(partition_auditlog, migrations.RunPython.noop),
+    ]
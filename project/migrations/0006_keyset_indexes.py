@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0005_partition_auditlog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commitment',
+            index=models.Index(fields=['-bill_date', '-id'], name='commitment_bill_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenditure',
+            index=models.Index(fields=['-bill_date', '-id'], name='expenditure_bill_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['date', 'id'], name='payment_date_id_idx'),
+        ),
+    ]
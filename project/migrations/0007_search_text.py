@@ -0,0 +1,113 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:55
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+FUNDING_SEARCH_FIELDS = {
+    "seed_grant": ("SeedGrant", ["grant_no", "short_no"]),
+    "tdg_grant": ("TDGGrant", ["grant_no", "short_no"]),
+    "project": ("Project", ["project_no", "project_short_no"]),
+}
+
+FUNDED_MODELS = ["Payment", "Commitment", "Expenditure", "Receipt"]
+
+SEARCH_TEXT_MODELS = FUNDED_MODELS + ["BillInward"]
+
+# master tables searched with icontains on their own columns
+TRIGRAM_COLUMNS = {
+    "SeedGrant": ["grant_no", "short_no", "pi_name"],
+    "TDGGrant": ["grant_no", "short_no", "pi_name"],
+    "Project": ["project_no", "project_short_no", "pi_name"],
+    "Payee": ["name_of_payee", "pan", "emp_code"],
+}
+
+
+def _join(values):
+    return " ".join(str(value) for value in values if value).lower()
+
+
+def fill_search_text(apps, schema_editor):
+    for relation, (source_name, fields) in FUNDING_SEARCH_FIELDS.items():
+        Source = apps.get_model("project", source_name)
+
+        for row in Source.objects.values_list("pk", *fields).iterator():
+            text = _join(row[1:])
+            for model_name in FUNDED_MODELS:
+                apps.get_model("project", model_name).objects.filter(**{f"{relation}_id": row[0]}).update(search_text=text)
+
+    BillInward = apps.get_model("project", "BillInward")
+    bills = []
+    for pk, project_no, pi_name, received_from in BillInward.objects.values_list(
+        "pk", "project_no", "pi_name", "received_from"
+    ).iterator():
+        bills.append(BillInward(pk=pk, search_text=_join([project_no, pi_name, received_from])))
+    BillInward.objects.bulk_update(bills, ["search_text"], batch_size=1000)
+
+
+def _trigram_indexes(apps):
+    for model_name in SEARCH_TEXT_MODELS:
+        table = apps.get_model("project", model_name)._meta.db_table
+        yield f"{table}_search_trgm", f'"{table}" USING gin ("search_text" gin_trgm_ops)'
+
+    # icontains on PostgreSQL compares UPPER(col::text)
+    for model_name, columns in TRIGRAM_COLUMNS.items():
+        Model = apps.get_model("project", model_name)
+        table = Model._meta.db_table
+        for name in columns:
+            column = Model._meta.get_field(name).column
+            yield f"{table}_{column}_trgm", f'"{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for name, target in _trigram_indexes(apps):
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON {target}')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for name, _ in _trigram_indexes(apps):
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='billinward',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='commitment',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='expenditure',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
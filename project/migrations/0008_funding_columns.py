@@ -0,0 +1,145 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:59
+
+from django.db import migrations, models
+
+
+FUNDING_SOURCES = {
+    "project": ("Project", "PROJECT", "project_short_no"),
+    "seed_grant": ("SeedGrant", "SEED", "short_no"),
+    "tdg_grant": ("TDGGrant", "TDG", "short_no"),
+}
+
+FUNDED_MODELS = ["Payment", "Commitment", "Expenditure", "Receipt", "FundRequest"]
+
+
+def fill_funding_columns(apps, schema_editor):
+    # same precedence as FundingColumnsMixin: project, then seed grant, then TDG grant
+    for model_name in FUNDED_MODELS:
+        Model = apps.get_model("project", model_name)
+        claimed = models.Q()
+
+        for relation, (source_name, funding_type, short_field) in FUNDING_SOURCES.items():
+            Source = apps.get_model("project", source_name)
+            rows = Model.objects.filter(**{f"{relation}__isnull": False}).exclude(claimed)
+
+            for pk, short_no in Source.objects.values_list("pk", short_field).iterator():
+                rows.filter(**{f"{relation}_id": pk}).update(
+                    funding_type=funding_type, funding_id=pk, funding_short_no=short_no,
+                )
+            claimed |= models.Q(**{f"{relation}__isnull": False})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0007_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commitment',
+            name='funding_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='commitment',
+            name='funding_short_no',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='commitment',
+            name='funding_type',
+            field=models.CharField(blank=True, choices=[('PROJECT', 'Project'), ('SEED', 'Seed Grant'), ('TDG', 'TDG Grant')], editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='expenditure',
+            name='funding_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='expenditure',
+            name='funding_short_no',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='expenditure',
+            name='funding_type',
+            field=models.CharField(blank=True, choices=[('PROJECT', 'Project'), ('SEED', 'Seed Grant'), ('TDG', 'TDG Grant')], editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='fundrequest',
+            name='funding_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='fundrequest',
+            name='funding_short_no',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='fundrequest',
+            name='funding_type',
+            field=models.CharField(blank=True, choices=[('PROJECT', 'Project'), ('SEED', 'Seed Grant'), ('TDG', 'TDG Grant')], editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='funding_short_no',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='funding_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='funding_short_no',
+            field=models.CharField(blank=True, editable=False, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='funding_type',
+            field=models.CharField(blank=True, choices=[('PROJECT', 'Project'), ('SEED', 'Seed Grant'), ('TDG', 'TDG Grant')], editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(fill_funding_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='commitment',
+            index=models.Index(fields=['funding_type', 'funding_id', 'date'], name='commitment_funding_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commitment',
+            index=models.Index(fields=['funding_short_no'], name='commitment_funding_short_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenditure',
+            index=models.Index(fields=['funding_type', 'funding_id', 'date'], name='expenditure_funding_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenditure',
+            index=models.Index(fields=['funding_short_no'], name='expenditure_funding_short_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundrequest',
+            index=models.Index(fields=['funding_type', 'funding_id', 'request_date'], name='fundrequest_funding_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundrequest',
+            index=models.Index(fields=['funding_short_no'], name='fundrequest_funding_short_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['funding_type', 'funding_id', 'date'], name='payment_funding_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['funding_short_no'], name='payment_funding_short_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['funding_type', 'funding_id', 'receipt_date'], name='receipt_funding_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['funding_short_no'], name='receipt_funding_short_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:08
+
+from django.db import migrations, models
+
+
+def _normalize_head(text):
+    # frozen copy of project.reports.normalize_head
+    text = (text or "").strip().lower()
+    return text[:-1] if text.endswith("s") and len(text) > 1 else text
+
+
+def fill_head_key(apps, schema_editor):
+    for model_name in ("Expenditure", "Commitment"):
+        Model = apps.get_model("project", model_name)
+        for head in Model.objects.order_by().values_list("head", flat=True).distinct().iterator():
+            Model.objects.filter(head=head).update(head_key=_normalize_head(head))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0009_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commitment',
+            name='head_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='expenditure',
+            name='head_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_head_key, migrations.RunPython.noop),
+    ]
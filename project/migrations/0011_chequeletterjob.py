@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0010_head_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChequeLetterJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_from', models.DateField(blank=True, null=True)),
+                ('date_to', models.DateField(blank=True, null=True)),
+                ('cheque_nos', models.JSONField(blank=True, default=list)),
+                ('output_format', models.CharField(choices=[('pdf', 'Single merged PDF'), ('zip', 'ZIP of PDFs')], default='pdf', max_length=3)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCESS', 'Success'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('total_letters', models.PositiveIntegerField(default=0)),
+                ('processed_letters', models.PositiveIntegerField(default=0)),
+                ('file', models.FileField(blank=True, upload_to='cheque_letters/')),
+                ('summary', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('bank', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='project.bank')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cheque Letter Job',
+                'verbose_name_plural': 'Cheque Letter Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
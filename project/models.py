@@ -10,20 +10,163 @@ import re
 from django.core.validators import RegexValidator
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 from django.db import transaction
 import random
-from django.db.models import Sum
+from django.db.models import Sum, OuterRef, Subquery, Value
 from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db import IntegrityError
 import logging
+from .taxes import compute_tax_row
+from .audit import queue_audit, queryset_audit_enabled
+from .versions import bump_versions, queryset_scopes
+from .utils import get_current_user
 logger = logging.getLogger("project_portal")
 
 
+class AuditSnapshotMixin:
+    """
+    Keeps the field values an instance was loaded with, so audit diffs and
+    "old value" checks don't need to re-read the row before saving.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_loaded_values(self):
+        """
+        {attname: value} as stored in the database, or None for a new row.
+        Only instances that were not loaded from the database (or were loaded
+        with deferred fields) are read again.
+        """
+        if self.pk is None:
+            return None
+
+        values = getattr(self, "_loaded_values", None)
+        if values is None or len(values) < len(self._meta.concrete_fields):
+            old = type(self)._base_manager.filter(pk=self.pk).first()
+            values = old._loaded_values if old else None
+            self._loaded_values = values
+
+        return values
+
+    def reset_loaded_values(self):
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
+
+class AuditedQuerySet(models.QuerySet):
+    """
+    Queues one summarized AuditLog entry for queryset-level update(), which
+    skips save() and the model signals, and bumps the DataVersions of the
+    updated rows, which also retires their cached reports. delete() still
+    goes through the per-row post_delete receivers.
+    """
+
+    def update(self, **kwargs):
+        scopes = queryset_scopes(self)
+
+        if not queryset_audit_enabled():
+            rows = super().update(**kwargs)
+            if rows:
+                bump_versions(scopes)
+            return rows
+
+        ids = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+
+        if rows:
+            bump_versions(scopes)
+            queue_audit(
+                user=get_current_user(),
+                model_name=self.model.__name__,
+                object_id="bulk",
+                object_value=f"{rows} row(s)",
+                action="UPDATE",
+                changes={
+                    "fields": {
+                        name: "(computed)" if hasattr(value, "resolve_expression") else str(value)
+                        for name, value in kwargs.items()
+                    },
+                    "ids": ids,
+                },
+            )
+
+        return rows
+
+
+class LedgerQuerySet(models.QuerySet):
+    """
+    queryset-level update() of the ledger models. It skips the signals that
+    keep FundingHeadBalance current, so an update of a ledger column rebuilds
+    the balances of the old and new funding sources of the rows on commit.
+    """
+
+    def update(self, **kwargs):
+        from .services import ledger_source_keys, queue_balance_rebuild, touches_ledger
+
+        if not touches_ledger(self.model, kwargs):
+            return super().update(**kwargs)
+
+        ids = list(self.values_list("pk", flat=True))
+        keys = ledger_source_keys(self)
+        rows = super().update(**kwargs)
+
+        if rows:
+            keys |= ledger_source_keys(self.model._base_manager.filter(pk__in=ids))
+            queue_balance_rebuild(keys)
+
+        return rows
+
+
+FUNDING_TYPE_CHOICES = [
+    ("PROJECT", "Project"),
+    ("SEED", "Seed Grant"),
+    ("TDG", "TDG Grant"),
+]
+
+# funding FK -> (funding_type, short number field on the source)
+FUNDING_SOURCES = {
+    "project": ("PROJECT", "project_short_no"),
+    "seed_grant": ("SEED", "short_no"),
+    "tdg_grant": ("TDG", "short_no"),
+}
+
+
+class FundingColumnsMixin:
+    """
+    Rows funded by a Project / SeedGrant / TDGGrant FK also store
+    funding_type, funding_id and funding_short_no, so filters, reports and
+    display code need no join. Filled from the FKs before every save.
+    """
+
+    def sync_funding_columns(self):
+        for relation, (funding_type, short_field) in FUNDING_SOURCES.items():
+            if getattr(self, f"{relation}_id"):
+                source = getattr(self, relation)
+                self.funding_type = funding_type
+                self.funding_id = source.pk
+                self.funding_short_no = getattr(source, short_field)
+                return
+
+        self.funding_type = self.funding_id = self.funding_short_no = None
+
+    def get_funding_short_no(self):
+        """funding_short_no, synced first for rows that have not been saved yet."""
+        if self.funding_short_no is None and (self.project_id or self.seed_grant_id or self.tdg_grant_id):
+            self.sync_funding_columns()
+        return self.funding_short_no
+
+
 fy_validator = RegexValidator(
     regex=r'^\d{4}-\d{2}$',
     message = "Financial year must be in format YYYY-YY, e.g. 2024-25"
@@ -643,6 +786,9 @@ class BillInward(models.Model):
         null=True,
         verbose_name="Remarks")
     
+    # lower-cased identifiers for the API search, see project/search.py
+    search_text = models.TextField(blank=True, default="", editable=False)
+
     class Meta:
         verbose_name = "Bill Inward"
         verbose_name_plural = "Bill Inwards"
@@ -668,7 +814,7 @@ class BillInward(models.Model):
     
       
 
-class Expenditure(models.Model):
+class Expenditure(AuditSnapshotMixin, FundingColumnsMixin, models.Model):
     id = models.AutoField(primary_key=True)
 
     date = models.DateField()
@@ -704,6 +850,19 @@ class Expenditure(models.Model):
     particulars = models.TextField()
     amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     remarks = models.TextField(blank=True, null=True)
+
+    # copied from the funding FK on save, see FundingColumnsMixin
+    funding_type = models.CharField(max_length=20, choices=FUNDING_TYPE_CHOICES, null=True, blank=True, editable=False)
+    funding_id = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    funding_short_no = models.CharField(max_length=50, null=True, blank=True, editable=False)
+
+    # lower-cased identifiers for the API search, see project/search.py
+    search_text = models.TextField(blank=True, default="", editable=False)
+
+    # normalized head for the grant report, see project/reports.py
+    head_key = models.CharField(max_length=100, blank=True, default="", editable=False)
+
+    objects = AuditedQuerySet.as_manager()
     
     def clean(self):
 
@@ -760,11 +919,8 @@ class Expenditure(models.Model):
     @property
     def short_no(self):
         """Returns short_no from related grant"""
-        if self.seed_grant:
-            return self.seed_grant.short_no
-        elif self.tdg_grant:
-            return self.tdg_grant.short_no
-        return None
+        short_no = self.get_funding_short_no()
+        return short_no if self.funding_type in ("SEED", "TDG") else None
 
 
 
@@ -775,10 +931,35 @@ class Expenditure(models.Model):
     class Meta:
         verbose_name = "Expenditure"
         verbose_name_plural = "Expenditures"
+        indexes = [
+            models.Index(fields=["-bill_date", "-id"], name="expenditure_bill_date_id_idx"),
+            models.Index(fields=["funding_type", "funding_id", "date"], name="expenditure_funding_date_idx"),
+            models.Index(fields=["funding_short_no"], name="expenditure_funding_short_idx"),
+        ]
+
+
+class CommitmentQuerySet(AuditedQuerySet, LedgerQuerySet):
+
+    def with_paid_totals(self):
+        """Annotate `paid_total` (sum of linked payments) in the same query."""
+        paid = (
+            Payment.objects.filter(commitment=OuterRef("pk"))
+            .order_by()
+            .values("commitment")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        return self.annotate(
+            paid_total=Coalesce(
+                Subquery(paid, output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal("0")),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
 
 
 # ✅ Commitment
-class Commitment(models.Model):
+class Commitment(AuditSnapshotMixin, FundingColumnsMixin, models.Model):
     id = models.AutoField(primary_key=True)
     commitment_code = models.CharField(max_length=5, unique=True, editable=False)
     date = models.DateField()
@@ -821,6 +1002,19 @@ class Commitment(models.Model):
                                                       )
     remarks = models.TextField(blank=True, null=True)
 
+    # copied from the funding FK on save, see FundingColumnsMixin
+    funding_type = models.CharField(max_length=20, choices=FUNDING_TYPE_CHOICES, null=True, blank=True, editable=False)
+    funding_id = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    funding_short_no = models.CharField(max_length=50, null=True, blank=True, editable=False)
+
+    # lower-cased identifiers for the API search, see project/search.py
+    search_text = models.TextField(blank=True, default="", editable=False)
+
+    # normalized head for the grant report, see project/reports.py
+    head_key = models.CharField(max_length=100, blank=True, default="", editable=False)
+
+    objects = CommitmentQuerySet.as_manager()
+
     def generate_commitment_code(self):
         while True:
             code = str(random.randint(10000, 99999))
@@ -867,7 +1061,8 @@ class Commitment(models.Model):
             for _ in range(10):
                 self.commitment_code = self.generate_commitment_code()
                 try:
-                    super().save(*args, **kwargs)
+                    with transaction.atomic():
+                        super().save(*args, **kwargs)
                     logger.info(f"Commitment saved | Code: {self.commitment_code}")
                     return
                 except IntegrityError:
@@ -878,12 +1073,16 @@ class Commitment(models.Model):
 
         else:
         
-            super().save(*args, **kwargs)
+            with transaction.atomic():
+                super().save(*args, **kwargs)
 
             logger.info(f"Commitment saved | Code: {self.commitment_code}")
 
     @property
     def total_paid(self):
+        # Use the with_paid_totals() annotation when the queryset provided it
+        if hasattr(self, "paid_total"):
+            return self.paid_total or Decimal("0")
         return self.payments.aggregate(
             total=Sum("amount")
         ) ["total"] or Decimal("0")
@@ -904,13 +1103,9 @@ class Commitment(models.Model):
     
     @property
     def short_no(self):
-        if self.seed_grant:
-            return self.seed_grant.short_no
-        elif self.tdg_grant:
-            return self.tdg_grant.short_no
-        elif self.project:
+        if self.project_id:
             return self.project.project_no
-        return None
+        return self.get_funding_short_no()
 
     def __str__(self):
         code = self.short_no or "—"
@@ -920,8 +1115,13 @@ class Commitment(models.Model):
     class Meta:
         verbose_name = "Commitment"
         verbose_name_plural = "Commitments"
+        indexes = [
+            models.Index(fields=["-bill_date", "-id"], name="commitment_bill_date_id_idx"),
+            models.Index(fields=["funding_type", "funding_id", "date"], name="commitment_funding_date_idx"),
+            models.Index(fields=["funding_short_no"], name="commitment_funding_short_idx"),
+        ]
   
-class FundRequest(models.Model):
+class FundRequest(FundingColumnsMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('approved', 'Approved'),
@@ -969,10 +1169,19 @@ class FundRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     remarks_by_src = models.TextField(blank=True, null=True, verbose_name="Remarks by SRC")
 
+    # copied from the funding FK on save, see FundingColumnsMixin
+    funding_type = models.CharField(max_length=20, choices=FUNDING_TYPE_CHOICES, null=True, blank=True, editable=False)
+    funding_id = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    funding_short_no = models.CharField(max_length=50, null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ['-request_date']
         verbose_name = "Fund Request"
         verbose_name_plural = "Fund Requests"
+        indexes = [
+            models.Index(fields=["funding_type", "funding_id", "request_date"], name="fundrequest_funding_date_idx"),
+            models.Index(fields=["funding_short_no"], name="fundrequest_funding_short_idx"),
+        ]
 
     def __str__(self):
         return f"{self.pi_name} - {self.project_no} - {self.status}"
@@ -996,7 +1205,7 @@ class ReceiptCategory(models.Model):
     def __str__(self):
         return self.name
     
-class Receipt(models.Model):
+class Receipt(FundingColumnsMixin, models.Model):
     receipt_date = models.DateField(blank=True, null=True)
 
     financial_year = models.CharField(max_length=7, blank=True, null=True)
@@ -1017,15 +1226,25 @@ class Receipt(models.Model):
 
     remarks = models.TextField(blank=True, null=True)
 
+    # copied from the funding FK on save, see FundingColumnsMixin
+    funding_type = models.CharField(max_length=20, choices=FUNDING_TYPE_CHOICES, null=True, blank=True, editable=False)
+    funding_id = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    funding_short_no = models.CharField(max_length=50, null=True, blank=True, editable=False)
+
+    # lower-cased identifiers for the API search, see project/search.py
+    search_text = models.TextField(blank=True, default="", editable=False)
+
+    objects = LedgerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["funding_type", "funding_id", "receipt_date"], name="receipt_funding_date_idx"),
+            models.Index(fields=["funding_short_no"], name="receipt_funding_short_idx"),
+        ]
+
     @property
     def short_no(self):
-        if self.project:
-            return self.project.project_short_no
-        elif self.seed_grant:
-            return self.seed_grant.short_no
-        elif self.tdg_grant:
-            return self.tdg_grant.short_no
-        return None
+        return self.get_funding_short_no()
     
     def save(self, *args, **kwargs):
         if self.receipt_date:
@@ -1036,7 +1255,8 @@ class Receipt(models.Model):
                 self.financial_year = f"{year}-{str(year+1)[2:]}"
             else:
                 self.financial_year = f"{year-1}-{str(year)[2:]}"
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.short_no } | {self.total_amount}"
@@ -1049,6 +1269,12 @@ class ReceiptAllocation(models.Model):
 
     amount = models.DecimalField(max_digits=15, decimal_places=2)
 
+    objects = LedgerQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.receipt.short_no} | {self.head.name}"
 
@@ -1088,6 +1314,8 @@ class ProjectSanctionDistribution(models.Model):
 
     remarks = models.TextField(blank=True, null=True)
 
+    objects = LedgerQuerySet.as_manager()
+
     def clean(self):
         if not self.project:
             raise ValidationError({"project": "Project is required."})
@@ -1118,7 +1346,8 @@ class ProjectSanctionDistribution(models.Model):
         
         
         self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     
 
@@ -1209,17 +1438,18 @@ PAYMENT_STATUS_CHOICES = [
     ("PAID", "Paid"),
 ]
 
-FUNDING_TYPE_CHOICES = [
-    ("PROJECT", "Project"),
-    ("SEED", "Seed Grant"),
-    ("TDG", "TDG Grant"),
-]
+class PaymentQuerySet(AuditedQuerySet, LedgerQuerySet):
+    pass
 
-class Payment(models.Model):
+
+class Payment(AuditSnapshotMixin, FundingColumnsMixin, models.Model):
 
     funding_type = models.CharField(max_length=20, choices=FUNDING_TYPE_CHOICES, null=True, blank=True)
 
     funding_id = models.PositiveIntegerField(null=True, blank=True)
+
+    # copied from the funding FK on save, see FundingColumnsMixin
+    funding_short_no = models.CharField(max_length=50, null=True, blank=True, editable=False)
     
     seed_grant = models.ForeignKey(SeedGrant, on_delete=models.CASCADE, null=True, blank=True, related_name="payments")
 
@@ -1308,6 +1538,11 @@ class Payment(models.Model):
         help_text="Auto-filled when paymentemail is sent"
     )
 
+    # lower-cased identifiers for the API search, see project/search.py
+    search_text = models.TextField(blank=True, default="", editable=False)
+
+    objects = PaymentQuerySet.as_manager()
+
 
     @property
     def funding_obj(self):
@@ -1326,50 +1561,14 @@ class Payment(models.Model):
         return None
     
     def calculate_taxes(self):
-        gst_half = Decimal("0.01")
-        gst_full = Decimal("0.02")
-
-        self.igst_tds = Decimal("0")
-        self.cgst_tds = Decimal("0")
-        self.sgst_tds = Decimal("0")
+        percent = self.tds_rate.percent if self.tds_rate else None
 
-        if not self.amount:
-            self.net_amount = Decimal("0")
-            return
-        
-        if self.tds_rate:
-            percent = Decimal(self.tds_rate.percent) / Decimal("100")
-            self.tds_amount = (self.amount * percent).quantize(
-                Decimal("1"), rounding=ROUND_HALF_UP
-
-            )
-        else:
-            self.tds_amount = Decimal("0")
-        
-        if self.gst_tds_type == "CGST & SGST":
-            self.cgst_tds = (self.amount * gst_half).quantize(
-                Decimal("1"), rounding=ROUND_HALF_UP
-            )
-            self.sgst_tds = (self.amount * gst_half).quantize(
-                Decimal("1"), rounding=ROUND_HALF_UP
-            )
-
-        elif self.gst_tds_type == "IGST":
-            self.igst_tds = (self.amount * gst_full).quantize(
-                Decimal("1"), rounding=ROUND_HALF_UP
-            )
-
-        total_gst = (
-            (self.igst_tds or Decimal("0")) +
-            (self.cgst_tds or Decimal("0")) + 
-            (self.sgst_tds or Decimal("0"))
+        tds, self.igst_tds, self.cgst_tds, self.sgst_tds, self.net_amount = compute_tax_row(
+            self.amount, percent, self.gst_tds_type
         )
-
-        
-
-        self.net_amount = (
-            self.amount - self.tds_amount - total_gst
-        ).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+        # a zero amount leaves tds_amount as it was
+        if tds is not None:
+            self.tds_amount = tds
     
     def clean(self):
         errors = {}
@@ -1434,10 +1633,9 @@ class Payment(models.Model):
                 total=Coalesce(Sum("amount"), Decimal("0"))
             )["total"]
 
-            if self.pk:
-                old = Payment.objects.filter(pk=self.pk).first()
-                if old:
-                    total_paid -= old.amount
+            old = self.get_loaded_values()
+            if old:
+                total_paid -= old["amount"]
 
             remaining = self.commitment.gross_amount - total_paid
 
@@ -1461,7 +1659,11 @@ class Payment(models.Model):
 
             logger.info(f"Saving Payment | Amount: {self.amount}")
 
-            funding = self.funding_obj
+            # funding_type / funding_id are copied from the FKs on save, so they
+            # only pick the funding source when they were changed themselves
+            old = self.get_loaded_values()
+            funding_changed = not old or (old["funding_type"], old["funding_id"]) != (self.funding_type, self.funding_id)
+            funding = self.funding_obj if funding_changed else None
 
             if funding:
                 self.project = None
@@ -1499,9 +1701,9 @@ class Payment(models.Model):
                 )["total"]
 
                 if self.pk:
-                    old = Payment.objects.filter(pk=self.pk).first()
+                    old = self.get_loaded_values()
                     if old:
-                        total_paid -= old.amount
+                        total_paid -= old["amount"]
 
                     remaining = commitment.gross_amount - total_paid
 
@@ -1522,24 +1724,11 @@ class Payment(models.Model):
             logger.info("Payment saved successfully | ID: {self.id}")
 
     def __str__(self):
-        if self.project:
-            code = self.project.project_short_no
-        elif self.seed_grant:
-            code = self.seed_grant.short_no
-        elif self.tdg_grant:
-            code = self.tdg_grant.short_no
-        else:
-            code = "-"
-        return f"{code} | {self.amount}"
+        return f"{self.get_funding_short_no() or '-'} | {self.amount}"
     
     @property
     def short_no(self):
-        if self.project:
-            return self.project.project_short_no
-        elif self.seed_grant:
-            return self.seed_grant.short_no
-        elif self.tdg_grant:
-            return self.tdg_grant.short_no
+        return self.get_funding_short_no()
         
     def get_short_no(self, obj):
         return obj.short_no or "_"
@@ -1548,6 +1737,67 @@ class Payment(models.Model):
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
         ordering = ["date"]
+        indexes = [
+            models.Index(fields=["date", "id"], name="payment_date_id_idx"),
+            models.Index(fields=["funding_type", "funding_id", "date"], name="payment_funding_date_idx"),
+            models.Index(fields=["funding_short_no"], name="payment_funding_short_idx"),
+        ]
+
+
+class FundingHeadBalance(models.Model):
+    """
+    Running head-wise totals per funding source (Project / Seed / TDG).
+    Kept in sync from signals, rebuild with `manage.py rebuild_funding_balances`.
+    """
+
+    funding_type = models.CharField(max_length=20, choices=FUNDING_TYPE_CHOICES)
+    funding_id = models.PositiveIntegerField()
+    head = models.CharField(max_length=100)
+
+    sanction_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    receipt_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    committed_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    committed_remaining = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def balance(self):
+        return self.receipt_amount - self.paid_amount
+
+    class Meta:
+        verbose_name = "Funding Head Balance"
+        verbose_name_plural = "Funding Head Balances"
+        ordering = ["funding_type", "funding_id", "head"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["funding_type", "funding_id", "head"],
+                name="unique_funding_head_balance"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.funding_type}-{self.funding_id} | {self.head}"
+
+
+class DataVersion(models.Model):
+    """
+    Change counter per scope ("funding:SEED:3", "model:payment"), bumped
+    whenever rows in that scope change. Conditional GETs compare against it,
+    see project/versions.py.
+    """
+
+    scope = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Data Version"
+        verbose_name_plural = "Data Versions"
+
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
 
 User = get_user_model()
 
@@ -1569,8 +1819,103 @@ class AuditLog(models.Model):
 
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["model_name", "object_id", "timestamp"], name="auditlog_model_obj_ts_idx"),
+            models.Index(fields=["user", "timestamp"], name="auditlog_user_ts_idx"),
+            models.Index(fields=["timestamp"], name="auditlog_ts_idx"),
+        ]
+
     def __str__(self):
         return f"{self.model_name} | {self.action} | {self.timestamp}"
+
+
+IMPORT_JOB_STATUS_CHOICES = [
+    ("PENDING", "Pending"),
+    ("RUNNING", "Running"),
+    ("SUCCESS", "Success"),
+    ("FAILED", "Failed"),
+]
+
+class ImportJob(models.Model):
+    """An admin import file processed in the background by Celery."""
+
+    model_name = models.CharField(max_length=50)
+    file = models.FileField(upload_to="imports/")
+    file_format = models.CharField(max_length=10)
+
+    status = models.CharField(max_length=10, choices=IMPORT_JOB_STATUS_CHOICES, default="PENDING")
+
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    new_rows = models.PositiveIntegerField(default=0)
+    updated_rows = models.PositiveIntegerField(default=0)
+    skipped_rows = models.PositiveIntegerField(default=0)
+    error_rows = models.PositiveIntegerField(default=0)
+
+    errors = models.JSONField(default=list, blank=True)
+    summary = models.TextField(blank=True, null=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+        ordering = ["-created_at"]
+
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return 100 if self.status in ("SUCCESS", "FAILED") else 0
+        return int(self.processed_rows * 100 / self.total_rows)
+
+    def __str__(self):
+        return f"{self.model_name} | {self.status} | {self.created_at:%d-%b-%Y %H:%M}"
+
+
+CHEQUE_LETTER_OUTPUT_CHOICES = [
+    ("pdf", "Single merged PDF"),
+    ("zip", "ZIP of PDFs"),
+]
+
+class ChequeLetterJob(models.Model):
+    """A batch of cheque letters rendered to PDF in the background by Celery."""
+
+    bank = models.ForeignKey(Bank, on_delete=models.SET_NULL, null=True, blank=True)
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+    cheque_nos = models.JSONField(default=list, blank=True)
+    output_format = models.CharField(max_length=3, choices=CHEQUE_LETTER_OUTPUT_CHOICES, default="pdf")
+
+    status = models.CharField(max_length=10, choices=IMPORT_JOB_STATUS_CHOICES, default="PENDING")
+
+    total_letters = models.PositiveIntegerField(default=0)
+    processed_letters = models.PositiveIntegerField(default=0)
+
+    file = models.FileField(upload_to="cheque_letters/", blank=True)
+    summary = models.TextField(blank=True, null=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Cheque Letter Job"
+        verbose_name_plural = "Cheque Letter Jobs"
+        ordering = ["-created_at"]
+
+    @property
+    def progress(self):
+        if not self.total_letters:
+            return 100 if self.status in ("SUCCESS", "FAILED") else 0
+        return int(self.processed_letters * 100 / self.total_letters)
+
+    def __str__(self):
+        return f"Cheque letters | {self.status} | {self.created_at:%d-%b-%Y %H:%M}"
     
 class CoPiName(models.Model):
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE,null = True, related_name='co_pi_assignments')
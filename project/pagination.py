@@ -1,5 +1,13 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class StandardPagination(PageNumberPagination):
     page_size = 50
@@ -23,4 +31,143 @@ class StandardPagination(PageNumberPagination):
             "next": {"type": "string", "nullable": True},
             "previous": {"type": "string", "nullable": True},
             "results": schema,
-        }
\ No newline at end of file
+        }
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder cuts datetimes and times to milliseconds, a cursor needs the exact value."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination. Each page continues after the last row of
+    the previous one (WHERE on the ordering columns) instead of using OFFSET,
+    so deep pages cost the same as the first. COUNT(*) only runs with
+    ?with_count=1.
+
+    `ordering` is a list like ["-bill_date", "-id"] and must end in a unique
+    column. Descending columns sort NULLs first and ascending ones NULLs last,
+    which is PostgreSQL's default and lets a plain index serve the ORDER BY.
+    """
+    cursor_query_param = "cursor"
+    count_query_param = "with_count"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering):
+        self.ordering = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fields = [(queryset.model._meta.get_field(name), desc) for name, desc in self.ordering]
+        self.count = None
+
+        if request.query_params.get(self.count_query_param) in ("1", "true"):
+            self.count = queryset.count()
+
+        queryset = queryset.order_by(*[
+            F(field.attname).desc(nulls_first=True) if desc else F(field.attname).asc(nulls_last=True)
+            for field, desc in self.fields
+        ])
+
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            self.next_position = [getattr(last, field.attname) for field, _ in self.fields]
+
+        return rows
+
+    def after(self, position):
+        """Q matching rows that sort after `position`."""
+        condition = Q(pk__in=[])
+        same = Q()
+
+        for (field, desc), value in zip(self.fields, position):
+            name = field.attname
+
+            if value is None:
+                # NULLs come first when descending and last when ascending
+                if desc:
+                    condition |= same & Q(**{f"{name}__isnull": False})
+                same &= Q(**{f"{name}__isnull": True})
+                continue
+
+            later = Q(**{f"{name}__lt" if desc else f"{name}__gt": value})
+            if field.null and not desc:
+                later |= Q(**{f"{name}__isnull": True})
+
+            condition |= same & later
+            same &= Q(**{name: value})
+
+        return condition
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, cls=CursorEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_cursor(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.get_next_link(),
+            "next_cursor": self.get_next_cursor(),
+            "results": data,
+        }
+        if self.count is not None:
+            payload = {"count": self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "count": {"type": "integer"},
+            "next": {"type": "string", "nullable": True},
+            "next_cursor": {"type": "string", "nullable": True},
+            "results": schema,
+        }
@@ -0,0 +1,219 @@
+"""
+Per-model queryset plans for the generic API and the exports.
+
+Each plan lists what the model's serializer (or import-export resource)
+touches, so list, detail, streaming and export views load a page of rows
+with a fixed number of queries. `python manage.py check_query_counts`
+verifies that per model.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from .models import (
+    BillInward, Commitment, CoPiName, Expenditure, FundRequest, Payee, Payment, Project,
+    ProjectSanctionDistribution, Receipt, ReceiptAllocation, SeedGrant, TDGGrant,
+)
+
+
+FUNDING_RELATED = ["seed_grant", "tdg_grant", "project"]
+
+# serializers only read the grant / project numbers of the funding source
+FUNDING_RELATED_ONLY = {
+    "seed_grant": ["grant_no", "short_no"],
+    "tdg_grant": ["grant_no", "short_no"],
+    "project": ["project_no", "project_short_no"],
+}
+
+
+class QueryPlan:
+    """
+    select_related / prefetch_related / annotations for one model.
+
+    related_only restricts select_related rows to the listed columns and is
+    only used for list responses; detail views load full rows because they
+    are saved back. export_related is added for the import-export resources.
+    field_columns names the columns (or prefetched relations) behind
+    serializer fields that do not map to a model field, for sparse fieldsets.
+    """
+
+    def __init__(self, model, select_related=(), prefetch_related=(), related_only=None,
+                 annotate=None, export_related=(), field_columns=None):
+        self.model = model
+        self.select_related = list(select_related)
+        self.prefetch_related = list(prefetch_related)
+        self.related_only = related_only or {}
+        self.annotate = annotate
+        self.export_related = list(export_related)
+        self.field_columns = field_columns or {}
+
+    def columns_for(self, serializer_fields):
+        """
+        only() paths needed to render the given serializer fields, or None
+        when one of them reads something the plan cannot account for.
+        """
+        opts = self.model._meta
+        columns = {opts.pk.name}
+
+        for name, field in serializer_fields.items():
+            if name in self.field_columns:
+                paths = self.field_columns[name]
+            elif isinstance(field, serializers.SerializerMethodField) or field.source == "*":
+                return None
+            else:
+                paths = ["__".join(field.source_attrs)]
+
+            for path in paths:
+                root, _, rest = path.partition("__")
+                try:
+                    model_field = opts.get_field(root)
+                except FieldDoesNotExist:
+                    return None
+
+                if rest and (not model_field.many_to_one or "__" in rest):
+                    return None
+
+                columns.add(root)
+                if rest:
+                    columns.add(path)
+
+        return columns
+
+    def apply(self, queryset=None, purpose="list", columns=None):
+        if queryset is None:
+            queryset = self.model.objects.all()
+
+        related = self.select_related + (self.export_related if purpose == "export" else [])
+        prefetch = self.prefetch_related
+
+        if columns is not None:
+            traversed = {path.split("__")[0] for path in columns if "__" in path}
+            related = [name for name in related if name in traversed]
+            prefetch = [
+                lookup for lookup in prefetch
+                if getattr(lookup, "prefetch_through", lookup).split("__")[0] in columns
+            ]
+
+        if related:
+            queryset = queryset.select_related(*related)
+
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        if self.annotate:
+            queryset = self.annotate(queryset)
+
+        if columns is not None:
+            concrete = {f.name for f in self.model._meta.concrete_fields}
+            queryset = queryset.only(*[path for path in columns if "__" in path or path in concrete])
+        elif purpose == "list" and self.related_only:
+            local = [f.name for f in self.model._meta.concrete_fields]
+            queryset = queryset.only(*local, *[
+                f"{relation}__{field}"
+                for relation, fields in self.related_only.items()
+                for field in fields
+            ])
+
+        return queryset
+
+
+# columns behind the funding display method fields
+FUNDING_DISPLAY_COLUMNS = {
+    "grant_no_display": ["seed_grant__grant_no", "tdg_grant__grant_no", "project__project_no"],
+    "short_no": ["funding_short_no"],
+    "seed_grant_short": ["funding_type", "funding_short_no"],
+    "tdg_grant_short": ["funding_type", "funding_short_no"],
+}
+
+GRANT_DISPLAY_COLUMNS = {
+    "final_end_date": ["is_extended", "extended_end_date", "end_date"],
+    "extension_approved_by_name": [
+        "extension_approved_by__first_name",
+        "extension_approved_by__last_name",
+        "extension_approved_by__username",
+    ],
+}
+
+
+QUERY_PLANS = {
+    "expenditure": QueryPlan(
+        Expenditure,
+        select_related=FUNDING_RELATED,
+        related_only=FUNDING_RELATED_ONLY,
+        field_columns=FUNDING_DISPLAY_COLUMNS,
+    ),
+    "commitment": QueryPlan(
+        Commitment,
+        select_related=FUNDING_RELATED,
+        related_only=FUNDING_RELATED_ONLY,
+        annotate=lambda qs: qs.with_paid_totals(),
+        field_columns={**FUNDING_DISPLAY_COLUMNS, "remaining_amount": ["gross_amount"]},
+    ),
+    "payment": QueryPlan(
+        Payment,
+        select_related=FUNDING_RELATED,
+        related_only=FUNDING_RELATED_ONLY,
+        export_related=["head", "payment_type", "payee", "bank", "tds_section", "tds_rate"],
+        field_columns=FUNDING_DISPLAY_COLUMNS,
+    ),
+    "receipt": QueryPlan(
+        Receipt,
+        select_related=FUNDING_RELATED,
+        prefetch_related=[
+            Prefetch("allocations", queryset=ReceiptAllocation.objects.select_related("head")),
+        ],
+    ),
+    "billinward": QueryPlan(BillInward, select_related=["faculty", "whom_to"]),
+    "projectsanctiondistribution": QueryPlan(
+        ProjectSanctionDistribution,
+        select_related=["project"],
+        related_only={"project": ["project_no", "project_short_no"]},
+        field_columns={
+            "project_no_display": ["project__project_no"],
+            "project_short_no_display": ["project__project_short_no"],
+        },
+    ),
+    "seedgrant": QueryPlan(
+        SeedGrant,
+        select_related=["faculty", "extension_approved_by"],
+        field_columns=GRANT_DISPLAY_COLUMNS,
+    ),
+    "tdggrant": QueryPlan(
+        TDGGrant,
+        select_related=["faculty", "extension_approved_by"],
+        field_columns=GRANT_DISPLAY_COLUMNS,
+    ),
+    "project": QueryPlan(
+        Project,
+        prefetch_related=[
+            Prefetch("co_pis", queryset=CoPiName.objects.only("id", "name", "project", "seed_grant", "tdg_grant")),
+        ],
+        field_columns={"duration_display": ["duration_months"], "co_pi_display": ["co_pis"]},
+    ),
+    "fundrequest": QueryPlan(
+        FundRequest,
+        select_related=["faculty", *FUNDING_RELATED],
+        field_columns={"project_type": ["funding_type"]},
+    ),
+    "payee": QueryPlan(Payee),
+}
+
+
+def get_query_plan(model_name):
+    return QUERY_PLANS.get(model_name.lower())
+
+
+def optimized_queryset(model_name, Model, purpose="list", serializer_fields=None, extra_columns=()):
+    """
+    Model's queryset with its plan applied (plain .objects.all() without one).
+    With serializer_fields (a sparse fieldset) only the columns behind them,
+    plus extra_columns, are loaded.
+    """
+    plan = get_query_plan(model_name)
+    if plan is None:
+        return Model.objects.all()
+
+    columns = plan.columns_for(serializer_fields) if serializer_fields is not None else None
+    if columns is not None:
+        columns.update(extra_columns)
+    return plan.apply(purpose=purpose, columns=columns)
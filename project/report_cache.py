@@ -0,0 +1,92 @@
+"""
+Cache of computed funding reports.
+
+The head-wise grant report of a seed / TDG grant (prepare_report) and the
+head-wise part of a project's balance sheet are kept in the "reports" cache
+under the DataVersion of their funding source (see project/versions.py).
+Saves and deletes of the ledger rows of a funding source bump that version,
+so a changed report is looked up under a new key, while a report computed
+from rows read before the bump can only be stored under the old one. An
+unchanged report costs one DataVersion query and one cache read; entries of
+old versions expire with REPORT_CACHE_TIMEOUT. Hit / miss counters live in
+the same cache, see `manage.py report_cache_stats`.
+
+Cache errors are logged and the report is computed as if nothing was cached.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .versions import funding_scope, get_versions
+
+
+logger = logging.getLogger("project_portal")
+
+REPORT_CACHE_ALIAS = "reports"
+
+STATS_KEYS = {
+    "hits": "stats:hits",
+    "misses": "stats:misses",
+}
+
+
+def report_cache():
+    return caches[REPORT_CACHE_ALIAS]
+
+
+def report_key(funding_type, funding_id, version):
+    return f"report:{funding_type}:{funding_id}:{version}"
+
+
+def _count(cache, name):
+    try:
+        cache.incr(STATS_KEYS[name])
+    except ValueError:
+        cache.set(STATS_KEYS[name], 1, None)
+
+
+def get_report(funding_type, funding_id, compute):
+    """compute() for one funding source, served from the cache while it is unchanged."""
+    cache = report_cache()
+
+    # read before computing, so a concurrent change can only make the entry look stale
+    scope = funding_scope(funding_type, funding_id)
+    versions, _ = get_versions([scope])
+    key = report_key(funding_type, funding_id, versions[scope])
+
+    try:
+        report = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Report cache read failed for {key}: {e}")
+        return compute()
+
+    if report is not None:
+        try:
+            _count(cache, "hits")
+        except Exception as e:
+            logger.warning(f"Report cache counter failed: {e}")
+        return report
+
+    report = compute()
+
+    try:
+        cache.set(key, report, settings.REPORT_CACHE_TIMEOUT)
+        _count(cache, "misses")
+    except Exception as e:
+        logger.warning(f"Report cache write failed for {key}: {e}")
+
+    return report
+
+
+def report_cache_stats():
+    values = report_cache().get_many(list(STATS_KEYS.values()))
+    stats = {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else None
+    return stats
+
+
+def reset_report_cache_stats():
+    report_cache().delete_many(list(STATS_KEYS.values()))
@@ -0,0 +1,145 @@
+"""
+Reports summed and projected in the database.
+
+Head-wise report of a seed / TDG grant (bill_report_user, bill_report_admin,
+get_seed_grant_details): Expenditure and Commitment store `head_key`, their
+head normalized the way the report matches it to REPORT_HEADS (trimmed,
+lower-cased, trailing "s" dropped). It is filled on save, so each table is
+summed with one grouped query instead of matching every row in Python.
+
+Committed payments (admin report): one block of rows at a time as a
+.values() projection, filtered on the server, see committed_payments_block.
+"""
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .grid import grid_block
+from .models import Payment
+
+
+REPORT_HEADS = [
+    "Equipment", "Consumables", "Contingency", "Travel", "Manpower", "Others", "Furniture", "Visitor Expenses", "Lab Equipment"
+]
+
+
+def normalize_head(text):
+    """Lowercase, strip, remove trailing 's'"""
+    text = (text or "").strip().lower()
+    return text[:-1] if text.endswith("s") and len(text) > 1 else text
+
+
+def head_totals(queryset, amount_field):
+    """{head_key: sum of amount_field} for the rows of queryset."""
+    rows = queryset.order_by().values("head_key").annotate(total=Sum(amount_field))
+    return {row["head_key"]: row["total"] for row in rows}
+
+
+def prepare_report(grant, expenditures, commitments):
+    """Report rows per REPORT_HEADS and their totals, from one query per table."""
+    exp_totals = head_totals(expenditures, "amount")
+    commit_totals = head_totals(commitments, "gross_amount")
+
+    report_rows = []
+    total_budget = 0
+    total_exp = 0
+    total_commit = 0
+
+    for head in REPORT_HEADS:
+        field_name = head.lower().replace(" ", "_")
+        sanction = getattr(grant, field_name, 0) or 0
+
+        key = normalize_head(head)
+        exp_sum = exp_totals.get(key) or 0
+        commit_sum = commit_totals.get(key) or 0
+        balance = sanction - (exp_sum + commit_sum)
+
+        total_budget += sanction
+        total_exp += exp_sum
+        total_commit += commit_sum
+
+        report_rows.append({
+            "head": head,
+            "sanction": sanction,
+            "expenditure": exp_sum,
+            "commitment": commit_sum,
+            "balance": balance
+        })
+
+    return report_rows, {
+        "budget": total_budget,
+        "expenditure": total_exp,
+        "commitment": total_commit,
+        "balance": total_budget - (total_exp + total_commit)
+    }
+
+
+# plain columns of the committed payments report, and labels read through joins
+COMMITTED_PAYMENT_FIELDS = [
+    "id", "date", "payee_pan", "cheque_no", "utr_no", "payee_bank_name", "payee_account_no",
+    "pi_name", "amount", "tds_amount", "gst_tds_type", "igst_tds", "cgst_tds", "sgst_tds",
+    "net_amount", "purpose", "payment_status",
+]
+
+COMMITTED_PAYMENT_LABELS = {
+    "short_no": Coalesce("funding_short_no", Value("-")),
+    "head_name": Coalesce("head__name", Value("")),
+    "payment_type_name": Coalesce("payment_type__name", Value("")),
+    "commitment_code": Coalesce("commitment__commitment_code", Value("")),
+    "payee_name": Coalesce("payee__name_of_payee", Value("")),
+    "bank_name": Coalesce("bank__bank_name", Value("")),
+    "tds_section_name": Coalesce("tds_section__section", Value("")),
+    "tds_percent": F("tds_rate__percent"),
+}
+
+
+def filter_committed_payments(queryset, params):
+    """
+    Server-side filters of the report: ?funding_type= & ?funding_id=,
+    ?short_no=, ?date_from= / ?date_to=, ?payee= (id) or ?payee_name=
+    (name or PAN), ?commitment= (id) or ?commitment_code=.
+    """
+    exact = {
+        "funding_type": "funding_type",
+        "funding_id": "funding_id",
+        "payee": "payee_id",
+        "commitment": "commitment_id",
+        "date_from": "date__gte",
+        "date_to": "date__lte",
+    }
+    for param, lookup in exact.items():
+        value = params.get(param, "").strip()
+        if value:
+            queryset = queryset.filter(**{lookup: value})
+
+    short_no = params.get("short_no", "").strip()
+    if short_no:
+        queryset = queryset.filter(funding_short_no__icontains=short_no)
+
+    commitment_code = params.get("commitment_code", "").strip()
+    if commitment_code:
+        queryset = queryset.filter(commitment__commitment_code__icontains=commitment_code)
+
+    payee_name = params.get("payee_name", "").strip()
+    if payee_name:
+        queryset = queryset.filter(
+            Q(payee__name_of_payee__icontains=payee_name) | Q(payee_pan__icontains=payee_name)
+        )
+
+    return queryset
+
+
+def committed_payments_block(params):
+    """
+    (rows, last_row, summary) of the committed payments report for one grid
+    block, see grid.grid_block. The summary (row count and amount total of
+    the filtered report) is only computed for the first block.
+    """
+    queryset = filter_committed_payments(Payment.objects.filter(commitment__isnull=False), params)
+
+    summary = None
+    if str(params.get("start_row", "0")) == "0":
+        summary = queryset.aggregate(total_count=Count("id"), total_amount=Sum("amount"))
+
+    rows = queryset.order_by("date", "id").values(*COMMITTED_PAYMENT_FIELDS, **COMMITTED_PAYMENT_LABELS)
+    rows, last_row = grid_block(rows, params)
+    return rows, last_row, summary
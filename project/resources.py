@@ -7,6 +7,106 @@ from django.core.exceptions import ValidationError
 from import_export.widgets import Widget
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from decimal import Decimal, InvalidOperation
+
+
+class FundingIndex:
+    """
+    Import-session lookup of funding sources: one query per model, then a
+    dict from short_no / grant_no / project_no to the object. Earlier
+    lookups win when the same value exists in more than one model.
+    """
+
+    def __init__(self, lookups):
+        self.lookups = lookups
+        self.index = {}
+
+    def build(self):
+        self.index = {}
+        for model, field in self.lookups:
+            for obj in model.objects.all():
+                value = getattr(obj, field)
+                if value:
+                    self.index.setdefault(str(value).strip(), obj)
+        return self
+
+    def get(self, value):
+        return self.index.get(str(value).strip())
+
+
+class CachedForeignKeyWidget(ForeignKeyWidget):
+    """
+    ForeignKeyWidget that resolves values from a dict loaded once by prime().
+    Values that are missing or ambiguous fall back to the normal query, so
+    errors stay the same as ForeignKeyWidget.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = None
+
+    def lookup_key(self, value):
+        if isinstance(self.model._meta.get_field(self.field), models.DecimalField):
+            try:
+                return Decimal(str(value).strip())
+            except InvalidOperation:
+                return None
+        return str(value).strip()
+
+    def prime(self):
+        self.cache = {}
+        ambiguous = set()
+
+        for obj in self.model.objects.all():
+            key = self.lookup_key(getattr(obj, self.field))
+            if key in self.cache:
+                ambiguous.add(key)
+            self.cache[key] = obj
+
+        for key in ambiguous:
+            del self.cache[key]
+
+    def clean(self, value, row=None, **kwargs):
+        if self.cache is None or self.use_natural_foreign_keys or value in (None, ""):
+            return super().clean(value, row, **kwargs)
+
+        obj = self.cache.get(self.lookup_key(value))
+        if obj is None:
+            return super().clean(value, row, **kwargs)
+
+        return obj.pk if self.key_is_id else obj
+
+
+class CachedLookupMixin:
+    """
+    Primes cached FK widgets and the funding index once per import. A
+    background job imports in chunks and primes them once for all of its
+    chunks, see tasks.run_import_job.
+    """
+
+    funding_lookups = None
+    lookups_primed = False
+
+    def prime_lookups(self):
+        for field in self.fields.values():
+            if isinstance(field.widget, CachedForeignKeyWidget):
+                field.widget.prime()
+
+        if self.funding_lookups:
+            self.funding_index = FundingIndex(self.funding_lookups).build()
+
+            for field in self.fields.values():
+                if isinstance(field.widget, FundingObejctWidget):
+                    field.widget.funding_index = self.funding_index
+
+        self.lookups_primed = True
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+
+        if not self.lookups_primed:
+            self.prime_lookups()
 
 
 class FundingObejctWidget(Widget):
@@ -22,11 +122,19 @@ class FundingObejctWidget(Widget):
         (Project, "project_short_no"),
     ]
 
+    funding_index = None
+
     def clean(self, value, row=None, *args, **kwargs):
         if not value:
             return None
         value = value.strip()
 
+        if self.funding_index is not None:
+            funding = self.funding_index.get(value)
+            if funding is None:
+                raise ValueError(f"No Project / Grant fould for: {value}")
+            return funding
+
         for model, field in self.MODEL_LOOKUP:
             try:
                 return model.objects.get(**{field: value})
@@ -281,7 +389,7 @@ class TDGGrantResource(resources.ModelResource):
 
 
 
-class ExpenditureResource(resources.ModelResource):
+class ExpenditureResource(CachedLookupMixin, resources.ModelResource):
      grant_short_no =fields.Field(
          column_name="Grant Short No",
          attribute="grant_short_no"
@@ -292,20 +400,26 @@ class ExpenditureResource(resources.ModelResource):
         widget=FlexibleDateWidget()
      )
      
+     funding_lookups = [
+         (SeedGrant, "short_no"),
+         (TDGGrant, "short_no"),
+         (Project, "project_no"),
+     ]
+
      # Explicitly define Foreignkey fields with widget
      seed_grant = fields.Field(
          attribute='seed_grant',
-         widget=ForeignKeyWidget(SeedGrant, field='id')
+         widget=CachedForeignKeyWidget(SeedGrant, field='id')
      )
 
      tdg_grant = fields.Field(
          attribute ='tdg_grant',
-         widget = ForeignKeyWidget(TDGGrant, field='id')
+         widget = CachedForeignKeyWidget(TDGGrant, field='id')
      )
 
      project = fields.Field(
          attribute='project',
-         widget=ForeignKeyWidget(Project, field='id')
+         widget=CachedForeignKeyWidget(Project, field='id')
          
      )
 
@@ -322,30 +436,14 @@ class ExpenditureResource(resources.ModelResource):
 
             if not short_no_value:
                 raise ValueError("Grant Short No is requiredbut missing")
-            
-            
-            seed = SeedGrant.objects.filter(short_no=short_no_value).first()
-            if seed:
-                row["seed_grant"] = seed.id
-                row["tdg_grant"] = None
-                row["project"] = None
-                return
-            
-            tdg = TDGGrant.objects.filter(short_no=short_no_value).first()
-            if tdg:
-                row["tdg_grant"] = tdg.id
-                row["seed_grant"] = None
-                row["project"] = None
-                return
-           
-            proj = Project.objects.filter(project_no=short_no_value).first()
-            if proj:
-                row["project"] = proj.id
-                row["seed_grant"] = None
-                row["tdg_grant"] = None
-                return
-
-            raise ValueError(f"Grant with Short_no '{short_no_value}' not found!")
+
+            funding = self.funding_index.get(short_no_value)
+            if funding is None:
+                raise ValueError(f"Grant with Short_no '{short_no_value}' not found!")
+
+            row["seed_grant"] = funding.id if isinstance(funding, SeedGrant) else None
+            row["tdg_grant"] = funding.id if isinstance(funding, TDGGrant) else None
+            row["project"] = funding.id if isinstance(funding, Project) else None
      
      class Meta:
         model = Expenditure
@@ -361,7 +459,7 @@ class ExpenditureResource(resources.ModelResource):
 
 
 
-class CommitmentResource(resources.ModelResource):
+class CommitmentResource(CachedLookupMixin, resources.ModelResource):
     grant_short_no =fields.Field(
          column_name="Grant Short No",
          attribute="grant_short_no"
@@ -373,20 +471,26 @@ class CommitmentResource(resources.ModelResource):
         widget=FlexibleDateWidget()
     )
 
+    funding_lookups = [
+        (SeedGrant, "short_no"),
+        (TDGGrant, "short_no"),
+        (Project, "project_no"),
+    ]
+
     # Explicitly define Foreignkey fields with widget
     seed_grant = fields.Field(
          attribute='seed_grant',
-         widget=ForeignKeyWidget(SeedGrant, field='id')
+         widget=CachedForeignKeyWidget(SeedGrant, field='id')
     )
 
     tdg_grant = fields.Field(
          attribute ='tdg_grant',
-         widget = ForeignKeyWidget(SeedGrant, field='id')
+         widget = CachedForeignKeyWidget(TDGGrant, field='id')
     )
 
     project = fields.Field(
         attribute='project',
-        widget=ForeignKeyWidget(Project, field='id')
+        widget=CachedForeignKeyWidget(Project, field='id')
     )
 
     short_no = fields.Field(attribute="short_no", readonly = True)
@@ -402,31 +506,14 @@ class CommitmentResource(resources.ModelResource):
 
         if not short_no_value:
             raise ValueError("Grant Short No is required but missing")
-        
-        
-        seed = SeedGrant.objects.filter(short_no=short_no_value).first()
-        if seed:
-            row["seed_grant"] = seed.id
-            row["tdg_grant"] = None
-            row["project"] = None
-            return
-        
-        
-        
-        tdg = TDGGrant.objects.filter(short_no=short_no_value).first()
-        if tdg:
-            row["tdg_grant"] = tdg.id
-            row["seed_grant"] = None
-            row["project"] = None
-            return
-        
-        proj = Project.objects.filter(project_no=short_no_value).first()
-        if proj:
-            row["project"] = proj.id
-            row["seed_grant"] = None
-            row["tdg_grant"] = None
 
-        raise ValueError(f"Grant with short_no '{short_no_value}' not found!")
+        funding = self.funding_index.get(short_no_value)
+        if funding is None:
+            raise ValueError(f"Grant with short_no '{short_no_value}' not found!")
+
+        row["seed_grant"] = funding.id if isinstance(funding, SeedGrant) else None
+        row["tdg_grant"] = funding.id if isinstance(funding, TDGGrant) else None
+        row["project"] = funding.id if isinstance(funding, Project) else None
     
     class Meta:
         model = Commitment
@@ -450,7 +537,9 @@ from .models import (
 
 
 
-class PaymentResource(resources.ModelResource):
+class PaymentResource(CachedLookupMixin, resources.ModelResource):
+
+    funding_lookups = FundingObejctWidget.MODEL_LOOKUP
 
     # -------------------------
     # Core references
@@ -466,25 +555,25 @@ class PaymentResource(resources.ModelResource):
     head = fields.Field(
         column_name="Head",
         attribute="head",
-        widget=ForeignKeyWidget(ReceiptHead, "name")
+        widget=CachedForeignKeyWidget(ReceiptHead, "name")
     )
 
     payment_type = fields.Field(
         column_name="Payment Type",
         attribute="payment_type",
-        widget=ForeignKeyWidget(PaymentType, "name")
+        widget=CachedForeignKeyWidget(PaymentType, "name")
     )
 
     payee = fields.Field(
         column_name="Payee PAN",
         attribute="payee",
-        widget=ForeignKeyWidget(Payee, "pan")
+        widget=CachedForeignKeyWidget(Payee, "pan")
     )
 
     bank = fields.Field(
         column_name="Bank",
         attribute="bank",
-        widget=ForeignKeyWidget(Bank, "short_no")
+        widget=CachedForeignKeyWidget(Bank, "short_no")
     )
 
     # -------------------------
@@ -520,13 +609,13 @@ class PaymentResource(resources.ModelResource):
     tds_section = fields.Field(
         column_name="Tax U/S",
         attribute="tds_section",
-        widget=ForeignKeyWidget(TDSSection, "section")
+        widget=CachedForeignKeyWidget(TDSSection, "section")
     )
 
     tds_rate = fields.Field(
         column_name="TDS %",
         attribute="tds_rate",
-        widget=ForeignKeyWidget(TDSRate, "percent")
+        widget=CachedForeignKeyWidget(TDSRate, "percent")
     )
 
     tds_amount = fields.Field(
@@ -0,0 +1,94 @@
+"""
+Search for the generic API's `search` parameter.
+
+Payment, Commitment, Expenditure, Receipt and BillInward keep a lower-cased
+`search_text` column with the identifiers the grid searches on (the funding
+source's grant / project numbers, or the bill's own fields). It is filled on
+save and refreshed when a funding source is renumbered. On PostgreSQL the
+column has a pg_trgm GIN index, so `LIKE '%q%'` on it needs neither joins
+nor a sequential scan; other backends fall back to icontains on the
+configured columns.
+"""
+from django.apps import apps
+from django.db import connection
+from django.db.models import Q
+
+from .audit import skip_queryset_audit
+
+
+FUNDING_SEARCH_FIELDS = {
+    "seed_grant": ["grant_no", "short_no"],
+    "tdg_grant": ["grant_no", "short_no"],
+    "project": ["project_no", "project_short_no"],
+}
+
+FUNDING_RELATIONS = {
+    "SeedGrant": "seed_grant",
+    "TDGGrant": "tdg_grant",
+    "Project": "project",
+}
+
+# model name -> own columns copied into search_text; funding models use FUNDING_SEARCH_FIELDS
+SEARCH_TEXT_MODELS = {
+    "Payment": None,
+    "Commitment": None,
+    "Expenditure": None,
+    "Receipt": None,
+    "BillInward": ["project_no", "pi_name", "received_from"],
+}
+
+
+def _join(values):
+    return " ".join(str(value) for value in values if value).lower()
+
+
+def funding_search_text(source):
+    """search_text of every row funded by a SeedGrant / TDGGrant / Project."""
+    if source is None:
+        return ""
+
+    fields = FUNDING_SEARCH_FIELDS[FUNDING_RELATIONS[source.__class__.__name__]]
+    return _join(getattr(source, name) for name in fields)
+
+
+def build_search_text(instance):
+    fields = SEARCH_TEXT_MODELS[instance.__class__.__name__]
+
+    if fields is not None:
+        return _join(getattr(instance, name) for name in fields)
+
+    for relation in FUNDING_SEARCH_FIELDS:
+        if getattr(instance, f"{relation}_id"):
+            return funding_search_text(getattr(instance, relation))
+    return ""
+
+
+def refresh_funding_search_text(source):
+    """Rewrite search_text of the rows funded by `source` after its numbers changed."""
+    relation = FUNDING_RELATIONS[source.__class__.__name__]
+    text = funding_search_text(source)
+
+    with skip_queryset_audit():
+        for model_name, fields in SEARCH_TEXT_MODELS.items():
+            if fields is not None:
+                continue
+            Model = apps.get_model("project", model_name)
+            Model.objects.filter(**{relation: source}).exclude(search_text=text).update(search_text=text)
+
+
+def uses_search_text(queryset):
+    return connection.vendor == "postgresql" and queryset.model.__name__ in SEARCH_TEXT_MODELS
+
+
+def apply_search(queryset, search_q, columns):
+    """Filter on search_text where it is indexed, else OR icontains over `columns`."""
+    if uses_search_text(queryset):
+        return queryset.filter(search_text__contains=search_q.lower())
+
+    if not columns:
+        return queryset
+
+    q_obj = Q()
+    for column in columns:
+        q_obj |= Q(**{f"{column}__icontains": search_q})
+    return queryset.filter(q_obj)
@@ -1,9 +1,33 @@
 from rest_framework import serializers
 from django.contrib.contenttypes.models import ContentType
-from .models import Expenditure, Commitment, SeedGrant, TDGGrant, FundRequest, Project,BillInward,Faculty, Payment, Receipt, TDSSection,TDSRate, ProjectSanctionDistribution, ReceiptHead, Payee, ReceiptAllocation
+from .models import FUNDING_TYPE_CHOICES, Expenditure, Commitment, SeedGrant, TDGGrant, FundRequest, Project,BillInward,Faculty, Payment, Receipt, TDSSection,TDSRate, ProjectSanctionDistribution, ReceiptHead, Payee, ReceiptAllocation
 import re
 
 
+def prune_fields(serializer, keep):
+    """Drop the fields not named in `keep` from a serializer (or the child of a many=True one)."""
+    if keep is None:
+        return serializer
+
+    target = getattr(serializer, "child", serializer)
+    for name in list(target.fields):
+        if name not in keep:
+            target.fields.pop(name)
+    return serializer
+
+
+class FundingShortNoField(serializers.ReadOnlyField):
+    """The row's funding_short_no when it is funded by `funding_type`, else None."""
+
+    def __init__(self, funding_type, **kwargs):
+        self.funding_type = funding_type
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        return obj.funding_short_no if obj.funding_type == self.funding_type else None
+
+
 class FundingRelatedSerializer(serializers.ModelSerializer):
     def validate(self, data):
         funding_fields = [
@@ -89,8 +113,8 @@ class    ExpenditureSerializer(FundingRelatedSerializer):
     project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), allow_null=True, required=False)
     
     grant_no_display = serializers.SerializerMethodField()
-    seed_grant_short = serializers.CharField(source="seed_grant.short_no", read_only=True, allow_null=True)
-    tdg_grant_short = serializers.CharField(source="tdg_grant.short_no", read_only=True, allow_null=True)
+    seed_grant_short = FundingShortNoField("SEED")
+    tdg_grant_short = FundingShortNoField("TDG")
 
     def get_grant_no_display(self, obj):
         if obj.seed_grant:
@@ -124,8 +148,8 @@ class CommitmentSerializer(FundingRelatedSerializer):
     project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), allow_null=True, required=False)
     
     grant_no_display = serializers.SerializerMethodField()
-    seed_grant_short = serializers.CharField(source="seed_grant.short_no", read_only=True, allow_null=True)
-    tdg_grant_short = serializers.CharField(source="tdg_grant.short_no", read_only=True, allow_null=True)
+    seed_grant_short = FundingShortNoField("SEED")
+    tdg_grant_short = FundingShortNoField("TDG")
 
     remaining_amount = serializers.SerializerMethodField()
 
@@ -139,6 +163,8 @@ class CommitmentSerializer(FundingRelatedSerializer):
         return ""
     
     def get_remaining_amount(self, obj):
+        # Reads the with_paid_totals() annotation if the queryset has it,
+        # otherwise Commitment.total_paid falls back to an aggregate query.
         return float(obj.remaining_amount or 0)
     
     class Meta:
@@ -394,7 +420,8 @@ class ProjectSerializer(serializers.ModelSerializer):
     co_pi_display = serializers.SerializerMethodField()
 
     def get_co_pi_display(self, obj):
-        names = obj.co_pis.values_list("name", flat=True)
+        # .all() so a prefetched co_pis list is used
+        names = [co_pi.name for co_pi in obj.co_pis.all()]
         return ", ".join(names) if names else ""
     class Meta:
         model = Project
@@ -543,13 +570,7 @@ class FundRequestSerializer(serializers.ModelSerializer):
 
     def get_project_type(self, obj):
             """Determine project type for display"""
-            if obj.project:
-               return 'Project'
-            elif obj.seed_grant:
-               return 'Seed Grant'
-            elif obj.tdg_grant:
-               return 'TDG Grant'
-            return 'N/A'
+            return dict(FUNDING_TYPE_CHOICES).get(obj.funding_type, 'N/A')
 
     def validate_status(self, value):
             """Validate status choices"""
@@ -580,7 +601,7 @@ class BillInwardSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = BillInward
-        fields = '__all__'
+        exclude = ["search_text"]
     
     def get_assigned_to_name(self, obj):
         """Show assigned admin member name"""
@@ -596,15 +617,13 @@ class BillInwardSerializer(serializers.ModelSerializer):
         return None
     
     def get_can_upload_pdf(self, obj):
-        request = self.context["request"]
-        user = request.user
-
-        if user.is_superuser:
-            return True
-        
-        if user.groups.filter(name="billinward").exists():
-            return True
-        return False
+        # same answer for every row, so look the group up once per response
+        if "can_upload_pdf" not in self.context:
+            user = self.context["request"].user
+            self.context["can_upload_pdf"] = (
+                user.is_superuser or user.groups.filter(name="billinward").exists()
+            )
+        return self.context["can_upload_pdf"]
     
 class PaymentSerializer(serializers.ModelSerializer):
 
@@ -631,11 +650,9 @@ class PaymentSerializer(serializers.ModelSerializer):
 
     tds_rate = serializers.PrimaryKeyRelatedField(queryset=TDSRate.objects.all(), allow_null=True, required=False)
 
-    seed_grant_short = serializers.CharField(
-        source="seed_grant.short_no", read_only=True, allow_null=True
-    )
+    seed_grant_short = FundingShortNoField("SEED")
 
-    tdg_grant_short = serializers.CharField(source="tdg_grant.short_no", read_only=True, allow_null=True)
+    tdg_grant_short = FundingShortNoField("TDG")
 
     class Meta:
         model = Payment
@@ -699,19 +716,20 @@ class PaymentSerializer(serializers.ModelSerializer):
         return ""
 
     def get_short_no(self, obj):
-        if obj.seed_grant:
-            return obj.seed_grant.short_no
-        if obj.tdg_grant:
-            return obj.tdg_grant.short_no
-        if obj.project:
-            return obj.project.project_short_no
-        return "" 
+        return obj.funding_short_no or ""
 
     def validate(self, data):
-        instance = Payment(**data)
-
         if self.instance:
-            instance.pk = self.instance.pk
+            # partial updates send only the changed fields, check them against the stored row
+            instance = Payment(**{
+                field.attname: getattr(self.instance, field.attname)
+                for field in Payment._meta.concrete_fields
+            })
+            for name, value in data.items():
+                setattr(instance, name, value)
+            instance._loaded_values = self.instance.get_loaded_values()
+        else:
+            instance = Payment(**data)
 
         instance.clean()
 
@@ -1,11 +1,32 @@
 import json
+import logging
+from collections import defaultdict
 from decimal import Decimal
-from django.db import transaction 
+import urllib.parse
+from types import SimpleNamespace
+from django.db import IntegrityError, transaction
 from django.db.models import Sum 
+from django.db.models import Case, CharField, DecimalField, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.urls import reverse
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 from .models import Receipt, ReceiptAllocation
 from .models import Project, SeedGrant, TDGGrant
+from .models import Payment, Commitment, ProjectSanctionDistribution, FundingHeadBalance
+from .models import Expenditure, FundRequest, FUNDING_SOURCES
+from .models import CoPiName, DataVersion
+from .models import PaymentType, ReceiptHead, Payee, Bank, TDSSection, TDSRate
+from .audit import build_entry, queue_audit_entries, skip_queryset_audit
+from .tasks import send_payment_email_task
+from .taxes import TAX_FIELDS, apply_taxes
+from .search import build_search_text
+from .report_cache import report_cache
+from .versions import bump_versions, funding_scope, get_versions, model_scope, queryset_scopes
+
+logger = logging.getLogger("project_portal")
 
 def detect_funding(short_no):
 
@@ -62,3 +83,821 @@ def create_receipt_with_allocations(form, allocations_data):
                 amount=item["amount"]
             )
         return receipt
+
+
+# Funding head balance ledger
+
+FUNDING_MODELS = {
+    "PROJECT": Project,
+    "SEED": SeedGrant,
+    "TDG": TDGGrant,
+}
+
+def get_funding_key(instance):
+    """Return (funding_type, funding_id) for a ledger row, or None."""
+    if isinstance(instance, ReceiptAllocation):
+        instance = Receipt.objects.filter(pk=instance.receipt_id).first()
+        if instance is None:
+            return None
+
+    if isinstance(instance, ProjectSanctionDistribution):
+        return ("PROJECT", instance.project_id) if instance.project_id else None
+
+    if getattr(instance, "project_id", None):
+        return ("PROJECT", instance.project_id)
+    if getattr(instance, "seed_grant_id", None):
+        return ("SEED", instance.seed_grant_id)
+    if getattr(instance, "tdg_grant_id", None):
+        return ("TDG", instance.tdg_grant_id)
+    return None
+
+
+FUNDING_COLUMN_MODELS = (Payment, Commitment, Expenditure, Receipt, FundRequest)
+
+
+def refresh_funding_short_no(source):
+    """Rewrite funding_short_no of the rows funded by `source` after it was renumbered."""
+    relation = {Project: "project", SeedGrant: "seed_grant", TDGGrant: "tdg_grant"}[type(source)]
+    funding_type, short_field = FUNDING_SOURCES[relation]
+    short_no = getattr(source, short_field)
+
+    with skip_queryset_audit():
+        for model in FUNDING_COLUMN_MODELS:
+            model.objects.filter(
+                funding_type=funding_type, funding_id=source.pk
+            ).exclude(funding_short_no=short_no).update(funding_short_no=short_no)
+
+
+def _head_name(name):
+    return name.strip() if name else "Unknown"
+
+
+def _add_grouped(target, rows, head_key, amount_key="total"):
+    for row in rows:
+        target[_head_name(row[head_key])] += row[amount_key] or Decimal("0.00")
+
+
+def compute_funding_head_totals(funding_type, funding_id):
+    """
+    Head-wise sanction / receipt / paid / committed totals for one funding
+    source, using grouped aggregates instead of walking the ledger rows.
+    """
+    funding_filter = {"funding_type": funding_type, "funding_id": funding_id}
+
+    sanction = defaultdict(Decimal)
+    receipt = defaultdict(Decimal)
+    paid = defaultdict(Decimal)
+    committed = defaultdict(Decimal)
+    committed_paid = defaultdict(Decimal)
+
+    if funding_type == "PROJECT":
+        _add_grouped(
+            sanction,
+            ProjectSanctionDistribution.objects.filter(project_id=funding_id)
+            .values("head__name").annotate(total=Sum("sanctioned_amount")),
+            "head__name",
+        )
+
+    _add_grouped(
+        receipt,
+        ReceiptAllocation.objects.filter(receipt__funding_type=funding_type, receipt__funding_id=funding_id)
+        .values("head__name").annotate(total=Sum("amount")),
+        "head__name",
+    )
+    _add_grouped(
+        paid,
+        Payment.objects.filter(**funding_filter)
+        .values("head__name").annotate(total=Sum("amount")),
+        "head__name",
+    )
+    _add_grouped(
+        committed,
+        Commitment.objects.filter(**funding_filter)
+        .values("head").annotate(total=Sum("gross_amount")),
+        "head",
+    )
+    _add_grouped(
+        committed_paid,
+        Payment.objects.filter(commitment__funding_type=funding_type, commitment__funding_id=funding_id)
+        .values("commitment__head").annotate(total=Sum("amount")),
+        "commitment__head",
+    )
+
+    heads = set(sanction) | set(receipt) | set(paid) | set(committed)
+
+    return {
+        head: {
+            "sanction_amount": sanction[head],
+            "receipt_amount": receipt[head],
+            "paid_amount": paid[head],
+            "committed_amount": committed[head],
+            "committed_remaining": committed[head] - committed_paid[head],
+        }
+        for head in heads
+    }
+
+
+def rebuild_funding_head_balances(funding_type, funding_id):
+    """
+    Replace the FundingHeadBalance rows of one funding source from the
+    ledger. Used by `manage.py rebuild_funding_balances` and for sources that
+    have no rows yet; saves keep the rows current with apply_balance_deltas.
+    Returns whether any rows were deleted or created.
+    """
+    if funding_type not in FUNDING_MODELS or not funding_id:
+        return False
+
+    with transaction.atomic():
+        funding_model = FUNDING_MODELS[funding_type]
+        funding_exists = funding_model.objects.select_for_update().filter(pk=funding_id).exists()
+
+        deleted, _ = FundingHeadBalance.objects.filter(
+            funding_type=funding_type, funding_id=funding_id
+        ).delete()
+
+        created = []
+        if funding_exists:
+            totals = compute_funding_head_totals(funding_type, funding_id)
+
+            created = FundingHeadBalance.objects.bulk_create([
+                FundingHeadBalance(
+                    funding_type=funding_type,
+                    funding_id=funding_id,
+                    head=head,
+                    **values
+                )
+                for head, values in totals.items()
+            ])
+
+    # a source with an empty ledger keeps its version, so its cached reports stay valid
+    if deleted or created:
+        bump_versions([funding_scope(funding_type, funding_id)])
+
+    return bool(deleted or created)
+
+
+def _ledger_funding_key(row):
+    """(funding_type, funding_id) of a Payment / Commitment / Receipt row or snapshot."""
+    if getattr(row, "project_id", None):
+        return ("PROJECT", row.project_id)
+    if getattr(row, "seed_grant_id", None):
+        return ("SEED", row.seed_grant_id)
+    if getattr(row, "tdg_grant_id", None):
+        return ("TDG", row.tdg_grant_id)
+    return None
+
+
+def _related_row(row, name, model, pk, fields):
+    """`fields` of the related object, from the cache of `row` when it holds the same pk."""
+    state = getattr(row, "_state", None)
+    cached = state.fields_cache.get(name) if state else None
+
+    if cached is not None and cached.pk == pk:
+        return tuple(getattr(cached, field) for field in fields)
+
+    return model._base_manager.filter(pk=pk).values_list(*fields).first()
+
+
+def _receipt_head_name(row):
+    found = _related_row(row, "head", ReceiptHead, row.head_id, ["name"]) if row.head_id else None
+    return _head_name(found[0] if found else None)
+
+
+def ledger_entries(row, model, commitment_paid=Decimal("0.00")):
+    """
+    [(funding_key, head, column, amount)] one ledger row adds to
+    FundingHeadBalance. `row` is the instance or a snapshot of its stored
+    attnames. For a commitment, `commitment_paid` is what its payments
+    already took off the remaining amount.
+    """
+    if model is Payment:
+        entries = [(_ledger_funding_key(row), _receipt_head_name(row), "paid_amount", row.amount)]
+
+        if row.commitment_id:
+            commitment = _related_row(
+                row, "commitment", Commitment, row.commitment_id,
+                ["project_id", "seed_grant_id", "tdg_grant_id", "head"],
+            )
+            if commitment:
+                key = _ledger_funding_key(SimpleNamespace(
+                    project_id=commitment[0], seed_grant_id=commitment[1], tdg_grant_id=commitment[2],
+                ))
+                entries.append((key, _head_name(commitment[3]), "committed_remaining", -(row.amount or 0)))
+
+        return entries
+
+    if model is Commitment:
+        key, head = _ledger_funding_key(row), _head_name(row.head)
+        return [
+            (key, head, "committed_amount", row.gross_amount),
+            (key, head, "committed_remaining", (row.gross_amount or 0) - commitment_paid),
+        ]
+
+    if model is ReceiptAllocation:
+        receipt = _related_row(row, "receipt", Receipt, row.receipt_id, ["project_id", "seed_grant_id", "tdg_grant_id"])
+        key = _ledger_funding_key(SimpleNamespace(
+            project_id=receipt[0], seed_grant_id=receipt[1], tdg_grant_id=receipt[2],
+        )) if receipt else None
+        return [(key, _receipt_head_name(row), "receipt_amount", row.amount)]
+
+    if model is ProjectSanctionDistribution:
+        key = ("PROJECT", row.project_id) if row.project_id else None
+        return [(key, _receipt_head_name(row), "sanction_amount", row.sanctioned_amount)]
+
+    return []
+
+
+def _commitment_paid(commitment_id):
+    return Payment.objects.filter(commitment_id=commitment_id).aggregate(
+        total=Coalesce(Sum("amount"), Decimal("0.00"))
+    )["total"]
+
+
+def ledger_balance_deltas(instance, old=None, deleted=False):
+    """
+    {(funding_type, funding_id, head): {column: amount}} a save or delete of
+    one ledger row changes FundingHeadBalance by. `old` is the snapshot of
+    the row before the save (None for a new row).
+    """
+    model = type(instance)
+    deltas = defaultdict(lambda: defaultdict(Decimal))
+
+    def add(entries, sign):
+        for key, head, column, amount in entries:
+            if key and amount:
+                deltas[(*key, head)][column] += sign * amount
+
+    if model is Receipt:
+        # the allocations follow their receipt to another funding source
+        old_key = _ledger_funding_key(old) if old is not None else None
+        new_key = _ledger_funding_key(instance)
+
+        if old is not None and not deleted and old_key != new_key:
+            allocations = (
+                ReceiptAllocation.objects.filter(receipt_id=instance.pk)
+                .values("head__name").annotate(total=Sum("amount"))
+            )
+            for row in allocations:
+                head = _head_name(row["head__name"])
+                add([(old_key, head, "receipt_amount", row["total"])], -1)
+                add([(new_key, head, "receipt_amount", row["total"])], 1)
+
+        return deltas
+
+    old_paid = new_paid = Decimal("0.00")
+    if model is Commitment and instance.pk:
+        # the paid part moves with the commitment only when its source or head changes
+        placement = (_ledger_funding_key(instance), _head_name(instance.head))
+        if deleted:
+            old_paid = _commitment_paid(instance.pk)
+        elif old is not None and (_ledger_funding_key(old), _head_name(old.head)) != placement:
+            old_paid = new_paid = _commitment_paid(instance.pk)
+
+    if deleted:
+        add(ledger_entries(instance, model, old_paid), -1)
+        return deltas
+
+    if old is not None:
+        add(ledger_entries(old, model, old_paid), -1)
+    add(ledger_entries(instance, model, new_paid), 1)
+
+    return deltas
+
+
+def apply_balance_deltas(deltas):
+    """
+    Add {(funding_type, funding_id, head): {column: amount}} to the
+    FundingHeadBalance rows with F() increments, creating missing rows.
+    Rows are updated in key order so concurrent writers cannot deadlock.
+    """
+    for (funding_type, funding_id, head), columns in sorted(deltas.items()):
+        columns = {column: amount for column, amount in columns.items() if amount}
+
+        if not columns or funding_type not in FUNDING_MODELS or not funding_id:
+            continue
+
+        rows = FundingHeadBalance.objects.filter(funding_type=funding_type, funding_id=funding_id, head=head)
+        increments = {column: F(column) + amount for column, amount in columns.items()}
+
+        if rows.update(updated_at=timezone.now(), **increments):
+            continue
+
+        try:
+            with transaction.atomic():
+                FundingHeadBalance.objects.create(
+                    funding_type=funding_type, funding_id=funding_id, head=head, **columns
+                )
+        except IntegrityError:
+            # created by a concurrent writer in the meantime
+            rows.update(updated_at=timezone.now(), **increments)
+
+
+# queryset update() skips the signals; these columns move ledger amounts
+LEDGER_UPDATE_FIELDS = {
+    "Payment": {"amount", "head", "funding_type", "funding_id", "project", "seed_grant", "tdg_grant", "commitment"},
+    "Commitment": {"gross_amount", "head", "funding_type", "funding_id", "project", "seed_grant", "tdg_grant"},
+    "Receipt": {"funding_type", "funding_id", "project", "seed_grant", "tdg_grant"},
+    "ReceiptAllocation": {"amount", "head", "receipt"},
+    "ProjectSanctionDistribution": {"sanctioned_amount", "head", "project"},
+}
+
+# (funding_type, funding_id) paths of the sources a ledger row counts towards,
+# None for the type when it is always a project
+LEDGER_SOURCE_PATHS = {
+    "Payment": [("funding_type", "funding_id"), ("commitment__funding_type", "commitment__funding_id")],
+    "Commitment": [("funding_type", "funding_id")],
+    "Receipt": [("funding_type", "funding_id")],
+    "ReceiptAllocation": [("receipt__funding_type", "receipt__funding_id")],
+    "ProjectSanctionDistribution": [(None, "project_id")],
+}
+
+
+def touches_ledger(model, fields):
+    """Whether a queryset update() of `fields` changes FundingHeadBalance."""
+    ledger_fields = LEDGER_UPDATE_FIELDS.get(model.__name__, set())
+    return any(model._meta.get_field(name).name in ledger_fields for name in fields)
+
+
+def ledger_source_keys(queryset):
+    """(funding_type, funding_id) of the sources the rows of `queryset` count towards."""
+    keys = set()
+
+    for type_path, id_path in LEDGER_SOURCE_PATHS.get(queryset.model.__name__, []):
+        if type_path is None:
+            rows = (("PROJECT", pk) for pk in queryset.order_by().values_list(id_path, flat=True).distinct())
+        else:
+            rows = queryset.order_by().values_list(type_path, id_path).distinct()
+
+        keys.update((funding_type, funding_id) for funding_type, funding_id in rows if funding_type and funding_id)
+
+    return keys
+
+
+def queue_balance_rebuild(keys):
+    """Rebuild the balances of these sources once the current transaction commits."""
+    keys = sorted(keys)
+    if not keys:
+        return
+
+    def rebuild():
+        for funding_type, funding_id in keys:
+            rebuild_funding_head_balances(funding_type, funding_id)
+
+    transaction.on_commit(rebuild)
+
+
+def merge_balance_deltas(target, deltas):
+    for key, columns in deltas.items():
+        for column, amount in columns.items():
+            target[key][column] += amount
+    return target
+
+
+def rebuild_all_funding_head_balances(missing_only=False):
+    """Rebuild every funding source, or with missing_only those without any balance rows."""
+    count = 0
+    for funding_type, funding_model in FUNDING_MODELS.items():
+        sources = funding_model.objects.all()
+        if missing_only:
+            sources = sources.exclude(
+                Exists(FundingHeadBalance.objects.filter(funding_type=funding_type, funding_id=OuterRef("pk")))
+            )
+
+        for funding_id in list(sources.values_list("id", flat=True)):
+            rebuild_funding_head_balances(funding_type, funding_id)
+            count += 1
+    return count
+
+
+# Bulk payment entry
+
+PAYMENT_BULK_FIELDS = [
+    "funding_type", "funding_id", "date", "bill_date", "cheque_no", "utr_no",
+    "amount", "purpose", "gst_tds_type", "payment_status",
+    "payee_pan", "payee_bank_name", "payee_branch_name", "payee_account_no", "payee_ifsc",
+    "payee_email", "other_email", "cc_email_default", "cc_email_po_store",
+]
+
+PAYMENT_BULK_RELATED = {
+    "payment_type": PaymentType,
+    "head": ReceiptHead,
+    "payee": Payee,
+    "bank": Bank,
+    "tds_section": TDSSection,
+    "tds_rate": TDSRate,
+    "commitment": Commitment,
+    "project": Project,
+    "seed_grant": SeedGrant,
+    "tdg_grant": TDGGrant,
+}
+
+FUNDING_FIELDS = {
+    "PROJECT": "project",
+    "SEED": "seed_grant",
+    "TDG": "tdg_grant",
+}
+
+
+def _parse_payment_row(row):
+    """Split one grid row into scalar values and related ids."""
+    values, related_ids, errors = {}, {}, {}
+
+    if not isinstance(row, dict):
+        return values, related_ids, {"non_field_errors": "Invalid row."}
+
+    for name, raw in row.items():
+        if raw == "":
+            raw = None
+
+        if name in PAYMENT_BULK_RELATED:
+            if raw is None:
+                related_ids[name] = None
+                continue
+            try:
+                related_ids[name] = int(raw)
+            except (TypeError, ValueError):
+                errors[name] = f'Invalid pk "{raw}".'
+
+        elif name in PAYMENT_BULK_FIELDS:
+            try:
+                values[name] = Payment._meta.get_field(name).to_python(raw)
+            except ValidationError as e:
+                errors[name] = " ".join(e.messages)
+
+    # funding_type / funding_id pick the FK the same way Payment.save does
+    funding_type = values.get("funding_type")
+    if funding_type in FUNDING_FIELDS and values.get("funding_id"):
+        for field in FUNDING_FIELDS.values():
+            related_ids[field] = None
+        related_ids[FUNDING_FIELDS[funding_type]] = values["funding_id"]
+
+    return values, related_ids, errors
+
+
+def _check_payment(payment, remaining):
+    """
+    In-memory version of Payment.clean() for bulk rows. `remaining` holds the
+    open balance per commitment left by the rows accepted so far.
+    """
+    errors = {}
+
+    fundings = [f for f in (payment.seed_grant, payment.tdg_grant, payment.project) if f]
+
+    if not fundings:
+        errors["__all__"] = "Select exactly one funding source."
+    elif len(fundings) != 1:
+        errors["__all__"] = "Only one funding source is allowed."
+
+    funding = fundings[0] if fundings else None
+
+    if funding and payment.bill_date:
+        effective_end = funding.get_effective_end_date()
+        if effective_end and payment.bill_date > effective_end:
+            errors["bill_date"] = (
+                f"Funding expired on {effective_end}. Payment date not allowed."
+            )
+
+    if not payment.payee:
+        errors["payee"] = "Payee is mandatory."
+
+    if not payment.bank:
+        errors["bank"] = "Bank is mandatory."
+
+    if payment.payment_type:
+        if payment.payment_type.name.lower() in ["manpower", "purchase order"] and not payment.commitment:
+            errors["commitment"] = "Commitmnet code is mandatory for this payment type."
+
+    commitment = payment.commitment
+
+    if commitment:
+        if commitment.status == "CLOSED":
+            errors["commitment"] = "This commitment is closed."
+
+        if payment.seed_grant and commitment.seed_grant_id != payment.seed_grant.pk:
+            errors["commitment"] = (
+                f"Commitment {commitment.commitment_code} does not belong "
+                f"to seed grant {payment.seed_grant.short_no}"
+            )
+        elif payment.tdg_grant and commitment.tdg_grant_id != payment.tdg_grant.pk:
+            errors["commitment"] = (
+                f"Commitment {commitment.commitment_code} does not belong "
+                f"to TDG grant {payment.tdg_grant.short_no}"
+            )
+        elif payment.project and commitment.project_id != payment.project.pk:
+            errors["commitment"] = (
+                f"Commitment {commitment.commitment_code} does not belong "
+                f"to project {payment.project.project_short_no}"
+            )
+
+        if payment.amount is not None and "amount" not in errors:
+            if payment.amount > remaining[commitment.pk]:
+                errors["amount"] = (
+                    f"Only {remaining[commitment.pk]} remaining in this comitment."
+                )
+
+    if funding:
+        faculty = getattr(funding, "faculty", None)
+        payment.pi_name = getattr(funding, "pi_name", None)
+        payment.pi_email = faculty.email if faculty else None
+
+    if payment.payee:
+        payment.payee_email = payment.payee.email
+
+    try:
+        payment.clean_fields(exclude=list(PAYMENT_BULK_RELATED))
+    except ValidationError as e:
+        for field, messages in e.message_dict.items():
+            errors.setdefault(field, " ".join(messages))
+
+    return errors
+
+
+def bulk_create_payments(rows, user=None):
+    """
+    Validate and insert a batch of payment rows in one transaction.
+
+    Related objects and commitment paid totals are fetched once for the whole
+    batch, every commitment involved is locked once, and the rows are written
+    with bulk_create. Nothing is saved unless every row is valid.
+
+    Returns (payments, errors) where errors is a list of {"row", "errors"}.
+    """
+    parsed = [_parse_payment_row(row) for row in rows]
+
+    ids = defaultdict(set)
+    for _, related_ids, _ in parsed:
+        for name, pk in related_ids.items():
+            if pk:
+                ids[name].add(pk)
+
+    with transaction.atomic():
+        related = {}
+        for name, model in PAYMENT_BULK_RELATED.items():
+            if name == "commitment":
+                continue
+            qs = model.objects.all()
+            if model in (Project, SeedGrant, TDGGrant):
+                qs = qs.select_related("faculty")
+            related[name] = qs.in_bulk(ids[name]) if ids[name] else {}
+
+        commitment_ids = sorted(ids["commitment"])
+        list(Commitment.objects.select_for_update().filter(pk__in=commitment_ids).order_by("pk").values_list("pk"))
+        related["commitment"] = Commitment.objects.filter(pk__in=commitment_ids).with_paid_totals().in_bulk()
+        remaining = {
+            pk: commitment.gross_amount - commitment.paid_total
+            for pk, commitment in related["commitment"].items()
+        }
+
+        built = []
+
+        for values, related_ids, row_errors in parsed:
+            payment = Payment(**values)
+
+            for name, pk in related_ids.items():
+                obj = related[name].get(pk) if pk else None
+                if pk and obj is None:
+                    row_errors.setdefault(name, f'Invalid pk "{pk}" - object does not exist.')
+                setattr(payment, name, obj)
+
+            built.append((payment, row_errors))
+
+        apply_taxes(payment for payment, _ in built)
+
+        payments, errors = [], []
+
+        for index, (payment, row_errors) in enumerate(built):
+            for field, message in _check_payment(payment, remaining).items():
+                row_errors.setdefault(field, message)
+
+            if row_errors:
+                errors.append({"row": index, "errors": row_errors})
+            else:
+                if payment.commitment:
+                    remaining[payment.commitment.pk] -= payment.amount
+                payments.append(payment)
+
+        if errors:
+            return [], errors
+
+        # bulk_create skips the pre_save signals that fill these columns
+        for payment in payments:
+            payment.sync_funding_columns()
+            payment.search_text = build_search_text(payment)
+
+        payments = Payment.objects.bulk_create(payments)
+
+        queue_audit_entries([
+            build_entry(user, "Payment", payment.pk, payment.short_no, "CREATE")
+            for payment in payments
+        ])
+
+        deltas = defaultdict(lambda: defaultdict(Decimal))
+        for payment in payments:
+            merge_balance_deltas(deltas, ledger_balance_deltas(payment))
+        apply_balance_deltas(deltas)
+
+        keys = {get_funding_key(payment) for payment in payments} - {None}
+
+        bump_versions([model_scope("payment")] + [funding_scope(*key) for key in keys])
+
+        paid_ids = [p.pk for p in payments if p.payment_status == "PAID" and not p.email_sent_log]
+        if paid_ids:
+            transaction.on_commit(
+                lambda: [send_payment_email_task.delay(pk) for pk in paid_ids]
+            )
+
+    return payments, errors
+
+
+# Tax recalculation
+
+def _recalculate_tax_batch(batch, user=None):
+    old = {p.pk: [getattr(p, field) for field in TAX_FIELDS] for p in batch}
+
+    apply_taxes(batch)
+
+    changed, logs = [], []
+
+    for payment in batch:
+        changes = {
+            field: {"old": str(old_value), "new": str(getattr(payment, field))}
+            for field, old_value in zip(TAX_FIELDS, old[payment.pk])
+            if old_value != getattr(payment, field)
+        }
+        if not changes:
+            continue
+
+        changed.append(payment)
+        logs.append(build_entry(user, "Payment", payment.pk, payment.short_no, "UPDATE", changes))
+
+    # per-row entries carry the actual diffs, so skip the queryset summary
+    with transaction.atomic(), skip_queryset_audit():
+        Payment.objects.bulk_update(changed, TAX_FIELDS)
+        queue_audit_entries(logs)
+        if changed:
+            bump_versions(queryset_scopes(Payment.objects.filter(pk__in=[p.pk for p in changed])))
+
+    return len(changed)
+
+
+def recalculate_payment_taxes(queryset=None, user=None, batch_size=500):
+    """
+    Recompute TDS / GST-TDS / net amount for a set of payments (all by default)
+    with the batch tax engine, e.g. after a TDS rate correction.
+    Only rows whose values change are written. Returns that count.
+    """
+    if queryset is None:
+        queryset = Payment.objects.all()
+
+    queryset = queryset.select_related("project", "seed_grant", "tdg_grant").order_by("pk")
+
+    updated = 0
+    batch = []
+
+    for payment in queryset.iterator(chunk_size=batch_size):
+        batch.append(payment)
+        if len(batch) >= batch_size:
+            updated += _recalculate_tax_batch(batch, user)
+            batch = []
+
+    if batch:
+        updated += _recalculate_tax_batch(batch, user)
+
+    return updated
+
+
+# Faculty dashboard
+
+# funding_type -> (model, FK on CoPiName, number, short number, title, sanction)
+DASHBOARD_SOURCES = {
+    "PROJECT": (Project, "project", "project_no", "project_short_no", "project_title", "sanction_amount"),
+    "SEED": (SeedGrant, "seed_grant", "grant_no", "short_no", "title", "total_budget"),
+    "TDG": (TDGGrant, "tdg_grant", "grant_no", "short_no", "title", "total_budget"),
+}
+
+# headline figure -> FundingHeadBalance column summed over the heads
+DASHBOARD_BALANCES = {
+    "received": "receipt_amount",
+    "paid": "paid_amount",
+    "committed": "committed_amount",
+    "committed_remaining": "committed_remaining",
+}
+
+# a new or re-assigned funding source shows up through these
+DASHBOARD_MODEL_SCOPES = [model_scope(name) for name in ("project", "seedgrant", "tdggrant", "copiname")]
+
+AMOUNT = DecimalField(max_digits=15, decimal_places=2)
+
+
+def _balance_total(funding_type, column):
+    totals = (
+        FundingHeadBalance.objects.filter(funding_type=funding_type, funding_id=OuterRef("pk"))
+        .order_by().values("funding_id").annotate(total=Sum(column)).values("total")
+    )
+    return Coalesce(Subquery(totals, output_field=AMOUNT), Value(Decimal("0")), output_field=AMOUNT)
+
+
+def _dashboard_queryset(faculty, funding_type):
+    model, copi_relation, number, short_no, title, sanction = DASHBOARD_SOURCES[funding_type]
+
+    is_copi = Exists(CoPiName.objects.filter(faculty=faculty, **{copi_relation: OuterRef("pk")}))
+    scope = Concat(Value(f"funding:{funding_type}:"), Cast(OuterRef("pk"), CharField()))
+
+    return (
+        model.objects.filter(Q(faculty=faculty) | is_copi)
+        .order_by()
+        .annotate(
+            funding_type_=Value(funding_type, output_field=CharField()),
+            funding_no=F(number),
+            funding_short_no=F(short_no),
+            funding_title=F(title),
+            role=Case(When(faculty=faculty, then=Value("PI")), default=Value("CO_PI"), output_field=CharField()),
+            sanction=Coalesce(F(sanction), Value(Decimal("0")), output_field=AMOUNT),
+            **{name: _balance_total(funding_type, column) for name, column in DASHBOARD_BALANCES.items()},
+            # read in the same statement, so the cached rows and versions match
+            version=Coalesce(Subquery(DataVersion.objects.filter(scope=scope).values("version")[:1]), Value(0)),
+        )
+        .values(
+            "pk", "funding_type_", "funding_no", "funding_short_no", "funding_title", "pi_name",
+            "role", "sanction", *DASHBOARD_BALANCES, "version",
+        )
+    )
+
+
+def compute_faculty_dashboard(faculty):
+    """
+    Owned and co-PI projects / seed grants / TDG grants of a faculty with
+    their headline balances, from one UNION query. A source without
+    FundingHeadBalance rows has an empty ledger and counts as zero; the rows
+    are kept on write and repaired by `manage.py rebuild_funding_balances`.
+    Returns (data, versions) where versions are the DataVersions of the
+    funding sources listed.
+    """
+    querysets = [_dashboard_queryset(faculty, funding_type) for funding_type in DASHBOARD_SOURCES]
+    rows = querysets[0].union(*querysets[1:], all=True)
+
+    data = {
+        "projects": [], "seed_grants": [], "tdg_grants": [],
+        "copi_projects": [], "copi_seeds": [], "copi_tdgs": [],
+    }
+    lists = {
+        ("PROJECT", "PI"): "projects", ("SEED", "PI"): "seed_grants", ("TDG", "PI"): "tdg_grants",
+        ("PROJECT", "CO_PI"): "copi_projects", ("SEED", "CO_PI"): "copi_seeds", ("TDG", "CO_PI"): "copi_tdgs",
+    }
+    versions = {}
+
+    for row in sorted(rows, key=lambda r: (r["funding_type_"], r["funding_no"] or "")):
+        funding_type = row["funding_type_"]
+        versions[funding_scope(funding_type, row["pk"])] = row["version"]
+
+        if funding_type == "PROJECT":
+            url = reverse("project_balance_sheet", args=[row["funding_short_no"]])
+        else:
+            url = reverse("bill_report_user", args=[urllib.parse.quote(row["funding_no"], safe="")])
+
+        data[lists[(funding_type, row["role"])]].append({
+            "funding_type": funding_type,
+            "id": row["pk"],
+            "number": row["funding_no"],
+            "short_no": row["funding_short_no"],
+            "title": row["funding_title"],
+            "pi_name": row["pi_name"],
+            "sanction": row["sanction"],
+            **{name: row[name] for name in DASHBOARD_BALANCES},
+            "balance": row["received"] - row["paid"],
+            "url": url,
+        })
+
+    return data, versions
+
+
+def faculty_dashboard(faculty):
+    """
+    compute_faculty_dashboard, cached per faculty in the report cache and
+    reused while the DataVersions of its funding sources are unchanged.
+    """
+    cache = report_cache()
+    key = f"dashboard:{faculty.pk}"
+
+    try:
+        cached = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Dashboard cache read failed for {key}: {e}")
+        cached = None
+
+    if cached is not None:
+        current, _ = get_versions(list(cached["versions"]))
+        if current == cached["versions"]:
+            return cached["data"]
+
+    # read before computing, so a concurrent change can only make the entry look stale
+    model_versions, _ = get_versions(DASHBOARD_MODEL_SCOPES)
+    data, versions = compute_faculty_dashboard(faculty)
+    versions.update(model_versions)
+
+    try:
+        cache.set(key, {"data": data, "versions": versions}, settings.REPORT_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Dashboard cache write failed for {key}: {e}")
+
+    return data
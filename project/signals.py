@@ -1,13 +1,24 @@
-from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
+from django.db import transaction
 from django.utils import timezone
 from django.core.mail import EmailMessage
 from django.forms.models import model_to_dict
-from .models import AuditLog
+from types import SimpleNamespace
+from .models import AuditSnapshotMixin
+from .audit import queue_audit
 from .tasks import send_payment_email_task
 from .utils import get_current_user
 
-from .models import Payment
+from .models import Payment, Commitment, Receipt, ReceiptAllocation, ProjectSanctionDistribution
+from .models import Expenditure, FundRequest, FundingHeadBalance
+from .services import FUNDING_COLUMN_MODELS, get_funding_key, refresh_funding_short_no
+from .services import apply_balance_deltas, ledger_balance_deltas
+from .models import TDSRate
+from .taxes import clear_tds_rate_cache
+from .search import SEARCH_TEXT_MODELS, FUNDING_RELATIONS, build_search_text, refresh_funding_search_text
+from .reports import normalize_head
+from .versions import FUNDING_SOURCE_TYPES, bump_versions, funding_scope, model_scope
 
 user = get_current_user()
 
@@ -24,33 +35,43 @@ def send_payment_email(sender, instance, **kwargs):
 
 TRACK_MODELS = ["Payment", "Commitment", "Expenditure"]
 
-def get_changes(old, new):
+def get_changes(instance, old_values):
+    """
+    Diff the instance against the values it was loaded with. Related objects
+    are only fetched for foreign keys that actually changed.
+    """
     changes = {}
 
-    for field in new._meta.fields:
-        field_name = field.name
+    for field in instance._meta.concrete_fields:
+        if field.name == "search_text":
+            continue
 
-        old_value = getattr(old, field_name, None)
-        new_value = getattr(new, field_name, None)
+        old_value = old_values.get(field.attname)
+        new_value = getattr(instance, field.attname)
 
-        if old_value != new_value:
-            changes[field_name] = {
-                "old": str(old_value),
-                "new": str(new_value)
-            }
+        if old_value == new_value:
+            continue
+
+        if field.is_relation:
+            old_value = (
+                field.related_model._base_manager.filter(pk=old_value).first()
+                if old_value is not None else None
+            )
+            new_value = getattr(instance, field.name)
+
+        changes[field.name] = {
+            "old": str(old_value),
+            "new": str(new_value)
+        }
 
     return changes
 
 @receiver(pre_save)
-def store_old_instance(sender, instance, **kwargs):
+def store_old_values(sender, instance, **kwargs):
     if sender.__name__ not in TRACK_MODELS:
         return
 
-    if instance.pk:
-        try:
-            instance._old_instance = sender.objects.get(pk=instance.pk)  
-        except sender.DoesNotExist:
-            instance._old_instance = None
+    instance._old_values = instance.get_loaded_values()
 
 @receiver(post_save)
 def log_create_update(sender, instance, created, **kwargs):
@@ -63,7 +84,7 @@ def log_create_update(sender, instance, created, **kwargs):
     
 
     if created:
-        AuditLog.objects.create(
+        queue_audit(
             user=user,
             model_name=sender.__name__,
             object_id=instance.pk,
@@ -72,13 +93,13 @@ def log_create_update(sender, instance, created, **kwargs):
             changes={}
         )
     else:
-        old = getattr(instance, "_old_instance", None)
+        old_values = getattr(instance, "_old_values", None)
 
-        if old:
-            changes = get_changes(old, instance)
+        if old_values:
+            changes = get_changes(instance, old_values)
 
             if changes:
-                AuditLog.objects.create(
+                queue_audit(
                     user=user,
                     model_name=sender.__name__,
                     object_id=instance.pk,
@@ -87,13 +108,15 @@ def log_create_update(sender, instance, created, **kwargs):
                     changes=changes
                 )
 
+    instance.reset_loaded_values()
+
 @receiver(post_delete)
 def log_delete(sender, instance, **kwargs):
     if sender.__name__ not in TRACK_MODELS:
         return
     user = getattr(instance, "_current_user", None)
 
-    AuditLog.objects.create(
+    queue_audit(
         user=user,
         model_name=sender.__name__,
         object_id=instance.pk,
@@ -109,4 +132,147 @@ def get_object_value(instance):
         return instance.project_no
     elif hasattr(instance, 'grant_no'):
         return instance.grant_no
-    return str(instance.pk)
\ No newline at end of file
+    return str(instance.pk)
+
+
+# Funding head balance ledger
+
+LEDGER_MODELS = (Payment, Commitment, Receipt, ReceiptAllocation, ProjectSanctionDistribution)
+
+# rows whose old funding source is remembered for the balances and the data versions
+FUNDED_MODELS = LEDGER_MODELS + (Expenditure, FundRequest)
+
+def locked_ledger_row(sender, instance):
+    """
+    The stored row behind `instance`, locked until the save / delete commits.
+    Balance deltas are taken from it rather than from the values `instance`
+    was loaded with, which another writer may have changed since.
+    """
+    return sender._base_manager.select_for_update().filter(pk=instance.pk).first()
+
+@receiver(pre_save)
+def store_old_funding_key(sender, instance, **kwargs):
+    if sender not in FUNDED_MODELS:
+        return
+
+    instance._old_funding_key = None
+    instance._old_ledger_row = None
+
+    if instance.pk:
+        if sender in LEDGER_MODELS:
+            # ledger saves run in atomic(), see their save() methods
+            old = locked_ledger_row(sender, instance)
+        elif isinstance(instance, AuditSnapshotMixin):
+            values = instance.get_loaded_values()
+            old = SimpleNamespace(**values) if values else None
+        else:
+            old = sender.objects.filter(pk=instance.pk).first()
+
+        if old:
+            instance._old_funding_key = get_funding_key(old)
+            instance._old_ledger_row = old
+
+@receiver(post_save)
+def update_funding_balances_on_save(sender, instance, **kwargs):
+    if sender not in LEDGER_MODELS:
+        return
+    apply_balance_deltas(ledger_balance_deltas(instance, getattr(instance, "_old_ledger_row", None)))
+    instance._old_ledger_row = None
+
+@receiver(pre_delete)
+def store_deleted_ledger_row(sender, instance, **kwargs):
+    if sender not in LEDGER_MODELS:
+        return
+    # delete() sends pre_delete inside its transaction
+    instance._deleted_ledger_row = locked_ledger_row(sender, instance)
+
+@receiver(post_delete)
+def update_funding_balances_on_delete(sender, instance, **kwargs):
+    if sender not in LEDGER_MODELS:
+        return
+
+    row = getattr(instance, "_deleted_ledger_row", instance)
+    if row is None:
+        # already deleted by someone else, who took it off the balances
+        return
+
+    apply_balance_deltas(ledger_balance_deltas(row, deleted=True))
+
+@receiver(post_delete)
+def delete_funding_balances(sender, instance, **kwargs):
+    funding_type = FUNDING_SOURCE_TYPES.get(sender.__name__)
+    if funding_type:
+        FundingHeadBalance.objects.filter(funding_type=funding_type, funding_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=TDSRate)
+@receiver(post_delete, sender=TDSRate)
+def reset_tds_rate_cache(sender, instance, **kwargs):
+    transaction.on_commit(clear_tds_rate_cache)
+
+
+@receiver(pre_save)
+def update_funding_columns(sender, instance, **kwargs):
+    if sender not in FUNDING_COLUMN_MODELS:
+        return
+
+    instance.sync_funding_columns()
+
+
+@receiver(pre_save)
+def update_search_text(sender, instance, **kwargs):
+    if sender.__name__ not in SEARCH_TEXT_MODELS:
+        return
+
+    instance.search_text = build_search_text(instance)
+
+
+@receiver(pre_save)
+def update_head_key(sender, instance, **kwargs):
+    if sender not in (Expenditure, Commitment):
+        return
+
+    instance.head_key = normalize_head(instance.head)
+
+
+@receiver(post_save)
+def update_funded_search_text(sender, instance, created, **kwargs):
+    if created or sender.__name__ not in FUNDING_RELATIONS:
+        return
+
+    refresh_funding_search_text(instance)
+    refresh_funding_short_no(instance)
+
+
+# Data versions for conditional GETs
+
+VERSIONED_MODELS = [
+    "Payment", "Commitment", "Expenditure", "Receipt", "ReceiptAllocation", "FundRequest",
+    "ProjectSanctionDistribution", "Project", "SeedGrant", "TDGGrant", "CoPiName",
+    "BillInward", "Payee", "Faculty",
+    # lookup bundles of the Excel views, see project/bundles.py
+    "ReceiptHead", "PaymentType", "Bank", "TDSSection", "TDSRate",
+]
+
+def get_version_scopes(instance):
+    scopes = {model_scope(instance.__class__.__name__)}
+
+    if isinstance(instance, FUNDED_MODELS):
+        for key in (get_funding_key(instance), getattr(instance, "_old_funding_key", None)):
+            if key and key[1]:
+                scopes.add(funding_scope(*key))
+
+    funding_type = FUNDING_SOURCE_TYPES.get(instance.__class__.__name__)
+    if funding_type:
+        scopes.add(funding_scope(funding_type, instance.pk))
+
+    return scopes
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_data_versions(sender, instance, **kwargs):
+    if sender.__name__ not in VERSIONED_MODELS:
+        return
+
+    bump_versions(get_version_scopes(instance))
+
@@ -1,7 +1,17 @@
+import logging
+import tablib
 from celery import shared_task
+from django.core.files.base import ContentFile
 from django.core.mail import EmailMessage
+from django.core.management import call_command
 from django.utils import timezone
-from .models import Payment
+from import_export.formats.base_formats import CSV, XLS, XLSX
+from .models import Payment, ImportJob, ChequeLetterJob
+from .resources import CachedLookupMixin, PaymentResource, ExpenditureResource, CommitmentResource, ProjectResource
+from .audit import save_audit_entries
+from .cheque_letters import build_letters, letter_payments, render_letters_pdf, render_letters_zip
+
+logger = logging.getLogger("project_portal")
 
 @shared_task(bind=True, max_retries=3)
 def send_payment_email_task(self, payment_id):
@@ -70,4 +80,187 @@ IIT Hyderabad
         instance.save(update_fields=["email_sent_log"])
 
     except Exception as e:
-        raise self.retry(exc=e, countdown=10)
\ No newline at end of file
+        raise self.retry(exc=e, countdown=10)
+
+
+# Background imports
+
+IMPORT_RESOURCES = {
+    "payment": PaymentResource,
+    "expenditure": ExpenditureResource,
+    "commitment": CommitmentResource,
+    "project": ProjectResource,
+}
+
+IMPORT_FORMATS = {
+    "csv": CSV,
+    "xlsx": XLSX,
+    "xls": XLS,
+}
+
+IMPORT_CHUNK_SIZE = 500
+
+# keep the stored error list readable for very bad files
+IMPORT_MAX_ERRORS = 200
+
+
+def load_import_dataset(job):
+    file_format = IMPORT_FORMATS[job.file_format]()
+
+    with job.file.open("rb") as f:
+        data = f.read()
+
+    if not file_format.is_binary():
+        data = data.decode("utf-8-sig")
+
+    return file_format.create_dataset(data)
+
+
+@shared_task(bind=True)
+def run_import_job(self, job_id):
+    """
+    Import an ImportJob file in chunks of IMPORT_CHUNK_SIZE rows. Each chunk
+    is its own transaction, a chunk with row exceptions is rolled back while
+    the others are kept. Progress is written to the job after every chunk.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+
+    try:
+        dataset = load_import_dataset(job)
+    except Exception as e:
+        logger.error(f"Import job {job_id} could not read file: {e}")
+        ImportJob.objects.filter(pk=job_id).update(
+            status="FAILED", summary=f"Could not read file: {e}", finished_at=timezone.now()
+        )
+        return
+
+    ImportJob.objects.filter(pk=job_id).update(
+        status="RUNNING", total_rows=len(dataset), started_at=timezone.now()
+    )
+
+    resource = IMPORT_RESOURCES[job.model_name]()
+    if isinstance(resource, CachedLookupMixin):
+        # once for the whole file, not again for every chunk
+        resource.prime_lookups()
+    counts = {"new": 0, "update": 0, "skip": 0, "error": 0}
+    errors = []
+
+    def add_error(row, error):
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"row": row, "error": str(error)})
+
+    try:
+        for start in range(0, len(dataset), IMPORT_CHUNK_SIZE):
+            chunk = tablib.Dataset(*dataset[start:start + IMPORT_CHUNK_SIZE], headers=dataset.headers)
+
+            result = resource.import_data(chunk, dry_run=False, raise_errors=False, use_transactions=True)
+
+            if result.has_errors():
+                # import_data rolled the whole chunk back
+                counts["error"] += len(chunk)
+                for error in result.base_errors:
+                    add_error(None, error.error)
+                for number, row_errors in result.row_errors():
+                    for error in row_errors:
+                        add_error(start + number, error.error)
+            else:
+                for key in ("new", "update", "skip"):
+                    counts[key] += result.totals.get(key, 0)
+                counts["error"] += len(result.invalid_rows)
+                for invalid in result.invalid_rows:
+                    add_error(start + invalid.number, "; ".join(
+                        f"{field}: {', '.join(messages)}" for field, messages in invalid.error_dict.items()
+                    ))
+
+            ImportJob.objects.filter(pk=job_id).update(
+                processed_rows=min(start + IMPORT_CHUNK_SIZE, len(dataset)),
+                new_rows=counts["new"],
+                updated_rows=counts["update"],
+                skipped_rows=counts["skip"],
+                error_rows=counts["error"],
+                errors=errors,
+            )
+
+    except Exception as e:
+        logger.error(f"Import job {job_id} failed: {e}")
+        ImportJob.objects.filter(pk=job_id).update(
+            status="FAILED", summary=str(e), errors=errors, finished_at=timezone.now()
+        )
+        raise
+
+    ImportJob.objects.filter(pk=job_id).update(
+        status="SUCCESS",
+        summary=(
+            f"{counts['new']} new, {counts['update']} updated, "
+            f"{counts['skip']} skipped, {counts['error']} with errors"
+        ),
+        finished_at=timezone.now(),
+    )
+
+
+# Cheque letter batches
+
+@shared_task(bind=True)
+def run_cheque_letter_job(self, job_id):
+    """
+    Render the letters of a ChequeLetterJob to one merged PDF or a ZIP of
+    PDFs and store the file on the job. For ZIPs progress is written after
+    every letter, a merged PDF is rendered in one go.
+    """
+    job = ChequeLetterJob.objects.get(pk=job_id)
+    jobs = ChequeLetterJob.objects.filter(pk=job_id)
+
+    jobs.update(status="RUNNING", started_at=timezone.now())
+
+    try:
+        letters = build_letters(letter_payments(job.bank_id, job.date_from, job.date_to, job.cheque_nos))
+        jobs.update(total_letters=len(letters))
+
+        if not letters:
+            jobs.update(
+                status="FAILED", summary="No payments with a cheque number match the selection",
+                finished_at=timezone.now(),
+            )
+            return
+
+        if job.output_format == "zip":
+            content = render_letters_zip(letters, on_progress=lambda done: jobs.update(processed_letters=done))
+        else:
+            content = render_letters_pdf(letters)
+
+        job.file.save(f"cheque_letters_{job_id}.{job.output_format}", ContentFile(content), save=False)
+
+    except Exception as e:
+        logger.error(f"Cheque letter job {job_id} failed: {e}")
+        jobs.update(status="FAILED", summary=str(e), finished_at=timezone.now())
+        raise
+
+    payment_count = sum(len(letter["payments"]) for letter in letters)
+    total_amount = sum(letter["total_amount"] for letter in letters)
+
+    jobs.update(
+        file=job.file.name,
+        processed_letters=len(letters),
+        status="SUCCESS",
+        summary=f"{len(letters)} letters, {payment_count} payments, total Rs. {total_amount}",
+        finished_at=timezone.now(),
+    )
+
+
+@shared_task(bind=True, max_retries=3)
+def write_audit_logs_task(self, entries):
+    """Celery sink for large audit batches, see AUDIT_CELERY_BATCH_SIZE."""
+    try:
+        save_audit_entries(entries)
+    except Exception as e:
+        raise self.retry(exc=e, countdown=10)
+
+
+@shared_task
+def audit_retention_task():
+    """
+    Nightly `manage.py audit_retention`, see CELERY_BEAT_SCHEDULE. Keeps the
+    monthly audit partitions created ahead, so rows never pile up in the
+    default partition, and archives months past the retention window.
+    """
+    call_command("audit_retention")
@@ -0,0 +1,119 @@
+"""
+Batch TDS / GST-TDS computation for payments.
+
+The functions work on plain columns (amount, TDS percent, GST-TDS type) so a
+whole import or financial year can be recomputed without touching the
+database per row. Payment.calculate_taxes uses the same code for one row.
+
+Results match the former Payment.calculate_taxes: every figure is rounded
+to whole rupees with ROUND_HALF_UP, and a zero amount zeroes the GST-TDS
+and net amount but leaves tds_amount as it was (None here).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .versions import get_versions, model_scope
+
+
+GST_HALF = Decimal("0.01")
+GST_FULL = Decimal("0.02")
+ZERO = Decimal("0")
+
+TAX_FIELDS = ["tds_amount", "igst_tds", "cgst_tds", "sgst_tds", "net_amount"]
+
+TDS_RATE_CACHE_KEY = "tds_rate_percents"
+
+
+def _round(value):
+    return value.quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+
+
+def _tds(amount, percent):
+    if not amount:
+        return None
+    if percent is None:
+        return ZERO
+    return _round(amount * (Decimal(percent) / Decimal("100")))
+
+
+def compute_tax_row(amount, tds_percent=None, gst_tds_type=None):
+    """Return (tds, igst, cgst, sgst, net) for one payment."""
+    columns = compute_taxes([amount], [tds_percent], [gst_tds_type])
+    return tuple(columns[field][0] for field in TAX_FIELDS)
+
+
+def compute_taxes(amounts, tds_percents, gst_tds_types):
+    """
+    Tax columns for aligned input columns, one pass per output column.
+    Returns a dict of lists keyed by TAX_FIELDS, in input order.
+    """
+    amounts, gst_types = list(amounts), list(gst_tds_types)
+
+    tds = [_tds(amount, percent) for amount, percent in zip(amounts, tds_percents)]
+    half = [
+        _round(amount * GST_HALF) if amount and gst_type == "CGST & SGST" else ZERO
+        for amount, gst_type in zip(amounts, gst_types)
+    ]
+    igst = [
+        _round(amount * GST_FULL) if amount and gst_type == "IGST" else ZERO
+        for amount, gst_type in zip(amounts, gst_types)
+    ]
+    net = [
+        _round(amount - row_tds - (row_igst + row_half + row_half)) if amount else ZERO
+        for amount, row_tds, row_igst, row_half in zip(amounts, tds, igst, half)
+    ]
+
+    return {"tds_amount": tds, "igst_tds": igst, "cgst_tds": half, "sgst_tds": list(half), "net_amount": net}
+
+
+def _tds_rate_cache_key():
+    # a TDSRate save bumps the version, so a map read before that commit is never reused after it
+    scope = model_scope("TDSRate")
+    versions, _ = get_versions([scope])
+    return f"{TDS_RATE_CACHE_KEY}:{versions[scope]}"
+
+
+def get_tds_rate_percents():
+    """{TDSRate.id: percent}, cached per TDSRate data version."""
+    key = _tds_rate_cache_key()
+    percents = cache.get(key)
+
+    if percents is None:
+        from .models import TDSRate
+
+        percents = dict(TDSRate.objects.values_list("id", "percent"))
+        cache.set(key, percents, settings.TDS_RATE_CACHE_TIMEOUT)
+
+    return percents
+
+
+def clear_tds_rate_cache():
+    cache.delete(_tds_rate_cache_key())
+
+
+def apply_taxes(payments):
+    """
+    Fill the tax fields of unsaved or loaded Payment instances in one pass.
+    TDS percents come from the cached rate map, so tds_rate is never fetched.
+    """
+    payments = list(payments)
+    percents = get_tds_rate_percents()
+
+    if any(p.tds_rate_id and p.tds_rate_id not in percents for p in payments):
+        clear_tds_rate_cache()
+        percents = get_tds_rate_percents()
+
+    columns = compute_taxes(
+        [p.amount for p in payments],
+        [percents.get(p.tds_rate_id) if p.tds_rate_id else None for p in payments],
+        [p.gst_tds_type for p in payments],
+    )
+
+    for index, payment in enumerate(payments):
+        for field in TAX_FIELDS:
+            if columns[field][index] is not None:
+                setattr(payment, field, columns[field][index])
+
+    return payments
@@ -1,3 +1,1126 @@
-from django.test import TestCase
+import importlib
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Bank, Commitment, FundingHeadBalance, Payee, Payment, PaymentType, ReceiptHead, SeedGrant
+from .models import AuditLog, ChequeLetterJob, ImportJob, Receipt, ReceiptAllocation, TDSRate, TDSSection
+from .models import BillInward, CoPiName, Expenditure, Faculty, FundRequest, Project, ProjectSanctionDistribution, TDGGrant
+from .batch import row_version
+from .pagination import KeysetPagination
+from .querysets import QUERY_PLANS, optimized_queryset
+from .resources import FundingIndex
+from .report_cache import get_report, report_cache
+from .reports import REPORT_HEADS, prepare_report
+from .services import bulk_create_payments, compute_faculty_dashboard, compute_funding_head_totals
+from . import tasks, views
+from .taxes import TAX_FIELDS, compute_tax_row, compute_taxes, get_tds_rate_percents
+from .versions import funding_scope, get_versions
+from .views import EXPORT_CONFIG, export_rows
+
+
+class LedgerFixtures:
+    """Two seed grants, two heads and the masters a payment needs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.grants = [
+            SeedGrant.objects.create(
+                grant_no=f"SG/{n}", short_no=f"SG{n}", pi_name="PI", dept="CSE", title=f"Grant {n}",
+                sanction_date=today - timedelta(days=30), end_date=today + timedelta(days=365),
+                total_budget=Decimal("100000.00"),
+            )
+            for n in (1, 2)
+        ]
+        cls.equipment = ReceiptHead.objects.create(name="Equipment")
+        cls.travel = ReceiptHead.objects.create(name="Travel")
+        cls.payment_type = PaymentType.objects.create(name="Advance")
+        cls.bank = Bank.objects.create(bank_name="State Bank", short_no="SBI")
+        cls.payee = Payee.objects.create(
+            payee_type="VENDOR", name_of_payee="ACME", account_number="1", bank_name="SBI",
+            branch="Main", ifsc="SBIN0000001", email="acme@example.com",
+        )
+
+    def make_payment(self, amount, grant=None, head=None, payee=None, **kwargs):
+        grant = grant or self.grants[0]
+        return Payment.objects.create(
+            funding_type="SEED", funding_id=grant.pk, payment_type=self.payment_type,
+            head=head or self.equipment, payee=payee or self.payee, bank=self.bank, amount=Decimal(amount),
+            **kwargs,
+        )
+
+    def make_commitment(self, amount, grant=None, head="Equipment"):
+        return Commitment.objects.create(
+            seed_grant=grant or self.grants[0], date=date.today(), bill_date=date.today(),
+            head=head, particulars="Order", gross_amount=Decimal(amount),
+        )
+
+
+class FundingHeadBalanceTests(LedgerFixtures, TestCase):
+
+    def balances(self, grant):
+        return {
+            row.head: {
+                column: getattr(row, column)
+                for column in ("receipt_amount", "paid_amount", "committed_amount", "committed_remaining")
+            }
+            for row in FundingHeadBalance.objects.filter(funding_type="SEED", funding_id=grant.pk)
+        }
+
+    def assertMatchesLedger(self, grant):
+        kept = {
+            head: values for head, values in self.balances(grant).items()
+            if any(values.values())
+        }
+        expected = {
+            head: {column: values[column] for column in ("receipt_amount", "paid_amount", "committed_amount", "committed_remaining")}
+            for head, values in compute_funding_head_totals("SEED", grant.pk).items()
+        }
+        self.assertEqual(kept, expected)
+
+    def test_payment_create(self):
+        self.make_payment("1000.00")
+        self.make_payment("250.00")
+
+        self.assertEqual(self.balances(self.grants[0])["Equipment"]["paid_amount"], Decimal("1250.00"))
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_payment_amount_change(self):
+        payment = self.make_payment("1000.00")
+
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.amount = Decimal("400.00")
+        payment.save()
+
+        self.assertEqual(self.balances(self.grants[0])["Equipment"]["paid_amount"], Decimal("400.00"))
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_payment_head_change(self):
+        payment = self.make_payment("1000.00")
+
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.head = self.travel
+        payment.save()
+
+        balances = self.balances(self.grants[0])
+        self.assertEqual(balances["Equipment"]["paid_amount"], Decimal("0.00"))
+        self.assertEqual(balances["Travel"]["paid_amount"], Decimal("1000.00"))
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_payment_funding_change(self):
+        payment = self.make_payment("1000.00")
+
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.funding_id = self.grants[1].pk
+        payment.save()
+
+        self.assertEqual(self.balances(self.grants[0])["Equipment"]["paid_amount"], Decimal("0.00"))
+        self.assertEqual(self.balances(self.grants[1])["Equipment"]["paid_amount"], Decimal("1000.00"))
+        self.assertMatchesLedger(self.grants[0])
+        self.assertMatchesLedger(self.grants[1])
+
+    def test_payment_delete(self):
+        payment = self.make_payment("1000.00")
+        self.make_payment("300.00")
+
+        Payment.objects.get(pk=payment.pk).delete()
+
+        self.assertEqual(self.balances(self.grants[0])["Equipment"]["paid_amount"], Decimal("300.00"))
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_stale_copies_of_one_row(self):
+        payment = self.make_payment("100.00")
+        first, second = Payment.objects.get(pk=payment.pk), Payment.objects.get(pk=payment.pk)
+
+        first.amount = Decimal("200.00")
+        first.save()
+        second.amount = Decimal("300.00")
+        second.save()
+
+        self.assertEqual(self.balances(self.grants[0])["Equipment"]["paid_amount"], Decimal("300.00"))
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_stale_copy_deleted_after_an_edit(self):
+        payment = self.make_payment("100.00")
+        stale = Payment.objects.get(pk=payment.pk)
+
+        payment.head = self.travel
+        payment.amount = Decimal("200.00")
+        payment.save()
+        stale.delete()
+
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_queryset_update_of_ledger_columns(self):
+        payment = self.make_payment("100.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.filter(pk=payment.pk).update(amount=Decimal("150.00"), head=self.travel)
+
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_queryset_update_moving_rows_to_another_source(self):
+        receipt = Receipt.objects.create(seed_grant=self.grants[0], receipt_date=date.today())
+        ReceiptAllocation.objects.create(receipt=receipt, head=self.travel, amount=Decimal("500.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Receipt.objects.filter(pk=receipt.pk).update(seed_grant=self.grants[1], funding_id=self.grants[1].pk)
+            ReceiptAllocation.objects.filter(receipt=receipt).update(amount=Decimal("600.00"))
+
+        self.assertMatchesLedger(self.grants[0])
+        self.assertMatchesLedger(self.grants[1])
+        self.assertEqual(self.balances(self.grants[1])["Travel"]["receipt_amount"], Decimal("600.00"))
+
+    def test_commitment_payments(self):
+        commitment = self.make_commitment("5000.00")
+        self.make_payment("1200.00", commitment=commitment)
+
+        balances = self.balances(self.grants[0])["Equipment"]
+        self.assertEqual(balances["committed_amount"], Decimal("5000.00"))
+        self.assertEqual(balances["committed_remaining"], Decimal("3800.00"))
+        self.assertMatchesLedger(self.grants[0])
+
+    def test_commitment_head_and_funding_change(self):
+        commitment = self.make_commitment("5000.00")
+        self.make_payment("1200.00", commitment=commitment)
+
+        commitment = Commitment.objects.get(pk=commitment.pk)
+        commitment.head = "Travel"
+        commitment.gross_amount = Decimal("6000.00")
+        commitment.save()
+
+        balances = self.balances(self.grants[0])
+        self.assertEqual(balances["Equipment"]["committed_remaining"], Decimal("0.00"))
+        self.assertEqual(balances["Travel"]["committed_remaining"], Decimal("4800.00"))
+        self.assertMatchesLedger(self.grants[0])
+
+        commitment = Commitment.objects.get(pk=commitment.pk)
+        commitment.seed_grant = self.grants[1]
+        commitment.save()
+
+        self.assertEqual(self.balances(self.grants[1])["Travel"]["committed_remaining"], Decimal("4800.00"))
+        self.assertMatchesLedger(self.grants[0])
+        self.assertMatchesLedger(self.grants[1])
+
+    def test_receipt_allocations(self):
+        receipt = Receipt.objects.create(seed_grant=self.grants[0], receipt_date=date.today(), total_amount=Decimal("900.00"))
+        allocation = ReceiptAllocation.objects.create(receipt=receipt, head=self.equipment, amount=Decimal("600.00"))
+        ReceiptAllocation.objects.create(receipt=receipt, head=self.travel, amount=Decimal("300.00"))
+
+        allocation.amount = Decimal("500.00")
+        allocation.save()
+        self.assertEqual(self.balances(self.grants[0])["Equipment"]["receipt_amount"], Decimal("500.00"))
+
+        receipt.seed_grant = self.grants[1]
+        receipt.save()
+        self.assertEqual(self.balances(self.grants[1])["Travel"]["receipt_amount"], Decimal("300.00"))
+        self.assertMatchesLedger(self.grants[0])
+        self.assertMatchesLedger(self.grants[1])
+
+        receipt.delete()
+        self.assertMatchesLedger(self.grants[1])
+
+    def test_payment_create_cost_does_not_grow_with_the_grant(self):
+        self.make_payment("100.00")
+
+        with CaptureQueriesContext(connection) as small:
+            self.make_payment("100.00")
+
+        for _ in range(20):
+            self.make_payment("100.00", head=self.travel)
+
+        with CaptureQueriesContext(connection) as large:
+            self.make_payment("100.00")
+
+        self.assertEqual(len(small), len(large))
+        self.assertFalse(any("DELETE" in query["sql"] for query in large.captured_queries))
+
+
+class BulkPaymentTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def row(self, amount, grant=None, **kwargs):
+        row = {
+            "funding_type": "SEED", "funding_id": (grant or self.grants[0]).pk, "date": date.today().isoformat(),
+            "payment_type": self.payment_type.pk, "head": self.equipment.pk, "payee": self.payee.pk,
+            "bank": self.bank.pk, "amount": amount,
+        }
+        row.update(kwargs)
+        return row
+
+    def balances(self, grant):
+        return {
+            row.head: (row.paid_amount, row.committed_remaining)
+            for row in FundingHeadBalance.objects.filter(funding_type="SEED", funding_id=grant.pk)
+        }
+
+    def test_errors_are_reported_per_row(self):
+        payments, errors = bulk_create_payments([
+            self.row("100.00"),
+            self.row("abc"),
+            self.row("100.00", payee=9999),
+        ])
+
+        self.assertEqual(payments, [])
+        self.assertEqual([error["row"] for error in errors], [1, 2])
+        self.assertIn("amount", errors[0]["errors"])
+        self.assertIn("payee", errors[1]["errors"])
+
+    def test_rows_together_cannot_overpay_a_commitment(self):
+        commitment = self.make_commitment("1000.00")
+
+        payments, errors = bulk_create_payments([
+            self.row("600.00", commitment=commitment.pk),
+            self.row("600.00", commitment=commitment.pk),
+        ])
+
+        self.assertEqual(payments, [])
+        self.assertEqual([error["row"] for error in errors], [1])
+        self.assertIn("400.00", errors[0]["errors"]["amount"])
+
+    def test_one_bad_row_saves_nothing(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.post(
+            reverse("api_payment_bulk"),
+            [self.row("100.00"), self.row("200.00"), self.row("300.00", head=9999)],
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"][0]["row"], 2)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(AuditLog.objects.filter(model_name="Payment").exists())
+        self.assertEqual(self.balances(self.grants[0]), {})
+
+    def test_matches_single_saves(self):
+        self.client.force_login(self.admin)
+        bulk_commitment = self.make_commitment("1000.00", grant=self.grants[0])
+        single_commitment = self.make_commitment("1000.00", grant=self.grants[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("api_payment_bulk"),
+                [
+                    self.row("250.00", commitment=bulk_commitment.pk),
+                    self.row("100.00", head=self.travel.pk),
+                ],
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.make_payment("250.00", grant=self.grants[1], commitment=single_commitment)
+                self.make_payment("100.00", grant=self.grants[1], head=self.travel)
+
+        self.assertEqual(self.balances(self.grants[0]), self.balances(self.grants[1]))
+        self.assertEqual(
+            self.balances(self.grants[0])["Equipment"], (Decimal("250.00"), Decimal("750.00"))
+        )
+
+        bulk_ids = [str(pk) for pk in Payment.objects.filter(funding_id=self.grants[0].pk).values_list("pk", flat=True)]
+        single_ids = [str(pk) for pk in Payment.objects.filter(funding_id=self.grants[1].pk).values_list("pk", flat=True)]
+        entries = AuditLog.objects.filter(model_name="Payment")
+        self.assertEqual(
+            sorted(entries.filter(object_id__in=bulk_ids).values_list("action", flat=True)),
+            sorted(entries.filter(object_id__in=single_ids).values_list("action", flat=True)),
+        )
+        self.assertEqual(entries.filter(object_id__in=bulk_ids, action="CREATE").count(), 2)
+
+
+def old_calculate_taxes(amount, percent, gst_tds_type, tds_amount=None):
+    """Payment.calculate_taxes as it was before project/taxes.py, for comparison."""
+    igst = cgst = sgst = Decimal("0")
+
+    if not amount:
+        return tds_amount, igst, cgst, sgst, Decimal("0")
+
+    if percent is not None:
+        tds_amount = (amount * (Decimal(percent) / Decimal("100"))).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+    else:
+        tds_amount = Decimal("0")
+
+    if gst_tds_type == "CGST & SGST":
+        cgst = (amount * Decimal("0.01")).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+        sgst = (amount * Decimal("0.01")).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+    elif gst_tds_type == "IGST":
+        igst = (amount * Decimal("0.02")).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+
+    net = (amount - tds_amount - (igst + cgst + sgst)).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+    return tds_amount, igst, cgst, sgst, net
+
+
+class TaxTests(TestCase):
+
+    # x.5 after rounding for 1% / 2% / 10%, and values just below / above
+    AMOUNTS = ["50", "150", "250", "125", "75.25", "1049.99", "1050", "1050.01", "99999.50", "0.50", "25"]
+    PERCENTS = [None, "1", "2", "10", "0.75"]
+    GST_TYPES = [None, "", "CGST & SGST", "IGST"]
+
+    def cases(self):
+        for amount in self.AMOUNTS:
+            for percent in self.PERCENTS:
+                for gst_type in self.GST_TYPES:
+                    yield Decimal(amount), percent and Decimal(percent), gst_type
+
+    def test_rows_match_the_old_formula(self):
+        for amount, percent, gst_type in self.cases():
+            with self.subTest(amount=amount, percent=percent, gst_type=gst_type):
+                self.assertEqual(
+                    compute_tax_row(amount, percent, gst_type), old_calculate_taxes(amount, percent, gst_type)
+                )
+
+    def test_columns_match_the_rows(self):
+        amounts, percents, gst_types = zip(*self.cases())
+        columns = compute_taxes(amounts, percents, gst_types)
+
+        for index, row in enumerate(self.cases()):
+            self.assertEqual(tuple(columns[field][index] for field in TAX_FIELDS), compute_tax_row(*row))
+
+    def test_half_up_boundaries(self):
+        self.assertEqual(compute_tax_row(Decimal("250"), Decimal("1"), "IGST"), (3, 5, 0, 0, 242))
+        self.assertEqual(compute_tax_row(Decimal("150"), None, "CGST & SGST"), (0, 0, 2, 2, 146))
+
+    def test_zero_amount_keeps_the_stored_tds(self):
+        payment = Payment(amount=Decimal("0"), tds_rate=TDSRate(percent=Decimal("10")), gst_tds_type="IGST")
+        payment.tds_amount = Decimal("42")
+        payment.net_amount = Decimal("7")
+
+        payment.calculate_taxes()
+
+        self.assertEqual(
+            (payment.tds_amount, payment.igst_tds, payment.cgst_tds, payment.sgst_tds, payment.net_amount),
+            old_calculate_taxes(Decimal("0"), Decimal("10"), "IGST", tds_amount=Decimal("42")),
+        )
+
+    def test_rate_map_follows_a_committed_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rate = TDSRate.objects.create(section=TDSSection.objects.create(section="194C"), percent=Decimal("1"))
+        self.assertEqual(get_tds_rate_percents()[rate.pk], Decimal("1"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                rate.percent = Decimal("2")
+                rate.save()
+                # a read before the commit caches the old percent under the old version
+                self.assertEqual(get_tds_rate_percents()[rate.pk], Decimal("1"))
+
+        self.assertEqual(get_tds_rate_percents()[rate.pk], Decimal("2"))
+
+
+class StreamExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_invalid_dates_are_rejected(self):
+        url = reverse("stream_export", args=["payment", "csv"])
+
+        for query in ({"start_date": "xx"}, {"end_date": "2024-02-30"}):
+            self.assertEqual(self.client.get(url, query).status_code, 400)
+
+        response = self.client.get(url, {"start_date": "2024-04-01", "end_date": "2025-03-31"})
+        self.assertEqual(response.status_code, 200)
+
+
+class ImportJobTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def make_job(self, rows):
+        lines = ["Grant Short No,Date,Expenditure Head,Particulars,Gross Amount (in Rs.),Remarks"]
+        lines += [f"SG1,{date.today().isoformat()},Equipment,Item {n},100.00," for n in range(rows)]
+        job = ImportJob(model_name="expenditure", file_format="csv")
+        job.file.save("expenditure.csv", ContentFile("\n".join(lines).encode()), save=True)
+        return job
+
+    def test_lookups_are_primed_once_per_job(self):
+        job = self.make_job(5)
+
+        with mock.patch.object(tasks, "IMPORT_CHUNK_SIZE", 2), \
+                mock.patch.object(FundingIndex, "build", autospec=True, side_effect=FundingIndex.build) as build:
+            tasks.run_import_job.delay(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "SUCCESS")
+        self.assertEqual(job.processed_rows, 5)
+        # three chunks, one index
+        self.assertEqual(build.call_count, 1)
+
+
+class AuditBufferTests(LedgerFixtures, TestCase):
+
+    def test_rolled_back_savepoint_drops_its_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                kept = self.make_payment("100.00")
+
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        self.make_payment("200.00")
+                        raise RuntimeError
+
+        logs = AuditLog.objects.filter(model_name="Payment", action="CREATE")
+        self.assertEqual(list(logs.values_list("object_id", flat=True)), [str(kept.pk)])
+
+    def test_committed_batches_are_written_together(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for _ in range(3):
+                        self.make_payment("100.00")
+
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "project_auditlog"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(AuditLog.objects.filter(model_name="Payment", action="CREATE").count(), 3)
+
+
+class KeysetPaginationTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+
+        # three requests within the same millisecond
+        base = timezone.make_aware(datetime(2026, 4, 1, 12, 0, 0, 123000))
+        cls.requests = []
+        for micro in (456, 400, 100):
+            request = FundRequest.objects.create(
+                faculty=cls.admin, pi_name="PI", seed_grant=cls.grants[0], project_no="SG/1", short_no="SG1",
+                project_title="Grant", head="Travel", particulars="Trip", amount=Decimal("10.00"),
+            )
+            FundRequest.objects.filter(pk=request.pk).update(request_date=base + timedelta(microseconds=micro))
+            cls.requests.append(request)
+
+    def test_cursor_keeps_microseconds(self):
+        paginator = KeysetPagination(["-request_date", "-id"])
+        paginator.fields = [(FundRequest._meta.get_field(name), True) for name in ("request_date", "id")]
+        position = [timezone.make_aware(datetime(2026, 4, 1, 12, 0, 0, 123456)), 7]
+
+        self.assertEqual(paginator.decode_cursor(paginator.encode_cursor(position)), position)
+
+    def test_pages_within_one_millisecond(self):
+        self.client.force_login(self.admin)
+        url = reverse("api_model_list", args=["fundrequest"])
+        params = {"cursor": "", "page_size": 1}
+        seen = []
+
+        while True:
+            data = self.client.get(url, params).json()
+            seen += [row["id"] for row in data["results"]]
+            if not data["next_cursor"]:
+                break
+            params["cursor"] = data["next_cursor"]
+
+        self.assertEqual(seen, [request.pk for request in self.requests])
+
+
+class ModelApiStreamTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.payments = [
+            Payment.objects.create(
+                funding_type="SEED", funding_id=cls.grants[0].pk, payment_type=cls.payment_type,
+                head=cls.equipment, payee=cls.payee, bank=cls.bank, amount=Decimal(amount),
+                bill_date=date.today() - timedelta(days=n), purpose=f"Purpose {n}",
+            )
+            for n, amount in enumerate(["100.00", "250.50", "75.25", "1000.00", "10.00"])
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, **params):
+        response = self.client.get(reverse("api_model_list", args=["payment"]), params)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, content.decode()
+
+    def paged_rows(self):
+        response, content = self.get()
+        self.assertEqual(response.status_code, 200)
+        return json.loads(content)["results"]
+
+    def test_stream_matches_paged_rows(self):
+        with mock.patch.object(views, "API_STREAM_CHUNK_SIZE", 2):
+            response, content = self.get(all="true")
+
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(len(self.paged_rows()), 5)
+        self.assertEqual(json.loads(content), self.paged_rows())
+
+    def test_ndjson_is_one_row_per_line(self):
+        with mock.patch.object(views, "API_STREAM_CHUNK_SIZE", 2):
+            response, content = self.get(all="ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertTrue(content.endswith("\n"))
+        lines = content.split("\n")[:-1]
+        self.assertEqual([json.loads(line) for line in lines], self.paged_rows())
+
+    def test_row_cap(self):
+        with self.settings(API_STREAM_MAX_ROWS=4):
+            response, content = self.get(all="true")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("More than 4 rows", json.loads(content)["error"])
+
+        with self.settings(API_STREAM_MAX_ROWS=5):
+            response, content = self.get(all="ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(content.splitlines()), 5)
+
+
+class QueryPlanTests(LedgerFixtures, TestCase):
+    """List, detail and export of every QUERY_PLANS model cost the same number of queries for 2 and 5 rows."""
+
+    SMALL, LARGE = 2, 5
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = date.today()
+        User = get_user_model()
+
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        faculty = Faculty.objects.create(faculty_id="F1", pi_name="Dr. PI")
+
+        for n in range(3, cls.LARGE + 1):
+            SeedGrant.objects.create(
+                grant_no=f"SG/{n}", short_no=f"SG{n}", pi_name="PI", dept="CSE", title=f"Grant {n}",
+                sanction_date=today - timedelta(days=30), end_date=today + timedelta(days=365),
+            )
+
+        for n in range(1, cls.LARGE + 1):
+            approver = User.objects.create_user(f"approver{n}", role="admin")
+            TDGGrant.objects.create(
+                grant_no=f"TDG/{n}", short_no=f"TDG{n}", pi_name="PI", dept="CSE", title=f"TDG {n}",
+                sanction_date=today - timedelta(days=30), end_date=today + timedelta(days=365),
+                extension_approved_by=approver,
+            )
+            project = Project.objects.create(
+                project_short_no=f"P{n}", project_no=f"PRJ/{n}", gender="Female", project_type="Sponsored",
+                pi_name="PI", project_title=f"Project {n}", sponsoring_agency="DST",
+                project_start_date=today - timedelta(days=30), duration_months=24,
+                sanction_date=today - timedelta(days=30), sanction_amount=Decimal("500000.00"),
+                amount_to_be_received=Decimal("500000.00"), total_non_recurring=Decimal("0.00"),
+                total_recurring=Decimal("0.00"),
+            )
+            for m in range(n):
+                CoPiName.objects.create(name=f"Co-PI {m}", project=project)
+
+            ProjectSanctionDistribution.objects.create(
+                project=project, financial_year="2025-26", project_year=1, head=cls.equipment,
+                sanctioned_amount=Decimal("1000.00"),
+            )
+            Payee.objects.create(
+                payee_type="VENDOR", name_of_payee=f"Vendor {n}", account_number=str(n), bank_name="SBI",
+                branch="Main", ifsc="SBIN0000001", email=f"vendor{n}@example.com",
+            )
+
+            commitment = Commitment.objects.create(
+                seed_grant=cls.grants[0], date=today, bill_date=today,
+                head="Equipment", particulars="Order", gross_amount=Decimal("5000.00"),
+            )
+            Payment.objects.create(
+                funding_type="SEED", funding_id=cls.grants[0].pk, payment_type=cls.payment_type,
+                head=cls.equipment, payee=cls.payee, bank=cls.bank, amount=Decimal("100.00"),
+                commitment=commitment,
+            )
+            Expenditure.objects.create(
+                project=project, date=today, bill_date=today, head="Travel", particulars="Trip",
+                amount=Decimal("10.00"),
+            )
+
+            receipt = Receipt.objects.create(seed_grant=cls.grants[1], receipt_date=today, total_amount=Decimal(n))
+            for _ in range(n):
+                ReceiptAllocation.objects.create(receipt=receipt, head=cls.travel, amount=Decimal("1.00"))
+
+            BillInward.objects.create(
+                date=today, faculty=faculty, particulars="Bill", amount=Decimal("10.00"),
+                whom_to=cls.admin,
+            )
+            FundRequest.objects.create(
+                faculty=cls.admin, pi_name="PI", tdg_grant=TDGGrant.objects.get(short_no=f"TDG{n}"),
+                project_no=f"TDG/{n}", short_no=f"TDG{n}", project_title="TDG", head="Travel",
+                particulars="Trip", amount=Decimal("10.00"),
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return len(queries)
+
+    def test_every_model_is_covered(self):
+        for model_name, plan in QUERY_PLANS.items():
+            with self.subTest(model=model_name):
+                self.assertGreaterEqual(plan.model.objects.count(), self.LARGE)
+
+    def test_list(self):
+        for model_name in QUERY_PLANS:
+            url = reverse("api_model_list", args=[model_name])
+
+            with self.subTest(model=model_name):
+                small = self.count_queries(lambda: self.client.get(url, {"page_size": self.SMALL}))
+
+                with self.assertNumQueries(small):
+                    response = self.client.get(url, {"page_size": self.LARGE})
+
+                self.assertEqual(len(response.json()["results"]), self.LARGE)
+
+    def test_detail(self):
+        for model_name, plan in QUERY_PLANS.items():
+            pks = list(plan.model.objects.order_by("pk").values_list("pk", flat=True))
+
+            with self.subTest(model=model_name):
+                first = self.count_queries(lambda: self.client.get(reverse("api_model_detail", args=[model_name, pks[0]])))
+
+                # the last rows carry the most co-PIs / receipt allocations
+                with self.assertNumQueries(first):
+                    response = self.client.get(reverse("api_model_detail", args=[model_name, pks[-1]]))
+
+                self.assertEqual(response.status_code, 200)
+
+    def test_export(self):
+        for model_name, (Model, Resource) in EXPORT_CONFIG.items():
+            queryset = optimized_queryset(model_name, Model, purpose="export").order_by("pk")
+
+            with self.subTest(model=model_name):
+                small = self.count_queries(lambda: list(export_rows(Resource(), queryset[:self.SMALL])))
+
+                with self.assertNumQueries(small):
+                    rows = list(export_rows(Resource(), queryset[:self.LARGE]))
+
+                self.assertEqual(len(rows), self.LARGE + 1)
+
+
+class SparseFieldsTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.make_payment("100.00", purpose="Long purpose")
+        Expenditure.objects.create(
+            seed_grant=self.grants[0], date=date.today(), bill_date=date.today(),
+            head="Equipment", particulars="Bill", amount=Decimal("50.00"), remarks="Long remarks",
+        )
+
+    def get(self, model_name, **params):
+        return self.client.get(reverse("api_model_list", args=[model_name]), params)
+
+    def test_unknown_fields_are_rejected(self):
+        for params in ({"fields": "id,amount,nope"}, {"exclude": "nope"}):
+            response = self.get("payment", **params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("nope", str(response.json()))
+
+    def test_id_is_always_kept(self):
+        response = self.get("payment", fields="amount")
+        self.assertEqual(set(response.json()["results"][0]), {"id", "amount"})
+
+        response = self.get("payment", exclude="id,purpose")
+        row = response.json()["results"][0]
+        self.assertIn("id", row)
+        self.assertNotIn("purpose", row)
+
+    def test_only_selected_columns_are_loaded(self):
+        for model_name, field, table in (
+            ("payment", "purpose", "project_payment"),
+            ("expenditure", "remarks", "project_expenditure"),
+        ):
+            with CaptureQueriesContext(connection) as full:
+                self.assertEqual(self.get(model_name).status_code, 200)
+            with CaptureQueriesContext(connection) as sparse:
+                response = self.get(model_name, fields="id,amount")
+
+            self.assertEqual(set(response.json()["results"][0]), {"id", "amount"})
+
+            def selects(queries):
+                return [
+                    q["sql"] for q in queries.captured_queries
+                    if q["sql"].startswith("SELECT") and f'FROM "{table}"' in q["sql"] and "COUNT(" not in q["sql"]
+                ]
+
+            column = f'"{table}"."{field}"'
+            self.assertTrue(any(column in sql for sql in selects(full)))
+            self.assertTrue(selects(sparse))
+            self.assertFalse(any(column in sql for sql in selects(sparse)))
+
+
+class FundingColumnsTests(LedgerFixtures, TestCase):
+
+    def columns(self, row):
+        row = type(row).objects.get(pk=row.pk)
+        return row.funding_type, row.funding_id, row.funding_short_no
+
+    def test_row_moved_to_another_source(self):
+        other = self.grants[1]
+        commitment = self.make_commitment("500.00")
+        expenditure = Expenditure.objects.create(
+            seed_grant=self.grants[0], date=date.today(), bill_date=date.today(),
+            head="Equipment", particulars="Bill", amount=Decimal("100.00"),
+        )
+        by_key = self.make_payment("100.00")
+        by_fk = self.make_payment("100.00")
+
+        for row in (commitment, expenditure, by_fk):
+            row.seed_grant = other
+            row.save()
+        by_key.funding_id = other.pk
+        by_key.save()
+
+        for row in (commitment, expenditure, by_key, by_fk):
+            self.assertEqual(self.columns(row), ("SEED", other.pk, other.short_no))
+        self.assertEqual(Payment.objects.get(pk=by_key.pk).seed_grant_id, other.pk)
+
+    def test_renumbered_source(self):
+        grant, other = self.grants
+        rows = [self.make_commitment("500.00"), self.make_payment("100.00")]
+        kept = self.make_payment("100.00", grant=other)
+
+        grant = SeedGrant.objects.get(pk=grant.pk)
+        grant.short_no = "SG1-NEW"
+        grant.save()
+
+        for row in rows:
+            self.assertEqual(self.columns(row), ("SEED", grant.pk, "SG1-NEW"))
+        self.assertEqual(self.columns(kept), ("SEED", other.pk, other.short_no))
+
+
+class DataVersionTests(LedgerFixtures, TestCase):
+
+    def version(self, grant):
+        versions, _ = get_versions([funding_scope("SEED", grant.pk)])
+        return versions[funding_scope("SEED", grant.pk)]
+
+    def test_bumped_on_commit(self):
+        before = self.version(self.grants[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.make_payment("100.00")
+                self.make_payment("200.00")
+                self.assertEqual(self.version(self.grants[0]), before)
+
+        self.assertEqual(self.version(self.grants[0]), before + 1)
+
+    def test_rolled_back_savepoint_drops_its_bump(self):
+        before = self.version(self.grants[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.make_payment("100.00")
+
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        self.make_payment("200.00", grant=self.grants[1])
+                        raise RuntimeError
+
+        self.assertEqual(self.version(self.grants[1]), before)
+
+
+class ReportCacheTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        report_cache().clear()
+        self.computed = []
+
+    def report(self, compute=None):
+        def default():
+            self.computed.append(1)
+            return len(self.computed)
+
+        return get_report("SEED", self.grants[0].pk, compute or default)
+
+    def test_reused_until_the_ledger_changes(self):
+        self.assertEqual(self.report(), 1)
+        self.assertEqual(self.report(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_payment("100.00")
+
+        self.assertEqual(self.report(), 2)
+
+    def test_report_computed_during_a_write_is_not_served_after_it(self):
+        def stale():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.make_payment("100.00")
+            return "stale"
+
+        self.assertEqual(self.report(stale), "stale")
+        self.assertEqual(self.report(), 1)
+
+
+class FacultyDashboardTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.faculty = Faculty.objects.create(faculty_id="F1", pi_name="PI")
+        SeedGrant.objects.filter(pk=cls.grants[0].pk).update(faculty=cls.faculty)
+
+    def test_sources_without_balance_rows_count_as_zero(self):
+        with CaptureQueriesContext(connection) as queries:
+            data, _ = compute_faculty_dashboard(self.faculty)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data["seed_grants"][0]["paid"], Decimal("0"))
+        self.assertFalse(FundingHeadBalance.objects.exists())
+
+    def test_rebuild_command_repairs_missing_rows(self):
+        self.make_payment("300.00")
+        FundingHeadBalance.objects.all().delete()
+
+        call_command("rebuild_funding_balances", "--missing", stdout=StringIO())
+
+        data, _ = compute_faculty_dashboard(self.faculty)
+        self.assertEqual(data["seed_grants"][0]["paid"], Decimal("300.00"))
+
+
+def old_prepare_report(grant, expenditures, commitments):
+    """prepare_report as it was before head_key, one pass per head over the rows."""
+    def normalize(text):
+        text = text.strip().lower()
+        return text[:-1] if text.endswith("s") and len(text) > 1 else text
+
+    report_rows = []
+    total_budget = total_exp = total_commit = 0
+
+    for head in REPORT_HEADS:
+        sanction = getattr(grant, head.lower().replace(" ", "_"), 0) or 0
+        exp_sum = sum(exp.amount for exp in expenditures if normalize(exp.head) == normalize(head))
+        commit_sum = sum(c.gross_amount for c in commitments if normalize(c.head) == normalize(head))
+
+        total_budget += sanction
+        total_exp += exp_sum
+        total_commit += commit_sum
+
+        report_rows.append({
+            "head": head, "sanction": sanction, "expenditure": exp_sum,
+            "commitment": commit_sum, "balance": sanction - (exp_sum + commit_sum),
+        })
+
+    return report_rows, {
+        "budget": total_budget, "expenditure": total_exp, "commitment": total_commit,
+        "balance": total_budget - (total_exp + total_commit),
+    }
+
+
+class GrantReportTests(LedgerFixtures, TestCase):
+
+    HEADS = ["Equipment", " equipments ", "TRAVEL", "Travels ", "visitor expenses", "Lab Equipment", "Stationery"]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        grant = cls.grants[0]
+        SeedGrant.objects.filter(pk=grant.pk).update(
+            equipment=Decimal("5000.00"), travel=Decimal("2000.00"), lab_equipment=Decimal("1000.00"),
+        )
+        for n, head in enumerate(cls.HEADS, start=1):
+            Expenditure.objects.create(
+                seed_grant=grant, date=date.today(), bill_date=date.today(),
+                head=head, particulars="Bill", amount=Decimal(n * 100),
+            )
+            Commitment.objects.create(
+                seed_grant=grant, date=date.today(), bill_date=date.today(),
+                head=head, particulars="Order", gross_amount=Decimal(n * 10),
+            )
+
+    def report(self, function):
+        grant = SeedGrant.objects.get(pk=self.grants[0].pk)
+        return function(grant, Expenditure.objects.filter(seed_grant=grant), Commitment.objects.filter(seed_grant=grant))
+
+    def test_matches_old_report(self):
+        rows, totals = self.report(prepare_report)
+
+        self.assertEqual((rows, totals), self.report(old_prepare_report))
+        by_head = {row["head"]: row for row in rows}
+        self.assertEqual(by_head["Equipment"]["expenditure"], Decimal("300.00"))
+        self.assertEqual(by_head["Travel"]["commitment"], Decimal("70.00"))
+        # "Stationery" is no report head and stays out of the totals
+        self.assertEqual(totals["expenditure"], Decimal("2100.00"))
+
+    def test_migration_backfill_matches_save(self):
+        saved = {
+            model: dict(model.objects.values_list("pk", "head_key"))
+            for model in (Expenditure, Commitment)
+        }
+        Expenditure.objects.update(head_key="")
+        Commitment.objects.update(head_key="")
+
+        importlib.import_module("project.migrations.0010_head_key").fill_head_key(apps, None)
+
+        for model, keys in saved.items():
+            self.assertEqual(dict(model.objects.values_list("pk", "head_key")), keys)
+
+
+class GridRowsTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.other_payee = Payee.objects.create(
+            payee_type="VENDOR", name_of_payee="Zenith", account_number="2", bank_name="SBI",
+            branch="Main", ifsc="SBIN0000001", email="zenith@example.com",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def rows(self, **params):
+        params = {key: json.dumps(value) for key, value in params.items()}
+        return self.client.get(reverse("api_model_rows", args=["payment"]), params)
+
+    def test_foreign_key_filters_on_its_label(self):
+        acme = self.make_payment("100.00")
+        self.make_payment("200.00", payee=self.other_payee)
+
+        response = self.rows(filter_model={"payee": {"filterType": "text", "type": "contains", "filter": "acm"}})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.json()["rows"]], [acme.pk])
+
+    def test_foreign_key_sorts_on_its_label(self):
+        zenith = self.make_payment("200.00", payee=self.other_payee)
+        acme = self.make_payment("100.00")
+
+        response = self.rows(sort_model=[{"colId": "payee", "sort": "asc"}])
+
+        self.assertEqual([row["id"] for row in response.json()["rows"]], [acme.pk, zenith.pk])
+
+    def test_foreign_key_without_label_is_rejected(self):
+        response = self.rows(filter_model={"commitment": {"filterType": "text", "type": "contains", "filter": "1"}})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unsupported_filter_is_a_bad_request(self):
+        response = self.rows(filter_model={"amount": {"filterType": "number", "type": "contains", "filter": 1}})
+        self.assertEqual(response.status_code, 400)
+
+
+class LookupTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def test_amounts_are_strings(self):
+        self.client.force_login(self.admin)
+        commitment = self.make_commitment("1000.10")
+        self.make_payment("0.20", commitment=commitment)
+
+        response = self.client.get(reverse("api_lookup", args=["commitments"]), {"ids": commitment.pk})
+
+        row = response.json()["results"][0]
+        self.assertEqual(row["gross_amount"], "1000.10")
+        self.assertIsInstance(row["remaining_amount"], str)
+        self.assertEqual(Decimal(row["remaining_amount"]), Decimal("999.90"))
+
+
+class GridBatchTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def update(self, payment, data, version=None):
+        return {"id": payment.pk, "version": version or row_version(Payment.objects.get(pk=payment.pk)), "data": data}
+
+    def post(self, **changes):
+        return self.client.post(reverse("api_model_batch", args=["payment"]), changes, content_type="application/json")
+
+    def test_partial_update(self):
+        payment = self.make_payment("100.00")
+
+        response = self.post(update=[self.update(payment, {"amount": "1"})])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["status"], "ok")
+        self.assertEqual(Payment.objects.get(pk=payment.pk).amount, Decimal("1.00"))
+
+    def test_stale_version_is_a_conflict(self):
+        payment = self.make_payment("100.00")
+        stale = row_version(payment)
+        Payment.objects.filter(pk=payment.pk).update(amount=Decimal("150.00"))
+
+        response = self.post(update=[self.update(payment, {"amount": "1"}, version=stale)])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["results"][0]["status"], "conflict")
+        self.assertEqual(Payment.objects.get(pk=payment.pk).amount, Decimal("150.00"))
+
+    def test_invalid_row_rolls_back_the_batch(self):
+        first, second = self.make_payment("100.00"), self.make_payment("200.00")
+
+        response = self.post(update=[
+            self.update(first, {"amount": "1"}),
+            self.update(second, {"amount": "not a number"}),
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result["status"] for result in response.json()["results"]], ["ok", "error"])
+        self.assertEqual(Payment.objects.get(pk=first.pk).amount, Decimal("100.00"))
+
+
+class ChequeLetterBatchTests(LedgerFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def test_non_numeric_bank_is_unknown(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.post(
+            reverse("admin:payment_cheque_letter_batch"),
+            {"bank": "abc", "cheque_nos": "1001", "output_format": "pdf"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Unknown bank.")
+        self.assertFalse(ChequeLetterJob.objects.exists())
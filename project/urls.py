@@ -1,7 +1,7 @@
 from django.urls import path
 from project import views
 from django.urls import re_path
-from .views import GenericModelAPIView, GenericModelDetailAPIView, upload_bill_pdf
+from .views import GenericModelAPIView, GenericModelDetailAPIView, GridRowsAPIView, GridBatchAPIView, upload_bill_pdf
 
 
 
@@ -10,12 +10,18 @@ urlpatterns = [
 
     
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/data/', views.dashboard_data, name='dashboard_data'),
     path('project/<str:project_id>/', views.project_report, name='project_detail'),
     path("save-fund-management/", views.save_fund_management,name="save_fund_management"),
    
     path("bill-report-admin/", views.bill_report_admin, name="bill_report_admin"),
     re_path(r"^bill-report-user/(?P<grant_no>.+)/$", views.bill_report_user, name="bill_report_user"),
     path("get-seed-grant-details/", views.get_seed_grant_details, name="get_seed_grant_details"),
+    path('api/payment/bulk/', views.bulk_payment_create, name='api_payment_bulk'),
+    path('api/lookups/<str:name>/', views.lookup_list, name='api_lookup'),
+    path('api/bundles/<str:name>/', views.lookup_bundle, name='api_bundle'),
+    path('api/<str:model_name>/rows/', GridRowsAPIView.as_view(), name='api_model_rows'),
+    path('api/<str:model_name>/batch/', GridBatchAPIView.as_view(), name='api_model_batch'),
     path('api/<str:model_name>/', GenericModelAPIView.as_view(), name='api_model_list'),
     path('api/<str:model_name>/<str:pk>/', GenericModelDetailAPIView.as_view(), name='api_model_detail'),
     path('api/billinward/<int:pk>/upload_pdf/', upload_bill_pdf, name="upload_bill_bdf"),
@@ -26,6 +32,11 @@ urlpatterns = [
     path('bill_inwards/', views.inward_bills_view, name='bill_inwards'),
     path("projects/<str:short_no>/balance-sheet/",views.project_balance_sheet, name="project_balance_sheet"),
     
+    path("export/<str:model_name>/<str:file_format>/", views.stream_export, name="stream_export"),
+
+    path("import-jobs/<int:pk>/status/", views.import_job_status, name="import_job_status"),
+    path("cheque-letter-jobs/<int:pk>/status/", views.cheque_letter_job_status, name="cheque_letter_job_status"),
+    path("cheque-letter-jobs/<int:pk>/download/", views.cheque_letter_job_download, name="cheque_letter_job_download"),
     path('admin/project/payment/cheque-letter',views.cheque_letter_view, name='payment_cheque_letter'),
 ]
 
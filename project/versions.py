@@ -0,0 +1,204 @@
+"""
+Data versions for conditional GETs.
+
+A DataVersion row counts the changes to one scope: the ledger of one funding
+source ("funding:SEED:3") or the rows of one model ("model:payment"). Saves
+and deletes bump them from signals, queryset updates and bulk writes bump
+them explicitly. Report views and the generic API build their ETag from the
+versions they depend on, so an unchanged reload is answered with 304 after
+one query on DataVersion instead of recomputing the report.
+
+The counters are bumped after the writing transaction commits, so writers
+never hold locks on these shared rows while their transaction is open.
+"""
+import hashlib
+import threading
+import weakref
+from functools import wraps
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+_state = threading.local()
+
+
+FUNDING_SOURCE_TYPES = {
+    "Project": "PROJECT",
+    "SeedGrant": "SEED",
+    "TDGGrant": "TDG",
+}
+
+FUNDING_SOURCE_MODELS = ["seedgrant", "tdggrant", "project"]
+
+# generic API model -> other models its serializer reads
+MODEL_DEPENDENCIES = {
+    "payment": FUNDING_SOURCE_MODELS,
+    "expenditure": FUNDING_SOURCE_MODELS,
+    "commitment": FUNDING_SOURCE_MODELS + ["payment"],
+    "receipt": FUNDING_SOURCE_MODELS + ["receiptallocation"],
+    "fundrequest": FUNDING_SOURCE_MODELS,
+    "project": ["copiname"],
+    "projectsanctiondistribution": ["project"],
+}
+
+
+def model_scope(model_name):
+    return f"model:{model_name.lower()}"
+
+
+def funding_scope(funding_type, funding_id):
+    return f"funding:{funding_type}:{funding_id}"
+
+
+def model_scopes(model_name):
+    """Scopes behind a generic API list of `model_name`."""
+    name = model_name.lower()
+    return [model_scope(name)] + [model_scope(other) for other in MODEL_DEPENDENCIES.get(name, [])]
+
+
+def queryset_funding_keys(queryset):
+    """(funding_type, funding_id) of the rows of `queryset` that carry the funding columns."""
+    if not hasattr(queryset.model, "sync_funding_columns"):
+        return set()
+
+    keys = queryset.order_by().values_list("funding_type", "funding_id").distinct()
+    return {key for key in keys if key[0]}
+
+
+def queryset_scopes(queryset, funding_keys=None):
+    """Scopes touched by writing the rows of `queryset`; read them before the write."""
+    if funding_keys is None:
+        funding_keys = queryset_funding_keys(queryset)
+
+    return {model_scope(queryset.model.__name__)} | {funding_scope(*key) for key in funding_keys}
+
+
+class VersionBump:
+    """
+    Scopes of one bump_versions call, registered with their own on_commit
+    hook, as AuditBatch does for audit entries: the hooks of rolled-back
+    savepoints are dropped together with their bump, and the first hook that
+    runs on commit bumps the scopes of all live bumps in one go.
+    """
+
+    def __init__(self, scopes):
+        self.scopes = set(scopes)
+        self.done = False
+
+    def commit(self):
+        if self.done:
+            return
+
+        bumps = [bump for bump in (ref() for ref in _state.bumps) if bump is not None and not bump.done]
+        _state.bumps = []
+
+        for bump in bumps:
+            bump.done = True
+
+        write_versions(set().union(*(bump.scopes for bump in bumps)))
+
+
+def bump_versions(scopes):
+    """Bump the scopes once the current transaction commits (right away outside atomic())."""
+    scopes = set(scopes)
+    if not scopes:
+        return
+
+    bump = VersionBump(scopes)
+
+    if not hasattr(_state, "bumps"):
+        _state.bumps = []
+    _state.bumps.append(weakref.ref(bump))
+
+    transaction.on_commit(bump.commit)
+
+
+def write_versions(scopes):
+    from .models import DataVersion
+
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+
+    now = timezone.now()
+    existing = set(DataVersion.objects.filter(scope__in=scopes).values_list("scope", flat=True))
+
+    if existing:
+        DataVersion.objects.filter(scope__in=existing).update(version=F("version") + 1, updated_at=now)
+
+    missing = [scope for scope in scopes if scope not in existing]
+    if missing:
+        DataVersion.objects.bulk_create(
+            [DataVersion(scope=scope, version=1, updated_at=now) for scope in missing],
+            ignore_conflicts=True,
+        )
+
+
+def get_versions(scopes):
+    """{scope: version} (0 for scopes never bumped) and the latest updated_at."""
+    from .models import DataVersion
+
+    versions = dict.fromkeys(scopes, 0)
+    last_modified = None
+
+    for scope, version, updated_at in DataVersion.objects.filter(scope__in=scopes).values_list(
+        "scope", "version", "updated_at"
+    ):
+        versions[scope] = version
+        last_modified = max(last_modified, updated_at) if last_modified else updated_at
+
+    return versions, last_modified
+
+
+def version_etag(request, versions):
+    """ETag over the path, the query string, the user and the scope versions."""
+    parts = [
+        request.path,
+        str(getattr(request.user, "pk", "")),
+        repr(sorted(request.GET.lists())),
+        repr(sorted(versions.items())),
+    ]
+    return quote_etag(hashlib.sha1("|".join(parts).encode()).hexdigest())
+
+
+def condition_on_versions(scopes_func):
+    """
+    Answer GET / HEAD with 304 when the client's ETag or Last-Modified still
+    matches. scopes_func(request, *args, **kwargs) returns the scopes the
+    response depends on, or None to run the view unconditionally (e.g. an
+    unknown object that the view turns into a 404).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            scopes = scopes_func(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+
+            versions, last_modified = get_versions(scopes)
+            etag = version_etag(request, versions)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                response.headers.setdefault("ETag", etag)
+                if timestamp is not None:
+                    response.headers.setdefault("Last-Modified", http_date(timestamp))
+                patch_cache_control(response, private=True, no_cache=True)
+
+            return response
+
+        return wrapper
+
+    return decorator
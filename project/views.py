@@ -3,7 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponseRedirect, JsonResponse
 from django.core.serializers.json import DjangoJSONEncoder
-from .models import Faculty, Project, Receipt, SeedGrant, TDGGrant, Expenditure, Commitment, FundRequest, BillInward, Payment, ProjectSanctionDistribution,Payee,ReceiptHead, ReceiptAllocation, Bank
+from .models import Faculty, Project, Receipt, SeedGrant, TDGGrant, Expenditure, Commitment, FundRequest, BillInward, Payment, ProjectSanctionDistribution,Payee,ReceiptHead, Bank
 from django.contrib.auth.models import Group
 from django.contrib.auth import authenticate, login
 import re
@@ -12,7 +12,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser
-from django.db.models import Q
+from django.db.models import Sum
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from .forms import FundRequestForm, AdminRemarkForm
@@ -22,7 +22,36 @@ from django.http import HttpResponse
 from .forms import ReceiptForm
 from datetime import date
 from django.contrib.admin.views.decorators import staff_member_required
-from .pagination import StandardPagination
+from .pagination import StandardPagination, KeysetPagination
+from .querysets import optimized_queryset
+from .search import apply_search
+from .models import FundingHeadBalance, ImportJob
+from .services import bulk_create_payments, faculty_dashboard
+from .resources import PaymentResource, CommitmentResource, ExpenditureResource
+import csv
+import tempfile
+from django.http import StreamingHttpResponse, FileResponse, Http404
+from openpyxl import Workbook
+from itertools import islice
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder as DRFJSONEncoder
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from django.utils.decorators import method_decorator
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from .versions import condition_on_versions, funding_scope, model_scope, model_scopes
+from .report_cache import get_report
+from .grid import GridRequestError, grid_block
+from .batch import BatchRequestError, apply_changeset, parse_changeset, row_version
+from .lookups import LOOKUPS, lookup_page
+from .bundles import BUNDLES, bundle_versions, get_bundle_json
+from .reports import REPORT_HEADS, prepare_report
+from .models import ChequeLetterJob, CHEQUE_LETTER_OUTPUT_CHOICES
+from .tasks import run_cheque_letter_job
+import os
+from django.db import transaction
+from django.urls import reverse
+from django.utils.dateparse import parse_date
 
 
 import json
@@ -30,16 +59,46 @@ from django.core.exceptions import ValidationError
 
 from .serializers import (
     ExpenditureSerializer, CommitmentSerializer, SeedGrantSerializer,TDGGrantSerializer,FundRequestSerializer,ProjectSerializer,BillInwardSerializer,PaymentSerializer,ReceiptSerializer,
-    ProjectSanctionDistributionSerializer, PayeeSerializer, 
+    ProjectSanctionDistributionSerializer, PayeeSerializer, prune_fields,
 
 
 )
 
 
-HEADS = [
-    "Equipment", "Consumables", "Contingency", "Travel",
-    "Manpower", "Others", "Furniture", "Visitor Expenses", "Lab Equipment"
-]
+# DataVersion scopes of the cached views, see project/versions.py
+
+def grant_scopes(grant_no):
+    for Model, funding_type in ((SeedGrant, "SEED"), (TDGGrant, "TDG")):
+        pk = Model.objects.filter(grant_no=grant_no).values_list("pk", flat=True).first()
+        if pk:
+            return [funding_scope(funding_type, pk)]
+    return None
+
+
+def bill_report_scopes(request, grant_no):
+    return grant_scopes(urllib.parse.unquote(grant_no))
+
+
+def grant_details_scopes(request):
+    grant_no = request.GET.get("grant_no")
+    return grant_scopes(grant_no) if grant_no else None
+
+
+def balance_sheet_scopes(request, short_no):
+    pk = Project.objects.filter(project_short_no=short_no).values_list("pk", flat=True).first()
+    return [funding_scope("PROJECT", pk)] if pk else None
+
+
+def api_list_scopes(request, model_name):
+    if model_name.lower() not in GenericModelAPIView.MODEL_CONFIG:
+        return None
+    return model_scopes(model_name)
+
+
+def lookup_scopes(request, name):
+    if name not in LOOKUPS:
+        return None
+    return [model_scope(model_name) for model_name in LOOKUPS[name].models]
 
 
 
@@ -129,19 +188,7 @@ def dashboard(request):
 
     faculty = get_object_or_404(Faculty, user=request.user)
 
-    projects = Project.objects.filter(faculty_id=faculty.faculty_id)
-
-
-
-    seed_projects = SeedGrant.objects.filter(faculty_id=faculty.faculty_id)
-    tdg_projects = TDGGrant.objects.filter(faculty_id=faculty.faculty_id)
-
-    for s in seed_projects:
-        s.encoded_grant_no = urllib.parse.quote(s.grant_no, safe="")
-    for t in tdg_projects:
-        t.encoded_grant_no = urllib.parse.quote(t.grant_no, safe="")
-
-
+    data = faculty_dashboard(faculty)
 
     # --- TYPE FILTER LOGIC ---
     project_type = request.GET.get("type", "all")  # all / project / seed
@@ -158,83 +205,38 @@ def dashboard(request):
         show_projects = False
         show_seed = False
         show_tdg = True  # ✅ default: show everything
-    
-    copi_projects = Project.objects.filter(
-        co_pis__faculty=faculty.faculty_id
-    )
-
-    copi_seeds = SeedGrant.objects.filter(
-        co_pis__faculty=faculty.faculty_id
-    )
-
-    copi_tdgs = TDGGrant.objects.filter(
-        co_pis__faculty=faculty.faculty_id
-    )
 
     return render(request, "dashboard.html", {
         "faculty": faculty,
-        "projects": projects,
-        "seed_projects": seed_projects,
-        "tdg_projects": tdg_projects,
+        "projects": data["projects"],
+        "seed_projects": data["seed_grants"],
+        "tdg_projects": data["tdg_grants"],
         "project_type": project_type,
         "show_projects": show_projects,
         "show_seed": show_seed,
         "show_tdg": show_tdg,
-        "copi_projects": copi_projects,
-        "copi_seeds": copi_seeds,
-        "copi_tdgs": copi_tdgs,
+        "copi_projects": data["copi_projects"],
+        "copi_seeds": data["copi_seeds"],
+        "copi_tdgs": data["copi_tdgs"],
     })
 
 
-# ✅ Helper to prepare report
-def prepare_report(project, expenditures, commitments):
-    report_rows = [] 
-    total_budget = 0
-    total_exp = 0 
-    total_commit = 0
-    
-    HEADS =[ 
-        "Equipment", "Consumables", "Contingency", "Travel", "Manpower", "Others", "Furniture", "Visitor Expenses", "Lab Equipment"
-    ]
-
-    def normalize(text):
-        """Lowercase, strip, remove trailing 's'"""
-        text = text.strip().lower()
-        return text[:-1] if text.endswith('s') and len(text) > 1 else text
-
-            
-
-    for head in HEADS:
-        field_name = head.lower().replace(" ", "_")
-        sanction = getattr(project, field_name, 0) or 0
-
-        normalized_head = normalize(head)
-        exp_sum = sum(exp.amount for exp in expenditures if normalize(exp.head) == normalized_head)
-        commit_sum = sum(c.gross_amount for c in commitments if normalize(c.head) == normalized_head)
-        balance = sanction - (exp_sum + commit_sum)
-
-        total_budget += sanction
-        total_exp += exp_sum
-        total_commit += commit_sum
+@login_required
+def dashboard_data(request):
+    """JSON of the dashboard: owned and co-PI funding sources with headline balances."""
+    faculty = get_object_or_404(Faculty, user=request.user)
+    return JsonResponse(faculty_dashboard(faculty), encoder=DjangoJSONEncoder)
 
-        report_rows.append({
-            "head": head,
-            "sanction": sanction,
-            "expenditure": exp_sum,
-            "commitment": commit_sum,
-            "balance": balance
-        })
 
-    return report_rows, {
-        "budget": total_budget,
-        "expenditure": total_exp,
-        "commitment": total_commit,
-        "balance": total_budget - (total_exp + total_commit)
-    }
+# ✅ User Bill Report (readonly)
+def grant_report(grant, expenditures, commitments):
+    """prepare_report for a seed / TDG grant, through the report cache."""
+    funding_type = "SEED" if isinstance(grant, SeedGrant) else "TDG"
+    return get_report(funding_type, grant.pk, lambda: prepare_report(grant, expenditures, commitments))
 
 
-# ✅ User Bill Report (readonly)
 @login_required
+@condition_on_versions(bill_report_scopes)
 def bill_report_user(request, grant_no):
     """
     Displays the report for a particular SeedGrant or TDGGrant.
@@ -248,24 +250,24 @@ def bill_report_user(request, grant_no):
     try:
         grant = SeedGrant.objects.get(grant_no=grant_no)
         project_type = "Seed"
-        # ✅ Fetch related expenditures and commitments via foreign key
-        expenditures = Expenditure.objects.filter(seed_grant__grant_no=grant_no)
-        commitments = Commitment.objects.filter(seed_grant__grant_no=grant_no)
+        # ✅ Fetch related expenditures and commitments via the funding columns
+        expenditures = Expenditure.objects.filter(funding_type="SEED", funding_id=grant.pk)
+        commitments = Commitment.objects.filter(funding_type="SEED", funding_id=grant.pk)
 
     except SeedGrant.DoesNotExist:
         try:
             grant = TDGGrant.objects.get(grant_no=grant_no)
             project_type = "TDG"
-            # ✅ Fetch related expenditures and commitments via foreign key
-            expenditures = Expenditure.objects.filter(tdg_grant__grant_no=grant_no)
-            commitments = Commitment.objects.filter(tdg_grant__grant_no=grant_no)
+            # ✅ Fetch related expenditures and commitments via the funding columns
+            expenditures = Expenditure.objects.filter(funding_type="TDG", funding_id=grant.pk)
+            commitments = Commitment.objects.filter(funding_type="TDG", funding_id=grant.pk)
         except TDGGrant.DoesNotExist:
             # Grant not found
             messages.error(request, "Grant not found.")
             return redirect("dashboard")
 
     # 🔹 Prepare report
-    report_rows, totals = prepare_report(grant, expenditures, commitments)
+    report_rows, totals = grant_report(grant, expenditures, commitments)
 
     return render(request, "bill_report_user.html", {
         "grant": grant,
@@ -286,7 +288,7 @@ def bill_report_admin(request):
     selected_grant, project_type = None, None
     expenditures, commitments = [], []
 
-    report_rows = [{"head": head, "sanction": "", "expenditure": "", "commitment": "", "balance": ""} for head in HEADS]
+    report_rows = [{"head": head, "sanction": "", "expenditure": "", "commitment": "", "balance": ""} for head in REPORT_HEADS]
     totals = {"budget": "", "expenditure": "", "commitment": "", "balance": ""}
 
     grant_no = request.GET.get("grant_no")
@@ -296,19 +298,19 @@ def bill_report_admin(request):
         try:
             selected_grant = SeedGrant.objects.get(grant_no=grant_no)
             project_type = "Seed"
-            expenditures = Expenditure.objects.filter(seed_grant__grant_no=grant_no)
-            commitments = Commitment.objects.filter(seed_grant__grant_no=grant_no)
+            expenditures = Expenditure.objects.filter(funding_type="SEED", funding_id=selected_grant.pk)
+            commitments = Commitment.objects.filter(funding_type="SEED", funding_id=selected_grant.pk)
         except SeedGrant.DoesNotExist:
             try:
                 selected_grant = TDGGrant.objects.get(grant_no=grant_no)
                 project_type = "TDG"
-                expenditures = Expenditure.objects.filter(tdg_grant__grant_no=grant_no)
-                commitments = Commitment.objects.filter(tdg_grant__grant_no=grant_no)
+                expenditures = Expenditure.objects.filter(funding_type="TDG", funding_id=selected_grant.pk)
+                commitments = Commitment.objects.filter(funding_type="TDG", funding_id=selected_grant.pk)
             except TDGGrant.DoesNotExist:
                 selected_grant = None
 
         if selected_grant:
-            report_rows, totals = prepare_report(selected_grant, expenditures, commitments)
+            report_rows, totals = grant_report(selected_grant, expenditures, commitments)
 
     # 🔹 List all grant numbers for dropdown
     all_short_nos = list(SeedGrant.objects.values_list("grant_no", flat=True)) + \
@@ -334,6 +336,7 @@ def bill_report_admin(request):
 
 
 @login_required
+@condition_on_versions(grant_details_scopes)
 def get_seed_grant_details(request):
     """
     AJAX view: returns JSON data for a given Seed/TDG grant,
@@ -347,18 +350,18 @@ def get_seed_grant_details(request):
     try:
         grant = SeedGrant.objects.get(grant_no=grant_no)
         project_type = "Seed"
-        expenditures_qs = Expenditure.objects.filter(seed_grant__grant_no=grant_no)
-        commitments_qs = Commitment.objects.filter(seed_grant__grant_no=grant_no)
+        expenditures_qs = Expenditure.objects.filter(funding_type="SEED", funding_id=grant.pk)
+        commitments_qs = Commitment.objects.filter(funding_type="SEED", funding_id=grant.pk)
     except SeedGrant.DoesNotExist:
         try:
             grant = TDGGrant.objects.get(grant_no=grant_no)
             project_type = "TDG"
-            expenditures_qs = Expenditure.objects.filter(tdg_grant__grant_no=grant_no)
-            commitments_qs = Commitment.objects.filter(tdg_grant__grant_no=grant_no)
+            expenditures_qs = Expenditure.objects.filter(funding_type="TDG", funding_id=grant.pk)
+            commitments_qs = Commitment.objects.filter(funding_type="TDG", funding_id=grant.pk)
         except TDGGrant.DoesNotExist:
             return JsonResponse({"error": "Grant not found"}, status=404)
 
-    report_rows, totals = prepare_report(grant, expenditures_qs, commitments_qs)
+    report_rows, totals = grant_report(grant, expenditures_qs, commitments_qs)
 
     expenditures = []
     for exp in expenditures_qs:
@@ -424,6 +427,46 @@ def get_seed_grant_details(request):
 
 # Generic API view
 
+def sparse_field_names(request, Serializer, context):
+    """
+    Serializer field names selected by ?fields=a,b and / or ?exclude=c, or
+    None when neither is given. The primary key field is always kept.
+    """
+    selected = request.query_params.get("fields", "").strip()
+    excluded = request.query_params.get("exclude", "").strip()
+    if not selected and not excluded:
+        return None
+
+    available = list(Serializer(context=context).fields)
+    selected = [name.strip() for name in selected.split(",") if name.strip()]
+    excluded = [name.strip() for name in excluded.split(",") if name.strip()]
+
+    unknown = sorted(set(selected + excluded) - set(available))
+    if unknown:
+        raise DRFValidationError({"fields": [f"Unknown field(s): {', '.join(unknown)}"]})
+
+    keep = set(selected or available) - set(excluded)
+    if "id" in available:
+        keep.add("id")
+    return keep
+
+
+def sparse_fields(Serializer, context, keep):
+    """Bound fields of the sparse fieldset, used to narrow the queryset."""
+    if keep is None:
+        return None
+    return prune_fields(Serializer(context=context), keep).fields
+
+
+def restrict_bill_fields(user, model_name, data):
+    """Admins may only change the status fields of the bills assigned to them."""
+    if model_name.lower() == 'billinward' and not user.is_superuser:
+        if getattr(user, 'role', None) == 'admin':
+            allowed = ['bill_status', 'outward_date', 'remarks']
+            data = {k: v for k, v in data.items() if k in allowed}
+    return data
+
+
 class GenericModelAPIView(APIView):
     """Generic API for GET all & POST create"""
     permission_classes = [IsAdminUser]
@@ -457,53 +500,95 @@ class GenericModelAPIView(APIView):
         "fundrequest":              50,
     }
 
+    DATE_FIELD_MAP = {
+        'expenditure':  'bill_date',
+        'commitment':   'bill_date',
+        'receipt':      'receipt_date',
+        'payment':      'bill_date',
+        'billinward':   'date',
+        'seedgrant':    'sanction_date',
+        'tdggrant':     'sanction_date',
+        'project':      'project_start_date',
+
+    }
+
     def get_model_and_serializer(self, model_name):
         return self.MODEL_CONFIG.get(model_name.lower(), (None, None))
 
+    def get_keyset_ordering(self, Model, model_name):
+        """The model's own ordering, else (date, id) newest first; always ends in the pk."""
+        pk_name = Model._meta.pk.name
+        ordering = [name for name in Model._meta.ordering if isinstance(name, str) and "__" not in name]
+
+        if not ordering:
+            date_field = self.DATE_FIELD_MAP.get(model_name.lower())
+            ordering = [f"-{date_field}"] if date_field else []
+
+        if pk_name not in [name.lstrip("-") for name in ordering]:
+            descending = not ordering or ordering[0].startswith("-")
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        return ordering
+
+    @method_decorator(condition_on_versions(api_list_scopes))
     def get(self, request, model_name):
         Model, Serializer = self.get_model_and_serializer(model_name)
         if not Model:
             return Response({"error": "Invalid model"}, status=400)
         
-        SELECT_RELATED_MAP = {
-            'expenditure':              ['seed_grant', 'tdg_grant', 'project'],
-            'commitment':               ['seed_grant', 'tdg_grant', 'project'],
-            'receipt':                  ['seed_grant', 'tdg_grant', 'project'],
-            'payment':                  ['seed_grant', 'tdg_grant', 'project'],
-            'billinward':               ['faculty', 'whom_to'],
-            'projectsanctiondistribution': ['project'],
-        }
-
-        related = SELECT_RELATED_MAP.get(model_name.lower(), [])
-        queryset = Model.objects.select_related(*related).all() if related else Model.objects.all()
-
-        if model_name.lower() == 'billinward':
-            if not request.user.is_superuser:
-                if getattr(request.user, 'role', None) == 'admin':
-                    queryset = queryset.filter(whom_to=request.user)
-                else:
-                    queryset = queryset.none()
+        context = {"request": request}
+        keep = sparse_field_names(request, Serializer, context)
+        keyset_ordering = self.get_keyset_ordering(Model, model_name) if "cursor" in request.query_params else []
+
+        queryset = optimized_queryset(
+            model_name, Model,
+            serializer_fields=sparse_fields(Serializer, context, keep),
+            extra_columns=[name.lstrip("-") for name in keyset_ordering],
+        )
 
+        queryset = self.scope_queryset(request, model_name, queryset)
         queryset = self.apply_search_filters(request, model_name, queryset)
 
-        if request.query_params.get("all") == "true":
-            serializer = Serializer(queryset, many=True, context={"request": request})
-            return Response(serializer.data)
+        stream_format = request.query_params.get("all")
+        if stream_format in ("true", "ndjson"):
+            max_rows = settings.API_STREAM_MAX_ROWS
+            if max_rows and queryset[max_rows:max_rows + 1].exists():
+                return Response(
+                    {"error": f"More than {max_rows} rows match; narrow the filters or page with ?cursor="},
+                    status=400,
+                )
+
+            ndjson = stream_format == "ndjson"
+            return StreamingHttpResponse(
+                stream_json_rows(queryset, Serializer, context, ndjson=ndjson, keep=keep),
+                content_type="application/x-ndjson" if ndjson else "application/json",
+            )
         
-        paginator = StandardPagination()
+        if keyset_ordering:
+            paginator = KeysetPagination(keyset_ordering)
+        else:
+            paginator = StandardPagination()
         page_size = self.MODEL_PAGE_SIZE.get(model_name.lower(), 50)
         paginator.page_size = page_size
 
         page = paginator.paginate_queryset(queryset, request)
 
         if page is not None:
-            serializer = Serializer( page, many=True, context={"request": request})
+            serializer = prune_fields(Serializer( page, many=True, context=context), keep)
 
             return paginator.get_paginated_response(serializer.data)
-        serializer = Serializer( queryset, many=True, context={"request": request})
+        serializer = prune_fields(Serializer( queryset, many=True, context=context), keep)
         return Response(serializer.data)
 
-    
+    def scope_queryset(self, request, model_name, queryset):
+        """Bills are only listed to their assignee (all of them to superusers)."""
+        if model_name.lower() == 'billinward':
+            if not request.user.is_superuser:
+                if getattr(request.user, 'role', None) == 'admin':
+                    queryset = queryset.filter(whom_to=request.user)
+                else:
+                    queryset = queryset.none()
+        return queryset
+
     def apply_search_filters(self, request, model_name, queryset):
         model_lower = model_name.lower()
 
@@ -514,44 +599,35 @@ class GenericModelAPIView(APIView):
         MODEL_SEARCH_CONFIG = {
             'expenditure': {
                 'related': [
+                    'funding_short_no',
                     'seed_grant__grant_no',
-                    'seed_grant__short_no',
                     'tdg_grant__grant_no',
-                    'tdg_grant__short_no',
                     'project__project_no',
-                    'project__project_short_no',
                 ]
             },
 
             'commitment': {
                 'related': [
+                    'funding_short_no',
                     'seed_grant__grant_no',
-                    'seed_grant__short_no',
                     'tdg_grant__grant_no',
-                    'tdg_grant__short_no',
                     'project__project_no',
-                    'project__project_short_no',
-
                 ]
             },
             'receipt': {
                 'related': [
+                    'funding_short_no',
                     'seed_grant__grant_no',
-                    'seed_grant__short_no',
                     'tdg_grant__grant_no',
-                    'tdg_grant__short_no',
                     'project__project_no',
-                    'project__project_short_no',
                 ]
             },
             'payment': {
                 'related': [
+                    'funding_short_no',
                     'seed_grant__grant_no',
-                    'seed_grant__short_no',
                     'tdg_grant__grant_no',
-                    'tdg_grant__short_no',
                     'project__project_no',
-                    'project__project_short_no',
                 ]
             },
             'billinward': {
@@ -605,27 +681,9 @@ class GenericModelAPIView(APIView):
             direct_fields = config.get('direct', [])
             related_fields = config.get('related', [])
 
-            if direct_fields or related_fields:
-                q_obj = Q()
-                for field in direct_fields:
-                    q_obj |= Q(**{f'{field}__icontains': search_q})
-                for field in related_fields:
-                    q_obj |= Q(**{f'{field}__icontains': search_q})
-                queryset = queryset.filter(q_obj)
-
-        DATE_FIELD_MAP = {
-            'expenditure':  'bill_date',
-            'commitment':   'bill_date',
-            'receipt':      'receipt_date',
-            'payment':      'bill_date',
-            'billinward':   'date',
-            'seedgrant':    'sanction_date',
-            'tdggrant':     'sanction_date',
-            'project':      'project_start_date',
+            queryset = apply_search(queryset, search_q, direct_fields + related_fields)
 
-        }
-
-        date_field = DATE_FIELD_MAP.get(model_lower)
+        date_field = self.DATE_FIELD_MAP.get(model_lower)
         if date_field:
             if date_from:
                 try:
@@ -671,20 +729,20 @@ class GenericModelDetailAPIView(APIView):
     def get_model_and_serializer(self, model_name):
         return self.MODEL_CONFIG.get(model_name.lower(), (None, None))
 
-    def get_object(self, model_name, pk, user):
+    def get_object(self, model_name, pk, user, serializer_fields=None):
         Model, _ = self.get_model_and_serializer(model_name)
         if not Model:
             return None
 
-        try:
-            # SeedGrant & TDG Grant short_no se lookup 
-            if model_name.lower() in ['seedgrant', 'tdggrant']:
-                return Model.objects.get(pk=pk)
-            if model_name.lower() in ['expenditure', 'commitment']:
-                return Model.objects.select_related('seed_grant', 'tdg_grant').get(pk=pk)
+        queryset = optimized_queryset(
+            model_name, Model, purpose="detail",
+            serializer_fields=serializer_fields,
+            extra_columns=["whom_to"] if model_name.lower() == 'billinward' else [],
+        )
 
+        try:
             if model_name.lower() == 'billinward':
-                obj = Model.objects.select_related('faculty', 'whom_to').get(pk=pk)
+                obj = queryset.get(pk=pk)
 
                 if user.is_superuser:
                     return obj
@@ -694,19 +752,24 @@ class GenericModelDetailAPIView(APIView):
 
                 return None
 
-            return Model.objects.get(pk=pk)
+            return queryset.get(pk=pk)
 
         except Model.DoesNotExist:
             return None
 
     def get(self, request, model_name, pk):
         _, Serializer = self.get_model_and_serializer(model_name)
-        obj = self.get_object(model_name, pk, request.user)
+        if not Serializer:
+            return Response({"error": "Not found"}, status=404)
+
+        context = {'request': request}
+        keep = sparse_field_names(request, Serializer, context)
+        obj = self.get_object(model_name, pk, request.user, sparse_fields(Serializer, context, keep))
 
         if not obj:
             return Response({"error": "Not found"}, status=404)
 
-        serializer = Serializer(obj, context={'request': request})
+        serializer = prune_fields(Serializer(obj, context=context), keep)
         return Response(serializer.data)
 
     def put(self, request, model_name, pk):
@@ -716,15 +779,8 @@ class GenericModelDetailAPIView(APIView):
         if not obj:
             return Response({"error": "Not found"}, status=404)
 
-        data = request.data.copy()
+        data = restrict_bill_fields(request.user, model_name, request.data.copy())
 
-        
-        if model_name.lower() == 'billinward' and not request.user.is_superuser:
-            if getattr(request.user, 'role', None) == 'admin':
-                allowed = ['bill_status', 'outward_date', 'remarks']
-                data = {k: v for k, v in data.items() if k in allowed}
-
-        
         serializer = Serializer(obj, data=data, partial=True, context={'request': request})
 
         if serializer.is_valid():
@@ -741,13 +797,8 @@ class GenericModelDetailAPIView(APIView):
         if not obj:
              return Response({"error": "Not found"}, status=404)
 
-        data = request.data.copy()
-
-    # 🔒 billinward admin restriction
-        if model_name.lower() == 'billinward' and not request.user.is_superuser:
-            if getattr(request.user, 'role', None) == 'admin':
-                allowed = ['bill_status', 'outward_date', 'remarks']
-                data = {k: v for k, v in data.items() if k in allowed}
+        # 🔒 billinward admin restriction
+        data = restrict_bill_fields(request.user, model_name, request.data.copy())
 
         serializer = Serializer(obj,data=data,partial=True, context={'request': request})
 
@@ -777,6 +828,131 @@ class GenericModelDetailAPIView(APIView):
 
 
 
+class GridRowsAPIView(GenericModelAPIView):
+    """One block of rows for the Excel views' infinite row model, see project/grid.py."""
+    http_method_names = ["get", "head", "options"]
+
+    @method_decorator(condition_on_versions(api_list_scopes))
+    def get(self, request, model_name):
+        Model, Serializer = self.get_model_and_serializer(model_name)
+        if not Model:
+            return Response({"error": "Invalid model"}, status=400)
+
+        queryset = optimized_queryset(model_name, Model)
+        queryset = self.scope_queryset(request, model_name, queryset)
+        queryset = self.apply_search_filters(request, model_name, queryset)
+
+        try:
+            rows, last_row = grid_block(queryset, request.query_params)
+        except (GridRequestError, ValueError, ValidationError) as e:
+            return Response({"error": str(e)}, status=400)
+
+        serializer = Serializer(rows, many=True, context={"request": request})
+        data = serializer.data
+        for obj, row in zip(rows, data):
+            row["_version"] = row_version(obj)
+        return Response({"rows": data, "last_row": last_row})
+
+
+class GridBatchAPIView(GenericModelAPIView):
+    """
+    Save the Excel views' pending creates, updates and deletes in one request,
+    see project/batch.py. 409 when a row was changed by someone else meanwhile.
+    """
+    http_method_names = ["post", "options"]
+
+    def post(self, request, model_name):
+        Model, Serializer = self.get_model_and_serializer(model_name)
+        if not Model:
+            return Response({"error": "Invalid model"}, status=400)
+
+        try:
+            changes = parse_changeset(request.data)
+        except BatchRequestError as e:
+            return Response({"error": str(e)}, status=400)
+
+        if model_name.lower() == 'billinward' and not request.user.is_superuser:
+            if changes["create"] or changes["delete"]:
+                return Response({"error": "Only superusers can create or delete bills"}, status=403)
+
+        for item in changes["update"]:
+            item["data"] = restrict_bill_fields(request.user, model_name, item["data"])
+
+        queryset = self.scope_queryset(request, model_name, Model.objects.all())
+
+        try:
+            results, saved = apply_changeset(queryset, Serializer, changes, {"request": request})
+        except (ValueError, ValidationError) as e:
+            return Response({"error": str(e)}, status=400)
+
+        if saved:
+            return Response({"saved": True, "results": results})
+
+        conflict = any(result["status"] == "conflict" for result in results)
+        return Response({"saved": False, "results": results}, status=409 if conflict else 400)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@condition_on_versions(lookup_scopes)
+def lookup_list(request, name):
+    """Paged typeahead / id lookups for the Excel views, see project/lookups.py."""
+    if name not in LOOKUPS:
+        return Response({"error": "Invalid lookup"}, status=400)
+
+    try:
+        data = lookup_page(name, request.query_params)
+    except (ValueError, ValidationError) as e:
+        return Response({"error": str(e)}, status=400)
+
+    return Response(data)
+
+
+@staff_member_required
+def lookup_bundle(request, name):
+    """
+    Reference-data bundle of the Excel views, see project/bundles.py.
+    Requested with its current ?v= it may be cached for LOOKUP_BUNDLE_MAX_AGE,
+    otherwise the browser revalidates it against the ETag.
+    """
+    if name not in BUNDLES:
+        raise Http404("Unknown bundle")
+
+    version = bundle_versions([name])[name]
+    etag = quote_etag(f"{name}-{version}")
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(get_bundle_json(name, version), content_type="application/json")
+
+    response.headers["ETag"] = etag
+    if request.GET.get("v") == version:
+        patch_cache_control(response, private=True, max_age=settings.LOOKUP_BUNDLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def bulk_payment_create(request):
+    """Create many payments in one transaction, errors are reported per row."""
+    rows = request.data
+
+    if not isinstance(rows, list):
+        return Response({"error": "Expected a list of payments"}, status=400)
+
+    payments, errors = bulk_create_payments(rows, user=request.user)
+
+    if errors:
+        return Response({"errors": errors}, status=400)
+
+    return Response({
+        "created": len(payments),
+        "results": PaymentSerializer(payments, many=True, context={'request': request}).data,
+    }, status=201)
+
+
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
 @parser_classes([MultiPartParser, FormParser])
@@ -932,12 +1108,8 @@ def inward_bills_view(request):
         return redirect('dashboard')
 
  
-@login_required
-
-def project_balance_sheet(request, short_no):
-   
-    project = get_object_or_404(Project, project_short_no=short_no)
-
+def balance_sheet_summary(project):
+    """Year-wise budget and head-wise totals of a project's balance sheet (cached per project)."""
     dist_qs = ProjectSanctionDistribution.objects.filter(
         project=project
     ).select_related("head").order_by("project_year", "head__name")
@@ -952,70 +1124,21 @@ def project_balance_sheet(request, short_no):
     
     total_budget = sum(year_totals.values(), Decimal("0.00"))
 
-    head_totals = defaultdict(Decimal)
-    for row in dist_qs:
-        head_name = row.head.name if row.head else "Unknown"
-        head_totals[head_name] += row.sanctioned_amount or Decimal("0.00")
-    
-    #expenditures = Expenditure.objects.filter(project=project).order_by("date", "id")
-    commitments = Commitment.objects.filter(project=project).prefetch_related("payments").order_by("date", "id")
-
-    direct_payments = Payment.objects.filter(project=project, commitment__isnull=True).select_related("head", "payee", "payment_type").order_by("date", "id")
-
-    committed_payments = Payment.objects.filter(project=project, commitment__isnull=False).select_related("head", "payee", "payment_type", "commitment").order_by("date", "id")
-    payments = Payment.objects.filter(project=project).select_related("head").order_by("date", "id")
-
-    receipt_allocations = (
-        ReceiptAllocation.objects
-        .filter(receipt__project=project)
-        .select_related("head")
-
-    )
-    #exp_head_sum = defaultdict(Decimal)
-    com_head_sum = defaultdict(Decimal)
-    com_remaining_head_sum = defaultdict(Decimal)
-    rec_head_sum = defaultdict(Decimal)
-    pay_head_sum = defaultdict(Decimal)
-
-    #for e in expenditures:
-        #exp_head_sum[e.head] += e.amount or Decimal("0.00")
-    
-    for c in commitments:
-        head_name = c.head.strip() if c.head else "Unknown"
-        com_head_sum[head_name] += c.gross_amount or Decimal("0.00")
-        com_remaining_head_sum[head_name]  += c.remaining_amount or Decimal("0.00")
-
-    for ra in receipt_allocations:
-        head_name = ra.head.name.strip() if ra.head else "Unknown"
-        rec_head_sum[head_name] += ra.amount or Decimal("0.00")
-
-    for p in payments:
-        head_name = p.head.name.strip() if p.head else "Unknown"
-        pay_head_sum[head_name] += p.amount or Decimal("0.00")
-
-   
-
-    all_heads = (set(head_totals.keys()) |  set(com_head_sum.keys()) | set(rec_head_sum.keys()) | set(pay_head_sum.keys()) | set(com_remaining_head_sum.keys()))
+    # Head-wise totals come from the maintained FundingHeadBalance table,
+    # a project without rows has an empty ledger
+    balances = FundingHeadBalance.objects.filter(funding_type="PROJECT", funding_id=project.id)
 
     report_rows = []
-    for head in sorted(all_heads):
-        sanction = head_totals.get(head, Decimal("0.00"))
-        receipt = rec_head_sum.get(head, Decimal("0.00"))
-        
-        commitment = com_head_sum.get(head, Decimal("0.00"))
-        com_remaining = com_remaining_head_sum.get(head, Decimal("0.00"))
-        payment = pay_head_sum.get(head, Decimal("0.00"))
-        balance = receipt - payment
-
+    for row in balances.order_by("head"):
         report_rows.append({
-            "head": head,
-            "sanction": sanction,
-            "receipt": receipt,
-            "payment": payment,
-            
-            "commitment": commitment,
-            "com_remaining": com_remaining,
-            "balance": balance,
+            "head": row.head,
+            "sanction": row.sanction_amount,
+            "receipt": row.receipt_amount,
+            "payment": row.paid_amount,
+
+            "commitment": row.committed_amount,
+            "com_remaining": row.committed_remaining,
+            "balance": row.balance,
         })
     
     totals = {
@@ -1028,13 +1151,36 @@ def project_balance_sheet(request, short_no):
         "balance": sum([r["balance"] for r in report_rows], Decimal("0.00")),
     }
 
-    context = {
-        "project": project,
-
+    return {
         "year_budget_list": year_budget_list,
         "total_budget": total_budget,
         "report_rows": report_rows,
         "totals": totals,
+    }
+
+
+@login_required
+@condition_on_versions(balance_sheet_scopes)
+def project_balance_sheet(request, short_no):
+   
+    project = get_object_or_404(Project, project_short_no=short_no)
+
+    summary = get_report("PROJECT", project.id, lambda: balance_sheet_summary(project))
+
+    #expenditures = Expenditure.objects.filter(project=project).order_by("date", "id")
+    funding = {"funding_type": "PROJECT", "funding_id": project.id}
+
+    commitments = Commitment.objects.filter(**funding).with_paid_totals().order_by("date", "id")
+
+    direct_payments = Payment.objects.filter(**funding, commitment__isnull=True).select_related("head", "payee", "payment_type").order_by("date", "id")
+
+    committed_payments = Payment.objects.filter(**funding, commitment__isnull=False).select_related("head", "payee", "payment_type", "commitment").order_by("date", "id")
+    payments = Payment.objects.filter(**funding).select_related("head").order_by("date", "id")
+
+    context = {
+        "project": project,
+
+        **summary,
         
         "commitments": commitments,
         "payments": payments,
@@ -1080,7 +1226,7 @@ def cheque_letter_view(request):
                
 
 
-                total_amount = sum(p.net_amount or 0 for p in payments)
+                total_amount = payments.aggregate(total=Sum('net_amount'))['total'] or 0
                 selected_cheque_no = cheque_no
 
             except Bank.DoesNotExist:
@@ -1093,6 +1239,7 @@ def cheque_letter_view(request):
         'total_amount':  total_amount,
         'bank_account_no':  bank_account_no,
         'today':            date.today().strftime('%d-%b-%Y'),
+        'batch_url':        reverse('admin:payment_cheque_letter_batch'),
         'title':       'Cheque Letter',
         'has_permission': True,
 
@@ -1105,6 +1252,98 @@ def cheque_letter_view(request):
     return render(request, 'admin/cheque_letter.html', context )
 
 
+def parse_cheque_nos(text):
+    """Cheque numbers typed one per line or separated by commas / spaces."""
+    return list(dict.fromkeys(re.split(r"[\s,;]+", text.strip()))) if text.strip() else []
+
+
+@staff_member_required
+def cheque_letter_batch_view(request, job_id=None):
+    """
+    Start a ChequeLetterJob for a date range and / or a list of cheque
+    numbers, or show the progress and download link of one.
+    """
+    job = None
+    form = request.POST if request.method == 'POST' else {}
+
+    if job_id:
+        job = get_object_or_404(ChequeLetterJob, pk=job_id)
+
+    elif request.method == 'POST':
+        bank_id = request.POST.get('bank', '').strip()
+        date_from = request.POST.get('date_from', '').strip()
+        date_to = request.POST.get('date_to', '').strip()
+        cheque_nos = parse_cheque_nos(request.POST.get('cheque_nos', ''))
+        output_format = request.POST.get('output_format', 'pdf')
+
+        dates = [parse_date(value) if value else None for value in (date_from, date_to)]
+
+        if not (date_from and date_to) and not cheque_nos:
+            messages.error(request, "Enter a date range or a list of cheque numbers.")
+        elif (date_from and not dates[0]) or (date_to and not dates[1]):
+            messages.error(request, "Enter dates as YYYY-MM-DD.")
+        elif output_format not in dict(CHEQUE_LETTER_OUTPUT_CHOICES):
+            messages.error(request, "Unsupported output format.")
+        elif bank_id and (not bank_id.isdecimal() or not Bank.objects.filter(pk=bank_id).exists()):
+            messages.error(request, "Unknown bank.")
+        else:
+            job = ChequeLetterJob.objects.create(
+                bank_id=bank_id or None,
+                date_from=dates[0],
+                date_to=dates[1],
+                cheque_nos=cheque_nos,
+                output_format=output_format,
+                created_by=request.user,
+            )
+            transaction.on_commit(lambda: run_cheque_letter_job.delay(job.pk))
+            return redirect('admin:payment_cheque_letter_batch_job', job_id=job.pk)
+
+    context = {
+        'job': job,
+        'form': form,
+        'banks': Bank.objects.filter(is_active=True).order_by('bank_name'),
+        'output_formats': CHEQUE_LETTER_OUTPUT_CHOICES,
+        'status_url': reverse('cheque_letter_job_status', args=[job.pk]) if job else None,
+        'recent_jobs': ChequeLetterJob.objects.select_related('bank')[:10],
+        'title': 'Cheque Letter Batch',
+        'has_permission': True,
+
+        'site_header': 'IIT Hyderabad (SRC) - Admin Panel',
+        'site_title': 'IIT Hyderabad SRC Admin',
+        'site_url': '/admin/',
+    }
+    return render(request, 'admin/cheque_letter_batch.html', context)
+
+
+@staff_member_required
+def cheque_letter_job_status(request, pk):
+    """Small JSON payload polled by the cheque letter batch page."""
+    job = ChequeLetterJob.objects.filter(pk=pk).first()
+
+    if not job:
+        return JsonResponse({"error": "Not found"}, status=404)
+
+    return JsonResponse({
+        "id": job.pk,
+        "status": job.status,
+        "progress": job.progress,
+        "total_letters": job.total_letters,
+        "processed_letters": job.processed_letters,
+        "summary": job.summary,
+        "download_url": reverse("cheque_letter_job_download", args=[job.pk]) if job.file else None,
+    })
+
+
+@staff_member_required
+def cheque_letter_job_download(request, pk):
+    job = get_object_or_404(ChequeLetterJob, pk=pk)
+
+    if not job.file:
+        raise Http404("Not ready")
+
+    return FileResponse(job.file.open("rb"), as_attachment=True, filename=os.path.basename(job.file.name))
+
+
 
 
 
@@ -1113,6 +1352,141 @@ def cheque_letter_view(request):
     
 
 
+# Streaming exports
+
+EXPORT_CONFIG = {
+    "payment": (Payment, PaymentResource),
+    "commitment": (Commitment, CommitmentResource),
+    "expenditure": (Expenditure, ExpenditureResource),
+}
+
+EXPORT_CHUNK_SIZE = 2000
+API_STREAM_CHUNK_SIZE = 500
+
+
+class Echo:
+    """File-like object whose write() just hands the value back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(resource, queryset):
+    yield resource.get_export_headers()
 
+    for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield resource.export_resource(obj)
 
 
+def stream_json_rows(queryset, Serializer, context, ndjson=False, keep=None):
+    """
+    Serialize the queryset chunk by chunk and yield it as one JSON array, or
+    one object per line for NDJSON, so only a chunk is held in memory.
+    """
+    if not ndjson:
+        yield "["
+
+    separator = ""
+    rows = queryset.iterator(chunk_size=API_STREAM_CHUNK_SIZE)
+
+    while True:
+        chunk = list(islice(rows, API_STREAM_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        serializer = prune_fields(Serializer(chunk, many=True, context=context), keep)
+        data = [json.dumps(row, cls=DRFJSONEncoder) for row in serializer.data]
+
+        if ndjson:
+            yield "\n".join(data) + "\n"
+        else:
+            yield separator + ",".join(data)
+            separator = ","
+
+    if not ndjson:
+        yield "]"
+
+
+@staff_member_required
+def stream_export(request, model_name, file_format):
+    """
+    Export Payment / Commitment / Expenditure without building the dataset in
+    memory. Column names come from the import-export resources, so the file
+    can be imported back. Optional ?start_date= / ?end_date= filter on date.
+    """
+    config = EXPORT_CONFIG.get(model_name.lower())
+    if not config or file_format not in ("csv", "xlsx"):
+        raise Http404("Unknown export")
+
+    Model, Resource = config
+
+    queryset = optimized_queryset(model_name, Model, purpose="export").order_by("date", "id")
+
+    dates = {}
+    for name in ("start_date", "end_date"):
+        value = request.GET.get(name)
+        if not value:
+            continue
+        try:
+            dates[name] = parse_date(value)
+        except ValueError:
+            dates[name] = None
+        if dates[name] is None:
+            return JsonResponse({"error": f"Invalid {name}, expected YYYY-MM-DD."}, status=400)
+
+    if dates.get("start_date"):
+        queryset = queryset.filter(date__gte=dates["start_date"])
+    if dates.get("end_date"):
+        queryset = queryset.filter(date__lte=dates["end_date"])
+
+    rows = export_rows(Resource(), queryset)
+    filename = f"{model_name.lower()}_{date.today():%Y%m%d}.{file_format}"
+
+    if file_format == "csv":
+        writer = csv.writer(Echo())
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in rows),
+            content_type="text/csv",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    # write-only mode flushes rows to a temp file instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(Model._meta.verbose_name_plural.title())
+    for row in rows:
+        sheet.append(row)
+
+    tmp = tempfile.TemporaryFile()
+    workbook.save(tmp)
+    tmp.seek(0)
+
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename=filename,
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+@staff_member_required
+def import_job_status(request, pk):
+    """Small JSON payload polled by the background import page."""
+    job = ImportJob.objects.filter(pk=pk).first()
+
+    if not job:
+        return JsonResponse({"error": "Not found"}, status=404)
+
+    return JsonResponse({
+        "id": job.pk,
+        "status": job.status,
+        "progress": job.progress,
+        "total_rows": job.total_rows,
+        "processed_rows": job.processed_rows,
+        "new_rows": job.new_rows,
+        "updated_rows": job.updated_rows,
+        "skipped_rows": job.skipped_rows,
+        "error_rows": job.error_rows,
+        "errors": job.errors,
+        "summary": job.summary,
+    })
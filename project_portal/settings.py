@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from celery.schedules import crontab
 
 load_dotenv()
 
@@ -259,6 +260,52 @@ CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json' 
 
+# run by the celery-beat service (docker-compose.yml)
+CELERY_BEAT_SCHEDULE = {
+    # audit log partitions ahead of time and retention, see project/audit.py
+    "audit-retention": {
+        "task": "project.tasks.audit_retention_task",
+        "schedule": crontab(hour=2, minute=30),
+    },
+}
+
+# Shared caches on the Redis instance Celery uses (db 1), so every worker
+# sees the same TDS rate map and report cache.
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', 'redis://redis:6379/1')
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_CACHE_URL,
+        "KEY_PREFIX": "portal",
+    },
+    # computed funding reports, see project/report_cache.py
+    "reports": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_CACHE_URL,
+        "KEY_PREFIX": "reports",
+    },
+}
+
+# The TDS rate map is keyed by the TDSRate data version; the timeout only frees old versions.
+TDS_RATE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Reports are invalidated on change; the timeout only bounds a missed invalidation.
+REPORT_CACHE_TIMEOUT = 60 * 60
+
+# Lookup bundles are keyed by version, so the timeout only frees old versions.
+LOOKUP_BUNDLE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Browsers keep a bundle fetched through its versioned URL this long without revalidating.
+LOOKUP_BUNDLE_MAX_AGE = 7 * 24 * 60 * 60
+
+# Audit batches with at least this many entries are written by Celery.
+# None keeps every batch in the request (written on commit).
+AUDIT_CELERY_BATCH_SIZE = None
+
+# Hard cap for ?all=true / ?all=ndjson on the generic model API.
+API_STREAM_MAX_ROWS = 100000
+
 DEFAULT_CC_EMAIL = "office.src@iith.ac.in"
 
 from datetime import timedelta